@@ -1,6 +1,6 @@
 from PIL import ImageEnhance, ImageOps
 from desktopmagic.screengrab_win32 import getDisplaysAsImages
-from LatLon23 import LatLon, Longitude, Latitude, string2latlon
+from src.geo import GeoPoint, GeoLatitude, GeoLongitude, degree_parts
 import src.pymgrs as mgrs
 import pytesseract
 import os
@@ -116,6 +116,20 @@ def capture_map_coords(self):
     self.window.Element('capture_status').Update("Status: F10 map not found")
     raise ValueError("F10 map not found")
 
+def hemisphere_degrees(hemisphere, parts):
+    # Parts are unsigned degrees, minutes and seconds; the hemisphere gives the sign
+    sign = -1 if hemisphere in ("S", "W") else 1
+    decimal_degree = sum(sign * float(part) / 60 ** i for i, part in enumerate(parts))
+    # Rebuilt once from its parts, as LatLon23's string parsing does
+    degree, minute, _, second = degree_parts(decimal_degree)
+    return degree + minute / 60. + second / 3600.
+
+
+def hemisphere_position(lat_hemisphere, lat_parts, lon_hemisphere, lon_parts):
+    return GeoPoint.from_decimal(hemisphere_degrees(lat_hemisphere, lat_parts),
+                                 hemisphere_degrees(lon_hemisphere, lon_parts))
+
+
 def parse_map_coords_string(self, coords_string):
     coords_string = coords_string.upper().replace(")", "J").replace("]", "J").replace("}", "J").replace("£", "E")
     # "X-00199287 Z+00523070, 0 ft"   Not sure how to convert this yet
@@ -125,7 +139,7 @@ def parse_map_coords_string(self, coords_string):
     if res is not None:
         mgrs_string = res.group(1).replace(" ", "")
         decoded_mgrs = mgrs.UTMtoLL(mgrs.decode(mgrs_string))
-        position = LatLon(Latitude(degree=decoded_mgrs["lat"]), Longitude(
+        position = GeoPoint(GeoLatitude(degree=decoded_mgrs["lat"]), GeoLongitude(
             degree=decoded_mgrs["lon"]))
         elevation = max(0, float(res.group(2)))
 
@@ -138,9 +152,8 @@ def parse_map_coords_string(self, coords_string):
     # "N43°10.244 E40°40.204, 477 ft"  Degrees and decimal minutes
     res = re.search("([NS])(\d+)[°'](\d+\.\d+) ([EW])(\d+)[°'](\d+\.\d+),+ (-?\d+) (FT|M)$", coords_string)
     if res is not None:
-        lat_str = res.group(2) + " " + res.group(3) + " " + res.group(1)
-        lon_str = res.group(5) + " " + res.group(6) + " " + res.group(4)
-        position = string2latlon(lat_str, lon_str, "d% %M% %H")
+        position = hemisphere_position(res.group(1), (res.group(2), res.group(3)),
+                                       res.group(4), (res.group(5), res.group(6)))
         elevation = max(0, float(res.group(7)))
 
         if res.group(8) == "M":
@@ -152,9 +165,8 @@ def parse_map_coords_string(self, coords_string):
     # "N42-43-17.55 E40-38-21.69, 0 ft" Degrees, minutes and decimal seconds
     res = re.search("([NS])(\d+)-(\d+)-(\d+\.\d+) ([EW])(\d+)-(\d+)-(\d+\.\d+),+ (-?\d+) (FT|M)$", coords_string)
     if res is not None:
-        lat_str = res.group(2) + " " + res.group(3) + " " + res.group(4) + " " + res.group(1)
-        lon_str = res.group(6) + " " + res.group(7) + " " + res.group(8) + " " + res.group(5)
-        position = string2latlon(lat_str, lon_str, "d% %m% %S% %H")
+        position = hemisphere_position(res.group(1), (res.group(2), res.group(3), res.group(4)),
+                                       res.group(5), (res.group(6), res.group(7), res.group(8)))
         elevation = max(0, float(res.group(9)))
 
         if res.group(10) == "M":
@@ -166,9 +178,8 @@ def parse_map_coords_string(self, coords_string):
     # "43°34'37"N 29°11'18"E, 0 ft" Degrees minutes and seconds
     res = re.search("(\d+)[°'](\d+)[°'](\d+)[°'\"\*]([NS]) (\d+)[°'](\d+)[°'](\d+)[°'\"\*]([EW]),+ (-?\d+) (FT|M)$", coords_string)
     if res is not None:
-        lat_str = res.group(1) + " " + res.group(2) + " " + res.group(3) + " " + res.group(4)
-        lon_str = res.group(5) + " " + res.group(6) + " " + res.group(7) + " " + res.group(8)
-        position = string2latlon(lat_str, lon_str, "d% %m% %S% %H")
+        position = hemisphere_position(res.group(4), (res.group(1), res.group(2), res.group(3)),
+                                       res.group(8), (res.group(5), res.group(6), res.group(7)))
         elevation = max(0, float(res.group(9)))
 
         if res.group(10) == "M":
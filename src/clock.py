@@ -0,0 +1,67 @@
+'''
+*
+* clock.py: DCS Waypoint Editor - Send Timing Clock Module                  *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import time
+
+
+class SystemClock:
+    """Wall clock used for real sends."""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def sender(self, send):
+        return send
+
+
+class SimulatedClock:
+    """Clock that advances instantly and records packets instead of sending them.
+
+    Each entry in `packets` is (time, data, address), where time is the
+    simulated time the packet would have been sent at.
+    """
+
+    def __init__(self, start=0.0):
+        self.time = start
+        self.packets = list()
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.time += seconds
+
+    def sender(self, send):
+        def record(data, address):
+            self.packets.append((self.time, data, address))
+            return len(data)
+        return record
+
+    @property
+    def messages(self):
+        return [data.decode("utf-8").rstrip("\n") for _, data, _ in self.packets]
+
+    def schedule(self, ndigits=6):
+        return [(round(t, ndigits), data.decode("utf-8").rstrip("\n")) for t, data, _ in self.packets]
@@ -0,0 +1,85 @@
+'''
+*
+* controls.py: DCS Waypoint Editor - DCS-BIOS Control Capability Module     *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import json
+import os
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONTROL_DOC_DIR = os.path.join("Scripts", "DCS-BIOS", "doc", "json")
+
+# Highest set_state position of the multi-position controls the drivers move,
+# used when the DCS-BIOS control reference is not installed.
+BUILTIN_CONTROLS = {
+    "F-16C_50": dict(ICP_DED_SW=2, ICP_DATA_UP_DN_SW=2, ICP_DATA_RTN_SEQ_SW=2),
+    "A-10C": dict(AAP_PAGE=3),
+    "F-14": dict(RIO_CAP_CATRGORY=5),
+    "M-2000C": dict(INS_PARAM_SEL=9),
+    "Ka-50": dict(PVI_MODES=5),
+}
+
+
+class ControlTable:
+    """set_state capabilities of the controls of one DCS-BIOS module.
+
+    Maps a control identifier to the highest position it accepts through an
+    absolute "CONTROL n" command.
+    """
+
+    def __init__(self, states=None, source="built-in"):
+        self.states = dict(states or dict())
+        self.source = source
+
+    def __len__(self):
+        return len(self.states)
+
+    def can_set(self, control, value):
+        max_value = self.states.get(control)
+        return max_value is not None and 0 <= value <= max_value
+
+    @staticmethod
+    def from_reference(reference):
+        states = dict()
+        for category in reference.values():
+            for identifier, control in category.items():
+                for control_input in control.get("inputs", ()):
+                    if control_input.get("interface") == "set_state":
+                        states[identifier] = control_input.get("max_value", 1)
+        return states
+
+    @staticmethod
+    def load(dcs_path, module):
+        if module is None:
+            return ControlTable()
+
+        if dcs_path:
+            filename = os.path.join(dcs_path, CONTROL_DOC_DIR, f"{module}.json")
+            try:
+                with open(filename, "r") as f:
+                    table = ControlTable(ControlTable.from_reference(json.load(f)), source=filename)
+                logger.info(f"Loaded {len(table)} set_state controls for {module} from {filename}")
+                return table
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, AttributeError):
+                logger.warning(f"Failed to read DCS-BIOS control reference {filename}", exc_info=True)
+
+        return ControlTable(BUILTIN_CONTROLS.get(module))
@@ -1,15 +1,73 @@
+from peewee import ModelIndex
+from playhouse.migrate import SqliteMigrator, migrate
 from src.models import ProfileModel, WaypointModel, SequenceModel, db
 from src.logger import get_logger
 
+MODELS = [ProfileModel, SequenceModel, WaypointModel]
+
+
+def create_tables():
+    # Indexes are created by the migrations that add the columns they cover
+    for model in MODELS:
+        model._schema.create_table(safe=True)
+
+
+def create_index(model, *fields, unique=False):
+    db.execute(ModelIndex(model, fields, unique=unique).safe(True))
+
+
+def add_fingerprint_column():
+    table = ProfileModel._meta.table_name
+    if "fingerprint" not in [column.name for column in db.get_columns(table)]:
+        migrate(SqliteMigrator(db).add_column(table, "fingerprint", ProfileModel.fingerprint))
+
+
+def add_indexes():
+    create_index(ProfileModel, ProfileModel.name, unique=True)
+    create_index(ProfileModel, ProfileModel.fingerprint)
+    create_index(SequenceModel, SequenceModel.profile)
+    create_index(WaypointModel, WaypointModel.profile)
+    create_index(WaypointModel, WaypointModel.sequence)
+
+
+def add_waypoint_uid_column():
+    table = WaypointModel._meta.table_name
+    if "uid" not in [column.name for column in db.get_columns(table)]:
+        # SQLite adds a NOT NULL column with a default in place, without the table copy the migrator makes
+        db.execute_sql(f'ALTER TABLE "{table}" ADD COLUMN "uid" INTEGER NOT NULL DEFAULT 0')
+        # Waypoints used to load in id order
+        WaypointModel.update(uid=WaypointModel.id).execute()
+    create_index(WaypointModel, WaypointModel.profile, WaypointModel.uid)
+
+
+# Schema changes in order, never reordered or removed: a database's
+# user_version is the number of them it has had
+MIGRATIONS = [create_tables, add_fingerprint_column, add_indexes, add_waypoint_uid_column]
+SCHEMA_VERSION = len(MIGRATIONS)
+
 
 class DatabaseInterface:
     def __init__(self, db_name):
         self.logger = get_logger("db")
         db.init(db_name)
         db.connect()
-        db.create_tables([ProfileModel, WaypointModel, SequenceModel])
+        self.migrate()
         self.logger.debug("Connected to database")
 
+    def migrate(self):
+        version = db.pragma("user_version")
+        if version > SCHEMA_VERSION:
+            self.logger.warning(f"Database schema version {version} is newer than {SCHEMA_VERSION}")
+            return
+        if version == SCHEMA_VERSION:
+            return
+
+        with db.atomic():
+            for migration in MIGRATIONS[version:]:
+                migration()
+            db.pragma("user_version", SCHEMA_VERSION)
+        self.logger.info(f"Upgraded database schema from version {version} to {SCHEMA_VERSION}")
+
     @staticmethod
     def close():
         db.close()
@@ -21,14 +21,76 @@
 import socket
 import re
 import json
-from time import sleep
+import heapq
+from operator import itemgetter
 from configparser import NoOptionError
-from src.gui import progress_gui
+from src.clock import SystemClock
+from src.controls import ControlTable
+
+THE_WAY_PAYLOAD_HEAD = b'{"payload": ['
+THE_WAY_PAYLOAD_SEP = b', '
+THE_WAY_PAYLOAD_TAIL = b'], "type": "waypoints"}\n'
+THE_WAY_SEND_CHUNK = 65536
+
+# Op table entries are (op, argument, release timing, after timing). Timings
+# are "short"/"medium" timing table names or literal seconds.
+OP_PRESS = 0        # press and release a control
+OP_SET = 1          # send a literal control message, e.g. a selector position
+OP_PAUSE = 2        # wait without sending
+OP_BEGIN = 3        # open a progress reporter for argument items
+OP_CHECK = 4        # skip to the end of the phase if the send was cancelled
+OP_STEP = 5         # report argument items done
+OP_CLOSE = 6        # close the progress reporter
+OP_END = 7          # end of a phase script
+
 
 class DriverException(Exception):
     pass
 
 
+class CommandTable:
+    """TheWay command table with every command serialized to JSON once at load time."""
+
+    def __init__(self, commands=None):
+        self.commands = commands or dict()
+        self.fragments = {key: json.dumps(command).encode("utf-8") for key, command in self.commands.items()}
+        self.delays = {key: self.command_delay(command) for key, command in self.commands.items()}
+
+    @staticmethod
+    def command_delay(command):
+        # TheWay waits `delay` ms after each action, and again after the depress
+        try:
+            delay = float(command.get("delay", 0)) / 1000
+        except (TypeError, ValueError, AttributeError):
+            return 0
+        return delay * 2 if str(command.get("addDepress")).lower() == "true" else delay
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __contains__(self, key):
+        return key in self.commands
+
+    def get(self, key):
+        return self.commands.get(key)
+
+    def fragment(self, key):
+        return self.fragments.get(key, b"null")
+
+    def missing(self, keys):
+        return {key for key in keys if key not in self.commands}
+
+    def duration(self, keys):
+        """Estimated seconds TheWay takes to run the commands for keys."""
+        delays = self.delays
+        return sum(delays.get(key, 0) for key in keys)
+
+    @staticmethod
+    def load(filename):
+        with open(filename, "r") as f:
+            return CommandTable(json.load(f))
+
+
 def latlon_tostring(latlong, decimal_minutes_mode=False, easting_zfill=2, zfill_minutes=2, one_digit_seconds=False, precision=4, dfill=False):
 
     if not decimal_minutes_mode:
@@ -81,14 +143,144 @@ def latlon_tostring(latlong, decimal_minutes_mode=False, easting_zfill=2, zfill_
         return lat_deg + lat_min, lon_deg + lon_min
 
 
+class KeyMap:
+    """Maps the argument of a driver key helper to a DCS-BIOS control.
+
+    `pattern` is formatted with the argument unless it is listed in `special`.
+    `raw` is either a bool for the whole map or a collection of arguments whose
+    control is sent as a literal message instead of a press and release.
+    Lookups are cached, so every control string is built only once.
+    """
+
+    def __init__(self, pattern, special=None, raw=False):
+        self.pattern = pattern
+        self.special = special or dict()
+        self.raw = raw
+        self.cache = dict()
+
+    def __getitem__(self, num):
+        try:
+            return self.cache[num]
+        except KeyError:
+            key = self.special.get(num) or self.pattern.format(num)
+            raw = self.raw if type(self.raw) == bool else num in self.raw
+            self.cache[num] = key, raw
+            return key, raw
+
+
+def key_helper(name):
+    def press(driver, num, delay_after=None, delay_release=None):
+        key, raw = driver.keymaps[name][num]
+        driver.press_with_delay(key, delay_after=delay_after, delay_release=delay_release, raw=raw)
+    press.__name__ = name
+    return press
+
+
+class EncodedKeys(dict):
+    """Cache of the datagrams for a control: (press, release, raw message)."""
+
+    def __missing__(self, key):
+        encoded = self[key] = (f"{key} 1\n".encode("utf-8"), f"{key} 0\n".encode("utf-8"),
+                               f"{key}\n".encode("utf-8"))
+        return encoded
+
+
+class ProgressWindow:
+    def __init__(self, count, location, label=None):
+        from src.gui import progress_gui
+        self.window = progress_gui(count, location, f"{label}:" if label else "Processing:")
+
+    def cancelled(self):
+        event, values = self.window.Read(timeout=20)
+        return event is None or event == 'Cancel'
+
+    def update(self, i):
+        self.window['progress'].update(i)
+
+    def close(self):
+        self.window.close()
+
+
+class NullProgress:
+    """Progress reporter for headless sends."""
+
+    def __init__(self, count=0, label=None):
+        pass
+
+    def cancelled(self):
+        return False
+
+    def update(self, i):
+        pass
+
+    def close(self):
+        pass
+
+
+class OpProgress:
+    """Stands in for a progress window while a driver compiles its op table.
+
+    The calls a phase script makes are recorded as ops so the interpreter can
+    drive the real progress reporter, and cancellation, while it sends.
+    """
+
+    def __init__(self, ops):
+        self.ops = ops
+
+    def cancelled(self):
+        self.ops.append((OP_CHECK, None, None, None))
+        return False
+
+    def update(self, i):
+        self.ops.append((OP_STEP, i, None, None))
+
+    def close(self):
+        self.ops.append((OP_CLOSE, None, None, None))
+
+
 class Driver:
-    def __init__(self, logger, config, host="127.0.0.1", port=7778):
+    """Base class for aircraft drivers.
+
+    A driver is described mostly by data: `keymaps` generates the key helper
+    methods (ufc, cdu, kbu, ...), `coords` is the coordinate string format,
+    `hemisphere_keys` the keys that select N/S/E/W and `number_helper` the
+    helper digits are typed with. The phase scripts (enter_waypoints,
+    enter_missions, ...) are compiled once per send into a flat op table
+    which `run` interprets with pre-encoded datagrams. All waits go through
+    `clock`, so a SimulatedClock runs a send instantly and records its schedule.
+    """
+
+    keymaps = dict()
+    command_sources = None
+    bios_module = None
+    coords = dict()
+    hemisphere_keys = dict()
+    hemisphere_helper = None
+    number_helper = None
+
+    encoded = EncodedKeys()
+    method = "DCS-BIOS"
+    the_way_address = ("127.0.0.1", 42070)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.__dict__.get("keymaps", dict()):
+            if name not in cls.__dict__:
+                setattr(cls, name, key_helper(name))
+
+    def __init__(self, logger, config, host="127.0.0.1", port=7778, clock=None):
         self.logger = logger
+        self.clock = clock or SystemClock()
         self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.host, self.port = host, port
         self.config = config
         self.limits = dict()
-        self.keylist = list()
+        self.ops = list()
+        self.journal = None
+        self.cmdlist = CommandTable()
+        self.pposition = None
+        self.reporter = self.progress_window
+        self._controls = None
 
         try:
             self.short_delay = float(self.config.get("PREFERENCES", "button_release_short_delay"))
@@ -96,57 +288,259 @@ class Driver:
         except NoOptionError:
             self.short_delay, self.medium_delay = 0.2, 0.5
 
+    @property
+    def controls(self):
+        if self._controls is None:
+            dcs_path = self.config.get("PREFERENCES", "dcs_path", fallback=None)
+            self._controls = ControlTable.load(dcs_path, self.bios_module)
+        return self._controls
+
+    @property
+    def timing(self):
+        return dict(short=self.short_delay, medium=self.medium_delay)
+
+    def progress_window(self, count, label=None):
+        return ProgressWindow(count, self.pposition, label)
+
+    def progress(self, count):
+        self.ops.append((OP_BEGIN, count, None, None))
+        return OpProgress(self.ops)
+
+    def timing_name(self, delay):
+        if delay is None or delay == self.short_delay:
+            return "short"
+        elif delay == self.medium_delay:
+            return "medium"
+        return delay
+
     def press_with_delay(self, key, delay_after=None, delay_release=None, raw=False):
         if not key:
             return False
 
-        if self.method == "DCS-BIOS":
-            if delay_after is None:
-                delay_after = self.short_delay
-
-            if delay_release is None:
-                delay_release = self.short_delay
-
-            encoded_str = key.encode("utf-8")                                                              
-            if not raw:
-                sent = self.s.sendto(f"{key} 1\n".encode("utf-8"), (self.host, self.port))
-                sleep(delay_release)
+        if raw:
+            self.ops.append((OP_SET, key, None, self.timing_name(delay_after)))
+        else:
+            self.ops.append((OP_PRESS, key, self.timing_name(delay_release), self.timing_name(delay_after)))
+        return True
+
+    def delay(self, seconds):
+        self.ops.append((OP_PAUSE, None, None, seconds))
+
+    def estimate(self, ops, timing=None):
+        """Returns the number of controls sent and the seconds the ops take to run."""
+        timing = timing or self.timing
+        presses, seconds = 0, 0
+        for op, _, release, after in ops:
+            if op == OP_PRESS:
+                presses += 1
+                seconds += timing.get(release, release) + timing.get(after, after)
+            elif op == OP_SET:
+                presses += 1
+                seconds += timing.get(after, after)
+            elif op == OP_PAUSE:
+                seconds += after
+        return presses, seconds
+
+    def set_state(self, control, value, delay_after=None):
+        self.press_with_delay(f"{control} {value}", delay_after=delay_after, raw=True)
+
+    def rocker(self, control, position, center=1, delay_after=None, delay_release=None):
+        """Moves a spring-loaded rocker to position and back to center with two absolute commands."""
+        self.set_state(control, position, delay_after=delay_release)
+        self.set_state(control, center, delay_after=delay_after)
+
+    def press_hemisphere(self, angle, axis, delay_after=None, delay_release=None):
+        if axis == "lat":
+            key = self.hemisphere_keys["N" if angle.degree > 0 else "S"]
+        else:
+            key = self.hemisphere_keys["E" if angle.degree > 0 else "W"]
+        getattr(self, self.hemisphere_helper)(key, delay_after=delay_after, delay_release=delay_release)
 
-                self.s.sendto(f"{key} 0\n".encode("utf-8"), (self.host, self.port))
-                strlen = len(encoded_str) + 3
-            else:
-                sent = self.s.sendto(f"{key}\n".encode("utf-8"), (self.host, self.port))
-                strlen = len(encoded_str) + 1
+    def coords_strings(self, latlong):
+        return latlon_tostring(latlong, **self.coords)
 
-            sleep(delay_after)
-            return sent == strlen
+    def enter_number(self, number):
+        press = getattr(self, self.number_helper)
+        for num in str(number):
+            if num != ".":
+                press(num)
+
+    def phase(self, script, *args):
+        script(*args)
+        self.ops.append((OP_END, None, None, None))
+
+    def build(self, profile):
+        """Appends the ops that enter the profile; the generic driver has nothing to enter."""
+
+    def compile(self, profile):
+        self.ops = list()
+        self.build(profile)
+        ops, self.ops = self.ops, list()
+        return ops
+
+    def enter_all(self, profile, ops=None):
+        if ops is None:
+            ops = self.compile(profile)
+        if self.journal is not None:
+            self.record(ops)
+        self.execute(ops)
+        return ops
+
+    @staticmethod
+    def keys(ops):
+        return [key for op, key, _, _ in ops if op == OP_PRESS or op == OP_SET]
+
+    def record(self, ops):
+        for op, key, release, after in ops:
+            if op == OP_PRESS:
+                self.journal.record(key, False, release, after)
+            elif op == OP_SET:
+                self.journal.record(key, True, None, after)
+            elif op == OP_PAUSE:
+                self.journal.pause(after)
+
+    def execute(self, ops, timing=None):
+        if self.method == "DCS-BIOS":
+            self.run(ops, timing)
         else:
-            self.keylist.append(key)
-            return True
+            self.enter_keypress(self.keys(ops))
+
+    def run(self, ops, timing=None):
+        timing = timing or self.timing
+        sleep = self.clock.sleep
+        send, address, encoded = self.clock.sender(self.s.sendto), (self.host, self.port), self.encoded
+        progress = None
+        skipping = False
+
+        for op, arg, release, after in ops:
+            if skipping:
+                skipping = op != OP_END
+            elif op == OP_PRESS:
+                press, unpress, _ = encoded[arg]
+                send(press, address)
+                sleep(timing.get(release, release))
+                send(unpress, address)
+                sleep(timing.get(after, after))
+            elif op == OP_SET:
+                send(encoded[arg][2], address)
+                sleep(timing.get(after, after))
+            elif op == OP_PAUSE:
+                sleep(after)
+            elif op == OP_BEGIN:
+                progress = self.reporter(arg)
+            elif op == OP_CHECK:
+                if progress.cancelled():
+                    progress.close()
+                    progress = None
+                    skipping = True
+            elif op == OP_STEP:
+                progress.update(arg)
+            elif op == OP_CLOSE or op == OP_END:
+                if progress is not None:
+                    progress.close()
+                    progress = None
+
+    def timeline(self, ops, reporter, timing, result):
+        """Yields (time, datagram) for an op table, with time relative to its start.
+
+        Progress and cancel ops are handled as the stream is consumed. `result`
+        counts the controls sent and records whether the stream was cancelled.
+        """
+        encoded = self.encoded
+        t = 0
+        progress = None
+        skipping = False
+
+        for op, arg, release, after in ops:
+            if skipping:
+                skipping = op != OP_END
+            elif op == OP_PRESS:
+                press, unpress, _ = encoded[arg]
+                yield t, press
+                t += timing.get(release, release)
+                yield t, unpress
+                t += timing.get(after, after)
+                result["sent"] += 1
+            elif op == OP_SET:
+                yield t, encoded[arg][2]
+                t += timing.get(after, after)
+                result["sent"] += 1
+            elif op == OP_PAUSE:
+                t += after
+            elif op == OP_BEGIN:
+                progress = reporter(arg)
+            elif op == OP_CHECK:
+                if progress.cancelled():
+                    progress.close()
+                    progress = None
+                    skipping = True
+                    result["cancelled"] = True
+            elif op == OP_STEP:
+                progress.update(arg)
+            elif op == OP_CLOSE or op == OP_END:
+                if progress is not None:
+                    progress.close()
+                    progress = None
+        result["end"] = t
+
+    def run_parallel(self, tables, timing=None):
+        """Runs op tables for independent cockpit devices at the same time.
+
+        `tables` maps a label to an op table. Each table keeps its own delays;
+        the datagrams of all tables are merged in time order. Returns a result
+        per label with the controls sent, the controls in the table and
+        whether it was cancelled.
+        """
+        timing = timing or self.timing
+        send, address = self.clock.sender(self.s.sendto), (self.host, self.port)
+        results = dict()
+        timelines = list()
+        for label, ops in tables.items():
+            results[label] = dict(sent=0, total=self.estimate(ops)[0], cancelled=False, end=0)
+            reporter = lambda count, label=label: self.reporter(count, label)
+            timelines.append(self.timeline(ops, reporter, timing, results[label]))
+
+        start = self.clock.now()
+        for t, data in heapq.merge(*timelines, key=itemgetter(0)):
+            self.clock.sleep(start + t - self.clock.now())
+            send(data, address)
+        self.clock.sleep(start + max((result["end"] for result in results.values()), default=0) - self.clock.now())
+        return results
+
+    def replay(self, journal, timing=None):
+        timing = dict(journal.timing, **(timing or dict()))
+        ops = list()
+        for key, raw, release, after in journal.keys:
+            if key is None:
+                ops.append((OP_PAUSE, None, None, journal.resolve(after, timing)))
+            elif raw:
+                ops.append((OP_SET, key, None, after))
+            else:
+                ops.append((OP_PRESS, key, release, after))
+        self.execute(ops, timing)
 
     def enter_keypress(self, keylist):
-        host = "127.0.0.1"
-        port = 42070
-
-        commands = list()
-        for key in keylist:
-            commands.append(self.cmdlist.get(key))
-        waypoints_obj = {
-            "payload": commands,
-            "type": "waypoints"
-        }
-        commandstr = json.dumps(waypoints_obj) + "\n"
-#        self.logger.info(keylist)
-#        self.logger.info(commandstr)
+        missing = self.cmdlist.missing(keylist)
+        if missing:
+            self.logger.warning(f"No TheWay command for keys: {', '.join(sorted(missing))}")
 
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect((host, port))
-            s.settimeout(2.0)
-            s.send(commandstr.encode('utf-8'))
-            s.close()
-        except Exception as e:
-            s.close()
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.settimeout(2.0)
+                s.connect(self.the_way_address)
+
+                fragment = self.cmdlist.fragment
+                buffer = bytearray(THE_WAY_PAYLOAD_HEAD)
+                for i, key in enumerate(keylist):
+                    if i:
+                        buffer += THE_WAY_PAYLOAD_SEP
+                    buffer += fragment(key)
+                    if len(buffer) >= THE_WAY_SEND_CHUNK:
+                        s.sendall(buffer)
+                        buffer.clear()
+                buffer += THE_WAY_PAYLOAD_TAIL
+                s.sendall(buffer)
+        except OSError as e:
             self.logger.error("Failed to connect socket: %s" % e)
 
     def validate_waypoint(self, waypoint):
@@ -179,25 +573,19 @@ class Driver:
 
 
 class HornetDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    bios_module = "FA-18C_hornet"
+    keymaps = dict(
+        ufc=KeyMap("UFC_{}"),
+        lmdi=KeyMap("LEFT_DDI_PB_{:0>2}"),
+        ampcd=KeyMap("AMPCD_PB_{:0>2}"),
+    )
+    hemisphere_keys = dict(N="2", S="8", E="6", W="4")
+    hemisphere_helper = "ufc"
+
+    def __init__(self, logger, config, clock=None):
+        super().__init__(logger, config, clock=clock)
         self.limits = dict(WP=None, MSN=6)
 
-    def ufc(self, num, delay_after=None, delay_release=None):
-        key = f"UFC_{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
-    def lmdi(self, pb, delay_after=None, delay_release=None):
-        key = f"LEFT_DDI_PB_{pb.zfill(2)}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
-    def ampcd(self, pb, delay_after=None, delay_release=None):
-        key = f"AMPCD_PB_{pb.zfill(2)}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
     def enter_number(self, number, two_enters=False):
         for num in str(number):
             if num == ".":
@@ -221,17 +609,11 @@ class HornetDriver(Driver):
         self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}")
 
         if not pp:
-            if latlong.lat.degree > 0:
-                self.ufc("2", delay_release=self.medium_delay)
-            else:
-                self.ufc("8", delay_release=self.medium_delay)
+            self.press_hemisphere(latlong.lat, "lat", delay_release=self.medium_delay)
             self.enter_number(lat_str, two_enters=True)
-            sleep(0.5)
+            self.delay(0.5)
 
-            if latlong.lon.degree > 0:
-                self.ufc("6", delay_release=self.medium_delay)
-            else:
-                self.ufc("4", delay_release=self.medium_delay)
+            self.press_hemisphere(latlong.lon, "lon", delay_release=self.medium_delay)
             self.enter_number(lon_str, two_enters=True)
 
             if elev or elev == 0:
@@ -242,17 +624,11 @@ class HornetDriver(Driver):
                 self.enter_number(elev)
         else:
             self.ufc("OS1")
-            if latlong.lat.degree > 0:
-                self.ufc("2", delay_release=self.medium_delay)
-            else:
-                self.ufc("8", delay_release=self.medium_delay)
+            self.press_hemisphere(latlong.lat, "lat", delay_release=self.medium_delay)
             self.enter_number(lat_str, two_enters=True)
 
             self.ufc("OS3")
-            if latlong.lon.degree > 0:
-                self.ufc("6", delay_release=self.medium_delay)
-            else:
-                self.ufc("4", delay_release=self.medium_delay)
+            self.press_hemisphere(latlong.lon, "lon", delay_release=self.medium_delay)
             self.enter_number(lon_str, two_enters=True)
 
             if elev or elev == 0:
@@ -273,13 +649,12 @@ class HornetDriver(Driver):
         self.ufc("CLR")
         self.ufc("CLR")
 
-        pwindow = progress_gui(len(wps), self.pposition)
+        progress = self.progress(len(wps))
 
         i = 1
         for wp in wps:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
             self.logger.info(f"Entering waypoint: {wp}")
             self.ampcd("12")
@@ -287,10 +662,10 @@ class HornetDriver(Driver):
             self.ufc("OS1")
             self.enter_coords(wp.position, wp.elevation, pp=False, decimal_minutes_mode=True)
             self.ufc("CLR")
-            pwindow['progress'].update(i)
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
 
         for sequencenumber, waypointslist in sequences.items():
             if sequencenumber != 1:
@@ -331,7 +706,7 @@ class HornetDriver(Driver):
         for k in sorted(stations, key=stations_order):
             sorted_stations.append(stations[k])
 
-        pwindow = progress_gui(len(sorted_stations), self.pposition)
+        progress = self.progress(len(sorted_stations))
 
         i = 1
         for msns in sorted_stations:
@@ -340,9 +715,8 @@ class HornetDriver(Driver):
 
             n = 1
             for msn in msns:
-                event, values = pwindow.Read(timeout=20)
-                if event is None or event == 'Cancel':
-                    pwindow.close()
+                if progress.cancelled():
+                    progress.close()
                     return
                 self.logger.info(f"Entering PP mission: {msn}")
                 msn.elevation = max(1, msn.elevation)
@@ -357,43 +731,33 @@ class HornetDriver(Driver):
             if n > 2:
                 self.lmdi("6")
             self.lmdi("13")
-            pwindow['progress'].update(i)
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
         self.lmdi("19")
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_missions(self.validate_waypoints(profile.msns_as_list))
-        sleep(1)
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list), profile.sequences_dict)
-        if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
+    def build(self, profile):
+        self.phase(self.enter_missions, self.validate_waypoints(profile.msns_as_list))
+        self.delay(1)
+        self.phase(self.enter_waypoints, self.validate_waypoints(profile.waypoints_as_list), profile.sequences_dict)
 
 
 class HarrierDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    bios_module = "AV8BNA"
+    keymaps = dict(
+        ufc=KeyMap("UFC_B{}", special=dict(ENTER="UFC_ENTER", CLEAR="UFC_CLEAR", DOT="UFC_DOT", DASH="UFC_DASH")),
+        odu=KeyMap("ODU_OPT{}"),
+        lmpcd=KeyMap("MPCD_L_{}"),
+    )
+    coords = dict(decimal_minutes_mode=False, easting_zfill=3)
+    hemisphere_keys = dict(N="2", S="8", E="6", W="4")
+    hemisphere_helper = "ufc"
+
+    def __init__(self, logger, config, clock=None):
+        super().__init__(logger, config, clock=clock)
         self.limits = dict(WP=None)
 
-    def ufc(self, num, delay_after=None, delay_release=None):
-        if num not in ("ENTER", "CLEAR", "DOT", "DASH"):
-            key = f"UFC_B{num}"
-        else:
-            key = f"UFC_{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
-    def odu(self, num, delay_after=None, delay_release=None):
-        key = f"ODU_OPT{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
-    def lmpcd(self, pb, delay_after=None, delay_release=None):
-        key = f"MPCD_L_{pb}"
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release)
-
     def enter_number(self, number, two_enters=False):
         for num in str(number):
             if num == ".":
@@ -413,20 +777,13 @@ class HarrierDriver(Driver):
             self.ufc("ENTER", delay_release=self.medium_delay)
 
     def enter_coords(self, latlong, elev):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=False, easting_zfill=3)
+        lat_str, lon_str = self.coords_strings(latlong)
         self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}")
 
-        if latlong.lat.degree > 0:
-            self.ufc("2", delay_release=self.medium_delay)
-        else:
-            self.ufc("8", delay_release=self.medium_delay)
+        self.press_hemisphere(latlong.lat, "lat", delay_release=self.medium_delay)
         self.enter_number(lat_str)
 
-        if latlong.lon.degree > 0:
-            self.ufc("6", delay_release=self.medium_delay)
-        else:
-            self.ufc("4", delay_release=self.medium_delay)
-
+        self.press_hemisphere(latlong.lon, "lon", delay_release=self.medium_delay)
         self.enter_number(lon_str)
 
         if elev:
@@ -436,13 +793,12 @@ class HarrierDriver(Driver):
     def enter_waypoints(self, wps):
         self.lmpcd("2")
 
-        pwindow = progress_gui(len(wps), self.pposition)
+        progress = self.progress(len(wps))
 
         i = 1
         for wp in wps:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
             self.logger.info(f"Entering waypoint: {wp}")
             self.ufc("7")
@@ -451,63 +807,45 @@ class HarrierDriver(Driver):
             self.odu("2")
             self.enter_coords(wp.position, wp.elevation)
             self.odu("1")
-            pwindow['progress'].update(i)
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
         self.lmpcd("2")
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
-        if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
+    def build(self, profile):
+        self.phase(self.enter_waypoints, self.validate_waypoints(profile.waypoints_as_list))
 
 
 class MirageDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    bios_module = "M-2000C"
+    keymaps = dict(
+        pcn=KeyMap("INS_BTN_{}", special=dict(ENTER="INS_ENTER_BTN", CLR="INS_CLR_BTN", PREP="INS_PREP_SW")),
+        ins_param=KeyMap("INS_PARAM_SEL {}", raw=True),
+    )
+    coords = dict(decimal_minutes_mode=True, easting_zfill=3, precision=3)
+    hemisphere_keys = dict(N="2", S="8", E="6", W="4")
+    hemisphere_helper = "pcn"
+    number_helper = "pcn"
+
+    def __init__(self, logger, config, clock=None):
+        super().__init__(logger, config, clock=clock)
         self.limits = dict(WP=9)
 
-    def pcn(self, num, delay_after=None, delay_release=None):
-        if num in ("ENTER", "CLR"):
-            key = f"INS_{num}_BTN"
-        elif num == "PREP":
-            key = "INS_PREP_SW"
-        else:
-            key = f"INS_BTN_{num}"
-
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release)
-
-    def ins_param(self, num, delay_after=None, delay_release=None):
-        key = f"INS_PARAM_SEL {num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release, raw=True)
-
     def enter_number(self, number):
-        for num in str(number):
-            if num == ".":
-                continue
-
-            self.pcn(num)
+        super().enter_number(number)
         self.pcn("ENTER")
 
     def enter_coords(self, latlong, elev=None):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3, precision=3)
+        lat_str, lon_str = self.coords_strings(latlong)
         self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}")
 
         self.pcn("1")
-        if latlong.lat.degree > 0:
-            self.pcn("2", delay_release=self.medium_delay)
-        else:
-            self.pcn("8", delay_release=self.medium_delay)
+        self.press_hemisphere(latlong.lat, "lat", delay_release=self.medium_delay)
         self.enter_number(lat_str)
 
         self.pcn("3")
-        if latlong.lon.degree > 0:
-            self.pcn("6", delay_release=self.medium_delay)
-        else:
-            self.pcn("4", delay_release=self.medium_delay)
+        self.press_hemisphere(latlong.lon, "lon", delay_release=self.medium_delay)
         self.enter_number(lon_str)
 
         if elev or elev == 0:
@@ -521,13 +859,12 @@ class MirageDriver(Driver):
 
     def enter_waypoints(self, wps):
 
-        pwindow = progress_gui(len(wps), self.pposition)
+        progress = self.progress(len(wps))
 
         i = 1
         for i, wp in enumerate(wps, 1):
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
             self.logger.info(f"Entering waypoint: {wp}")
             self.ins_param("4")
@@ -535,67 +872,55 @@ class MirageDriver(Driver):
             self.pcn("0")
             self.pcn(str(i))
             self.enter_coords(wp.position, wp.elevation)
-            pwindow['progress'].update(i)
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
         self.ins_param("4")
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
-        if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
+    def build(self, profile):
+        self.phase(self.enter_waypoints, self.validate_waypoints(profile.waypoints_as_list))
 
 
 class TomcatDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    bios_module = "F-14"
+    keymaps = dict(
+        cap=KeyMap("RIO_CAP_{}", special={
+            "0": "RIO_CAP_BRG_0",
+            "1": "RIO_CAP_LAT_1",
+            "2": "RIO_CAP_NBR_2",
+            "3": "RIO_CAP_SPD_3",
+            "4": "RIO_CAP_ALT_4",
+            "5": "RIO_CAP_RNG_5",
+            "6": "RIO_CAP_LONG_6",
+            "8": "RIO_CAP_HDG_8",
+            "TAC": "RIO_CAP_CATRGORY 3",
+        }, raw={"TAC"}),
+    )
+    coords = dict(one_digit_seconds=True)
+    hemisphere_keys = dict(N="NE", S="SW", E="NE", W="SW")
+    hemisphere_helper = "cap"
+
+    def __init__(self, logger, config, clock=None):
+        super().__init__(logger, config, clock=clock)
         self.limits = dict(WP=3, FP=1, IP=1, ST=1, HA=1, DP=1, HB=1)
 
-    def cap(self, num, delay_after=None, delay_release=None):
-        raw = False
-        cap_key_names = {
-            "0": "RIO_CAP_BRG_",
-            "1": "RIO_CAP_LAT_",
-            "2": "RIO_CAP_NBR_",
-            "3": "RIO_CAP_SPD_",
-            "4": "RIO_CAP_ALT_",
-            "5": "RIO_CAP_RNG_",
-            "6": "RIO_CAP_LONG_",
-            "8": "RIO_CAP_HDG_",
-        }
-
-        if num == "TAC":
-            key = "RIO_CAP_CATRGORY 3"
-            raw = True
-        else:
-            key = f"{cap_key_names.get(num, 'RIO_CAP_')}{num}"
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release, raw=raw)
-
     def enter_number(self, number):
         for num in str(number):
             self.cap(num)
         self.cap("ENTER")
 
     def enter_coords(self, latlong, elev):
-        lat_str, lon_str = latlon_tostring(latlong, one_digit_seconds=True)
+        lat_str, lon_str = self.coords_strings(latlong)
         self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}")
 
         self.cap("CLEAR")
         self.cap("1")
-        if latlong.lat.degree > 0:
-            self.cap("NE", delay_release=self.medium_delay)
-        else:
-            self.cap("SW", delay_release=self.medium_delay)
+        self.press_hemisphere(latlong.lat, "lat", delay_release=self.medium_delay)
         self.enter_number(lat_str)
 
         self.cap("6")
-
-        if latlong.lon.degree > 0:
-            self.cap("NE", delay_release=self.medium_delay)
-        else:
-            self.cap("SW", delay_release=self.medium_delay)
+        self.press_hemisphere(latlong.lon, "lon", delay_release=self.medium_delay)
         self.enter_number(lon_str)
 
         if elev:
@@ -613,13 +938,12 @@ class TomcatDriver(Driver):
         )
         self.cap("TAC")
 
-        pwindow = progress_gui(len(wps), self.pposition)
+        progress = self.progress(len(wps))
 
         i = 1
         for wp in wps:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
             self.logger.info(f"Entering waypoint: {wp}")
             if wp.wp_type == "WP":
@@ -628,35 +952,55 @@ class TomcatDriver(Driver):
                 self.cap(f"BTN_{cap_wp_type_buttons[wp.wp_type]}")
 
             self.enter_coords(wp.position, wp.elevation)
-            pwindow['progress'].update(i)
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
         self.cap("CLEAR")
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
-        if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
+    def build(self, profile):
+        self.phase(self.enter_waypoints, self.validate_waypoints(profile.waypoints_as_list))
 
 
 class WarthogDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    bios_module = "A-10C"
+    keymaps = dict(
+        aap=KeyMap("AAP_PAGE {}", raw=True),
+        cdu=KeyMap("CDU_{}"),
+    )
+    coords = dict(decimal_minutes_mode=True, easting_zfill=3, precision=3)
+    hemisphere_keys = dict(N="N", S="S", E="E", W="W")
+    hemisphere_helper = "type_input"
+    number_helper = "type_input"
+
+    def __init__(self, logger, config, clock=None):
+        super().__init__(logger, config, clock=clock)
         self.limits = dict(WP=99)
+        self.scratchpad_tracking = config.get("PREFERENCES", "warthog_scratchpad", fallback="tracked") != "legacy"
+        self.scratchpad = None
 
-    def aap(self, num, delay_after=None, delay_release=None):
-        key = f"AAP_PAGE {num}"
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release, raw=True)
+    def type_input(self, key, delay_after=None, delay_release=None):
+        self.cdu(key, delay_after=delay_after, delay_release=delay_release)
+        if self.scratchpad is not None:
+            self.scratchpad += key
 
-    def cdu(self, num, delay_after=None, delay_release=None):
-        key = f"CDU_{num}"
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release)
+    def line_select(self, lsk, delay_after=None):
+        # A line select that accepts the scratchpad leaves it empty
+        self.cdu(lsk, delay_after=delay_after)
+        self.scratchpad = ""
 
     def clear_input(self, repeat=3):
+        if self.scratchpad_tracking:
+            # An unknown scratchpad may hold an error message on top of text
+            if self.scratchpad is None:
+                repeat = 2
+            elif self.scratchpad:
+                repeat = 1
+            else:
+                repeat = 0
         for i in range(0, repeat):
             self.cdu("CLR")
+        self.scratchpad = ""
 
     def enter_waypoint_name(self, wp):
         result = re.sub(r'[^A-Za-z0-9 ]', '', wp.name)
@@ -666,86 +1010,112 @@ class WarthogDriver(Driver):
         self.clear_input()
         for character in result[0:12].upper():
             character = character.replace(" ", "SPC")
-            self.cdu(character, delay_after=self.short_delay)
-
-        self.cdu("LSK_3R")
+            self.type_input(character, delay_after=self.short_delay)
 
-    def enter_number(self, number):
-        for num in str(number):
-            if num != '.':
-                self.cdu(num)
+        self.line_select("LSK_3R")
 
     def enter_coords(self, latlong):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3, precision=3)
+        lat_str, lon_str = self.coords_strings(latlong)
         self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}")
 
         self.clear_input(repeat=2)
 
-        if latlong.lat.degree > 0:
-            self.cdu("N")
-        else:
-            self.cdu("S")
+        self.press_hemisphere(latlong.lat, "lat")
         self.enter_number(lat_str)
-        self.cdu("LSK_7L")
+        self.line_select("LSK_7L")
         self.clear_input(repeat=2)
 
-        if latlong.lon.degree > 0:
-            self.cdu("E")
-        else:
-            self.cdu("W")
+        self.press_hemisphere(latlong.lon, "lon")
         self.enter_number(lon_str)
-        self.cdu("LSK_9L")
+        self.line_select("LSK_9L")
         self.clear_input(repeat=2)
 
     def enter_elevation(self, elev):
         self.clear_input(repeat=2)
         self.enter_number(elev)
-        self.cdu("LSK_5L")
+        self.line_select("LSK_5L")
         self.clear_input(repeat=2)
 
+    def enter_waypoint(self, wp):
+        self.scratchpad = None
+        self.cdu("LSK_7R", self.short_delay)
+        self.enter_waypoint_name(wp)
+        self.enter_coords(wp.position)
+        self.enter_elevation(wp.elevation)
+
+    def legacy_estimate(self, wp):
+        ops, self.ops = self.ops, list()
+        self.scratchpad_tracking = False
+        try:
+            self.enter_waypoint(wp)
+        finally:
+            self.scratchpad_tracking = True
+            legacy, self.ops = self.ops, ops
+        return self.estimate(legacy)
+
     def enter_waypoints(self, wps):
         self.aap("0")
         self.cdu("WP", self.short_delay)
         self.cdu("LSK_3L", self.medium_delay)
         self.logger.debug("Number of waypoints: " + str(len(wps)))
 
-        pwindow = progress_gui(len(wps), self.pposition)
+        progress = self.progress(len(wps))
 
+        totals = [0, 0, 0, 0]
         i = 1
         for wp in wps:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
             self.logger.info(f"Entering waypoint: {wp}")
-            self.cdu("LSK_7R", self.short_delay)
-            self.enter_waypoint_name(wp)
-            self.enter_coords(wp.position)
-            self.enter_elevation(wp.elevation)
-            pwindow['progress'].update(i)
+            start = len(self.ops)
+            self.enter_waypoint(wp)
+            presses, seconds = self.estimate(self.ops[start:])
+            if self.scratchpad_tracking:
+                legacy_presses, legacy_seconds = self.legacy_estimate(wp)
+                self.logger.info(f"Waypoint {i}: {presses} presses, {seconds:.1f}s "
+                                 f"(legacy {legacy_presses} presses, {legacy_seconds:.1f}s)")
+                totals = [totals[0] + presses, totals[1] + seconds,
+                          totals[2] + legacy_presses, totals[3] + legacy_seconds]
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
+        if self.scratchpad_tracking and wps:
+            self.logger.info(f"{len(wps)} waypoints: {totals[0]} presses, {totals[1]:.1f}s "
+                             f"(legacy {totals[2]} presses, {totals[3]:.1f}s)")
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
-        if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
+    def build(self, profile):
+        self.phase(self.enter_waypoints, self.validate_waypoints(profile.waypoints_as_list))
 
 
 class ViperDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    bios_module = "F-16C_50"
+    keymaps = dict(
+        icp_btn=KeyMap("ICP_BTN_{}", special=dict(ENTR="ICP_ENTR_BTN")),
+    )
+    coords = dict(decimal_minutes_mode=True, easting_zfill=3, precision=3, dfill=True)
+    hemisphere_keys = dict(N="2", S="8", E="6", W="4")
+    hemisphere_helper = "icp_btn"
+    number_helper = "icp_btn"
+
+    def __init__(self, logger, config, clock=None):
+        super().__init__(logger, config, clock=clock)
         self.limits = dict(WP=127)
+        self.stpt_entry = config.get("PREFERENCES", "viper_stpt_entry", fallback="step")
+        self.stpt_start = int(config.get("PREFERENCES", "viper_stpt_start", fallback="1"))
 
-    def icp_btn(self, num, delay_after=None, delay_release=None):
-        key = f"ICP_BTN_{num}"
-        if num == "ENTR":
-            key = "ICP_ENTR_BTN"
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release)
+    icp_rockers = dict(
+        ded=dict(DN=("ICP_DED_SW", 0), UP=("ICP_DED_SW", 2)),
+        data=dict(DN=("ICP_DATA_UP_DN_SW", 0), UP=("ICP_DATA_UP_DN_SW", 2), RTN=("ICP_DATA_RTN_SEQ_SW", 0)),
+    )
 
     def icp_ded(self, num, delay_after=None, delay_release=None):
+        control, position = self.icp_rockers["ded"].get(num, (None, None))
+        if position is not None and self.controls.can_set(control, position):
+            self.rocker(control, position, delay_after=delay_after, delay_release=delay_after)
+            return
+
         if num == "DN":
             self.press_with_delay("ICP_DED_SW 0", delay_after=delay_after,
                                   delay_release=delay_release, raw=True)
@@ -757,6 +1127,12 @@ class ViperDriver(Driver):
                               delay_release=delay_release, raw=True)
 
     def icp_data(self, num, delay_after=None, delay_release=None):
+        # With set_state support only the moved rocker is centered again
+        control, position = self.icp_rockers["data"].get(num, (None, None))
+        if position is not None and self.controls.can_set(control, position):
+            self.rocker(control, position, delay_after=delay_after, delay_release=delay_after)
+            return
+
         if num == "DN":
             self.press_with_delay("ICP_DATA_UP_DN_SW 0", delay_after=delay_after,
                                   delay_release=delay_release, raw=True)
@@ -772,11 +1148,6 @@ class ViperDriver(Driver):
         self.press_with_delay("ICP_DATA_RTN_SEQ_SW 1", delay_after=delay_after,
                               delay_release=delay_release, raw=True)
 
-    def enter_number(self, number):
-        for num in str(number):
-            if num != '.':
-                self.icp_btn(num)
-
     def enter_elevation(self, elev):
         if elev < 0:
             self.icp_btn("0")
@@ -784,37 +1155,47 @@ class ViperDriver(Driver):
         self.icp_btn("ENTR")
 
     def enter_coords(self, latlong):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3, precision=3, dfill=True)
+        lat_str, lon_str = self.coords_strings(latlong)
         self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}")
 
-        if latlong.lat.degree > 0:
-            self.icp_btn("2")
-        else:
-            self.icp_btn("8")
+        self.press_hemisphere(latlong.lat, "lat")
         self.enter_number(lat_str)
         self.icp_btn("ENTR")
         self.icp_data("DN")
 
-        if latlong.lon.degree > 0:
-            self.icp_btn("6")
-        else:
-            self.icp_btn("4")
-
+        self.press_hemisphere(latlong.lon, "lon")
         self.enter_number(lon_str)
         self.icp_btn("ENTR")
         self.icp_data("DN")
 
-    def enter_waypoints(self, wps):
+    def enter_waypoints(self, wps, start=None):
+        start = start or self.stpt_start
+        last = self.limits["WP"]
+        if start + len(wps) - 1 > last:
+            self.logger.warning(f"Only {max(0, last - start + 1)} steerpoints fit from STPT {start}, "
+                                f"skipping {len(wps) - max(0, last - start + 1)}")
+            wps = wps[:max(0, last - start + 1)]
+        if not wps:
+            return
+
+        if self.stpt_entry == "direct":
+            self.enter_waypoints_direct(wps, start)
+        else:
+            self.enter_waypoints_stepped(wps, start)
+
+    def enter_waypoints_stepped(self, wps, start):
         self.icp_data("RTN")
         self.icp_btn("4", delay_release=1)
+        if start != 1:
+            self.enter_number(start)
+            self.icp_btn("ENTR")                    # Select first STPT
 
-        pwindow = progress_gui(len(wps), self.pposition)
+        progress = self.progress(len(wps))
 
         i = 1
         for wp in wps:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
             self.logger.info(f"Entering waypoint: {wp}")
 
@@ -830,61 +1211,79 @@ class ViperDriver(Driver):
             self.icp_data("UP")                     # To MAN/AUTO
             self.icp_data("UP")                     # To STPT number
             self.icp_ded("UP")                      # Increment STPT number
-            pwindow['progress'].update(i)
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
 
         self.icp_ded("DN")                          # Backup to last STPT
         self.icp_data("RTN")
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_waypoints(self.validate_waypoints(profile.all_waypoints_as_list))
-        if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
+    def enter_waypoints_direct(self, wps, start):
+        self.icp_data("RTN")
+        self.icp_btn("4", delay_release=1)
 
+        progress = self.progress(len(wps))
 
-class ApachePilotDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
-        self.limits = dict(WP=None, HZ=None, CM=None, TG=None)
+        for i, wp in enumerate(wps, 1):
+            if progress.cancelled():
+                progress.close()
+                return
+            self.logger.info(f"Entering waypoint: {wp}")
 
-    def kbu(self, num, delay_after=None, delay_release=None):
-        key = f"PLT_KU_{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
+            self.enter_number(start + i - 1)
+            self.icp_btn("ENTR")                    # Select STPT by number
+            self.icp_data("DN")                     # To MAN/AUTO
+            self.icp_data("DN")                     # To LAT
 
-    def lmpd(self, pb, delay_after=None, delay_release=None):
-        key = f"PLT_MPD_L_{pb}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
+            self.enter_coords(wp.position)
+            if wp.elevation or wp.elevation == 0:
+                self.enter_elevation(wp.elevation)
 
-    def rmpd(self, pb, delay_after=None, delay_release=None):
-        key = f"PLT_MPD_R_{pb}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
+            self.icp_data("RTN")                    # Back to CNI
+            if i < len(wps):
+                self.icp_btn("4")                   # STPT page, cursor on STPT number
+            progress.update(i)
 
-    def enter_number(self, number):
-        for num in str(number):
-            if num != ".":
-                self.kbu(num)
+        progress.close()
+
+    def build(self, profile):
+        self.phase(self.enter_waypoints, self.validate_waypoints(profile.all_waypoints_as_list))
+
+
+def apache_keymaps(seat):
+    return dict(
+        kbu=KeyMap(f"{seat}_KU_{{}}"),
+        lmpd=KeyMap(f"{seat}_MPD_L_{{}}"),
+        rmpd=KeyMap(f"{seat}_MPD_R_{{}}"),
+    )
+
+
+class ApacheDriver(Driver):
+    """AH-64D driver for one seat, PLT (pilot) or CPG (copilot/gunner)."""
+
+    bios_module = "AH-64D"
+    keymaps = apache_keymaps("PLT")
+    coords = dict(decimal_minutes_mode=True, easting_zfill=3, precision=2, dfill=True)
+    hemisphere_keys = dict(N="N", S="S", E="E", W="W")
+    hemisphere_helper = "kbu"
+    number_helper = "kbu"
+
+    def __init__(self, logger, config, seat="PLT", clock=None):
+        super().__init__(logger, config, clock=clock)
+        self.limits = dict(WP=None, HZ=None, CM=None, TG=None)
+        self.seat = seat
+        self.keymaps = apache_keymaps(seat)
 
     def enter_coords(self, latlong, elev=None):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3, precision=2, dfill=True)
+        lat_str, lon_str = self.coords_strings(latlong)
         self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}")
 
-        if latlong.lat.degree > 0:
-            self.kbu("N", delay_release=self.medium_delay)
-        else:
-            self.kbu("S", delay_release=self.medium_delay)
+        self.press_hemisphere(latlong.lat, "lat", delay_release=self.medium_delay)
         self.enter_number(lat_str)
-        sleep(0.5)
+        self.delay(0.5)
 
-        if latlong.lon.degree > 0:
-            self.kbu("E", delay_release=self.medium_delay)
-        else:
-            self.kbu("W", delay_release=self.medium_delay)
+        self.press_hemisphere(latlong.lon, "lon", delay_release=self.medium_delay)
         self.enter_number(lon_str)
 
         self.kbu("ENT")
@@ -903,19 +1302,18 @@ class ApachePilotDriver(Driver):
         self.rmpd("TSD")
         self.rmpd("B6") # POINT
 
-        pwindow = progress_gui(len(wps), self.pposition)
+        progress = self.progress(len(wps))
 
         i = 1
         for wp in wps:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
             self.logger.info(f"Entering waypoint: {wp}")
             self.rmpd("L2") # ADD
             self.rmpd(wp_type_buttons[wp.wp_type]) # WP TYPE
             self.rmpd("L1") # IDENT
-            self.kbu("ENT") 
+            self.kbu("ENT")
             if wp.name:
                 free = wp.name.replace(' ', '')
                 for char in free[0:3].upper():
@@ -924,144 +1322,99 @@ class ApachePilotDriver(Driver):
             self.kbu("CLR")
 
             self.enter_coords(wp.position, wp.elevation)
-            pwindow['progress'].update(i)
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
-        if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
-
-
-class ApacheGunnerDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
-        self.limits = dict(WP=None, HZ=None, CM=None, TG=None)
-
-    def kbu(self, num, delay_after=None, delay_release=None):
-        key = f"CPG_KU_{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
-    def lmpd(self, pb, delay_after=None, delay_release=None):
-        key = f"CPG_MPD_L_{pb}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
-    def rmpd(self, pb, delay_after=None, delay_release=None):
-        key = f"CPG_MPD_R_{pb}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
-    def enter_number(self, number):
-        for num in str(number):
-            if num != ".":
-                self.kbu(num)
-
-    def enter_coords(self, latlong, elev=None):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3, precision=2, dfill=True)
-        self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}")
+    def build(self, profile):
+        self.phase(self.enter_waypoints, self.validate_waypoints(profile.waypoints_as_list))
 
-        if latlong.lat.degree > 0:
-            self.kbu("N", delay_release=self.medium_delay)
-        else:
-            self.kbu("S", delay_release=self.medium_delay)
-        self.enter_number(lat_str)
-        sleep(0.5)
 
-        if latlong.lon.degree > 0:
-            self.kbu("E", delay_release=self.medium_delay)
-        else:
-            self.kbu("W", delay_release=self.medium_delay)
-        self.enter_number(lon_str)
+class CrewOps(list):
+    """Op tables of several seats, one after the other, that keep the table of each seat."""
 
-        self.kbu("ENT")
+    def __init__(self, tables):
+        super().__init__(op for ops in tables.values() for op in ops)
+        self.tables = tables
 
-        if elev:
-            self.kbu("CLR")
-            self.enter_number(elev)
 
-        self.kbu("ENT")
+class ApacheCrewDriver(Driver):
+    """Enters the same route into both AH-64D seats at once.
 
-    def enter_waypoints(self, wps):
-        wp_type_buttons = dict(WP='L3', HZ='L4', CM='L5', TG='L6')
-        if not wps:
-            return
+    The seats are separate cockpit devices, so their key streams are
+    interleaved and both seats load in about the time of one. TheWay and
+    the send journal get the pilot stream followed by the CPG stream.
+    """
 
-        self.rmpd("TSD")
-        self.rmpd("B6") # POINT
+    seats = ("PLT", "CPG")
+    command_sources = ("apachep", "apacheg")
 
-        pwindow = progress_gui(len(wps), self.pposition)
+    def __init__(self, logger, config, clock=None):
+        super().__init__(logger, config, clock=clock)
+        self.crew = [ApacheDriver(logger, config, seat=seat, clock=clock) for seat in self.seats]
+        self.limits = self.crew[0].limits
 
-        i = 1
-        for wp in wps:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
-                return
-            self.logger.info(f"Entering waypoint: {wp}")
-            self.rmpd("L2") # ADD
-            self.rmpd(wp_type_buttons[wp.wp_type]) # WP TYPE
-            self.rmpd("L1") # IDENT
-            self.kbu("ENT") 
-            if wp.name:
-                free = wp.name.replace(' ', '')
-                for char in free[0:3].upper():
-                    self.kbu(char)
-            self.kbu("ENT")
-            self.kbu("CLR")
+    def compile_seats(self, profile):
+        tables = dict()
+        for driver in self.crew:
+            driver.method = self.method
+            tables[driver.seat] = driver.compile(profile)
+        return tables
 
-            self.enter_coords(wp.position, wp.elevation)
-            pwindow['progress'].update(i)
-            i += 1
+    def compile(self, profile):
+        return CrewOps(self.compile_seats(profile))
 
-        pwindow.close()
+    def enter_all(self, profile, ops=None):
+        if ops is None:
+            ops = self.compile(profile)
+        tables = ops.tables
+        if self.journal is not None:
+            self.record(ops)
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
         if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
+            self.execute(ops)
+            return ops
+
+        for seat, result in self.run_parallel(tables).items():
+            if result["cancelled"]:
+                self.logger.warning(f"{seat}: cancelled after {result['sent']} of {result['total']} controls")
+            elif result["sent"] != result["total"]:
+                self.logger.warning(f"{seat}: sent {result['sent']} of {result['total']} controls")
+            else:
+                self.logger.info(f"{seat}: all {result['total']} controls sent")
+        return ops
+
+    def stop(self):
+        super().stop()
+        for driver in self.crew:
+            driver.stop()
 
 
 class BlackSharkDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    bios_module = "Ka-50"
+    keymaps = dict(
+        pvi=KeyMap("PVI_{}"),
+        pvi_mode=KeyMap("PVI_MODES {}", raw=True),
+    )
+    coords = dict(decimal_minutes_mode=True, easting_zfill=3, precision=1)
+    hemisphere_keys = dict(N="0", S="1", E="0", W="1")
+    hemisphere_helper = "pvi"
+    number_helper = "pvi"
+
+    def __init__(self, logger, config, clock=None):
+        super().__init__(logger, config, clock=clock)
         self.limits = dict(WP=6, TG=9)
 
-    def pvi(self, num, delay_after=None, delay_release=None):
-        key = f"PVI_{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
-    def pvi_mode(self, num, delay_after=None, delay_release=None):
-        key = f"PVI_MODES {num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release, raw=True)
-
-    def enter_number(self, number):
-        for num in str(number):
-            if num != ".":
-                self.pvi(num)
-
     def enter_coords(self, latlong, elev=None):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3, precision=1)
+        lat_str, lon_str = self.coords_strings(latlong)
         self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}")
 
-        if latlong.lat.degree > 0:
-            self.pvi("0")
-        else:
-            self.pvi("1")
+        self.press_hemisphere(latlong.lat, "lat")
         self.enter_number(lat_str)
-        sleep(0.2)
+        self.delay(0.2)
 
-        if latlong.lon.degree > 0:
-            self.pvi("0")
-        else:
-            self.pvi("1")
+        self.press_hemisphere(latlong.lon, "lon")
         self.enter_number(lon_str)
 
         self.pvi("ENTER_BTN")
@@ -1075,13 +1428,12 @@ class BlackSharkDriver(Driver):
         #Set NAV Master Mode ENT
         self.pvi_mode("2")
 
-        pwindow = progress_gui(len(wps), self.pposition)
+        progress = self.progress(len(wps))
 
         i = 1
         for wp in wps:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
             self.logger.info(f"Entering waypoint: {wp}")
             if wp.wp_type != prev_type:
@@ -1089,80 +1441,61 @@ class BlackSharkDriver(Driver):
                 prev_type = wp.wp_type
             self.pvi(str(wp.number))
             self.enter_coords(wp.position)
-            pwindow['progress'].update(i)
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
         #Set NAV Master Mode OPER
         self.pvi_mode("3")
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
-        if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
+    def build(self, profile):
+        self.phase(self.enter_waypoints, self.validate_waypoints(profile.waypoints_as_list))
 
 class StrikeEagleDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    bios_module = "F-15E"
+    keymaps = dict(
+        ufc=KeyMap("F_UFC_KEY_{}", special={
+            "1": "F_UFC_KEY_A1",
+            "2": "F_UFC_KEY_N2",
+            "3": "F_UFC_KEY_B3",
+            "4": "F_UFC_KEY_W4",
+            "5": "F_UFC_KEY_M5",
+            "6": "F_UFC_KEY_E6",
+            "8": "F_UFC_KEY_S8",
+            "9": "F_UFC_KEY_C9",
+        }),
+        ufc_pb=KeyMap("F_UFC_B{}"),
+        lmpd_pb=KeyMap("F_MPD_L_B{}"),
+    )
+    coords = dict(decimal_minutes_mode=True, easting_zfill=3, precision=3)
+    hemisphere_keys = dict(N="2", S="8", E="6", W="4")
+    hemisphere_helper = "ufc"
+    number_helper = "ufc"
+
+    def __init__(self, logger, config, clock=None):
+        super().__init__(logger, config, clock=clock)
         self.limits = dict(WP=None, MSN=1)
 
-    def ufc(self, num, delay_after=None, delay_release=None):
-        ufc_key_names = {
-            "1": "F_UFC_KEY_A",
-            "2": "F_UFC_KEY_N",
-            "3": "F_UFC_KEY_B",
-            "4": "F_UFC_KEY_W",
-            "5": "F_UFC_KEY_M",
-            "6": "F_UFC_KEY_E",
-            "7": "F_UFC_KEY_",
-            "8": "F_UFC_KEY_S",
-            "9": "F_UFC_KEY_C",
-            "0": "F_UFC_KEY_",
-        }
-
-        key = f"{ufc_key_names.get(num, 'F_UFC_KEY_')}{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
-    def ufc_pb(self, num, delay_after=None, delay_release=None):
-        key = f"F_UFC_B{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
-
     def lmpd(self, num, delay_after=None, delay_release=None, repeat=1):
-        key = f"F_MPD_L_B{num}"
         for _ in range(repeat):
-            self.press_with_delay(key, delay_after=delay_after,
-                                  delay_release=delay_release)
-
-    def enter_number(self, number):
-        for num in str(number):
-            if num != ".":
-                self.ufc(num)
+            self.lmpd_pb(num, delay_after=delay_after, delay_release=delay_release)
 
     def enter_coords(self, latlong, elev, pp):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3, precision=3)
+        lat_str, lon_str = self.coords_strings(latlong)
         self.logger.debug(f"{self.method} - Entering coords string: {lat_str}, {lon_str}, {elev}")
 
         self.ufc("SHF")
-        if latlong.lat.degree > 0:
-            self.ufc("2")
-        else:
-            self.ufc("8")
+        self.press_hemisphere(latlong.lat, "lat")
         self.enter_number(lat_str)
         if not pp:
             self.ufc_pb("2")
         else:
             self.lmpd("8")
             self.lmpd("5")
-        sleep(0.2)
+        self.delay(0.2)
 
         self.ufc("SHF")
-        if latlong.lon.degree > 0:
-            self.ufc("6")
-        else:
-            self.ufc("4")
+        self.press_hemisphere(latlong.lon, "lon")
         self.enter_number(lon_str)
         if not pp:
             self.ufc_pb("3")
@@ -1198,13 +1531,12 @@ class StrikeEagleDriver(Driver):
         self.ufc_pb("10")
         self.ufc_pb("10")
 
-        pwindow = progress_gui(len(wps), self.pposition)
+        progress = self.progress(len(wps))
 
         i = 1
         for wp in wps:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
             seq = seqmap[str(wp.sequence)] if wp.sequence > 0 else 'A1'
             self.logger.info(f"Entering waypoint: {wp}")
@@ -1213,10 +1545,10 @@ class StrikeEagleDriver(Driver):
             self.ufc(seq)
             self.ufc_pb("1")
             self.enter_coords(wp.position, wp.elevation, pp=False)
-            pwindow['progress'].update(i)
+            progress.update(i)
             i += 1
 
-        pwindow.close()
+        progress.close()
         #Select 1A
         self.ufc("DATA")
         self.ufc("1")
@@ -1258,13 +1590,12 @@ class StrikeEagleDriver(Driver):
         self.lmpd("9")
         self.lmpd("5", repeat=6)
 
-        pwindow = progress_gui(len(sorted_stations), self.pposition)
+        progress = self.progress(len(sorted_stations))
 
         i = 1
         for msns in sorted_stations:
-            event, values = pwindow.Read(timeout=20)
-            if event is None or event == 'Cancel':
-                pwindow.close()
+            if progress.cancelled():
+                progress.close()
                 return
 
             for msn in msns:
@@ -1272,19 +1603,16 @@ class StrikeEagleDriver(Driver):
                 msn.elevation = max(1, msn.elevation)
                 self.enter_coords(msn.position, msn.elevation, pp=True)
                 self.lmpd("10", delay_after=self.medium_delay)
-                sleep(1)
-            pwindow['progress'].update(i)
+                self.delay(1)
+            progress.update(i)
             i += 1
             self.lmpd("2")
             self.lmpd("4", repeat=2)
 
-        pwindow.close()
+        progress.close()
         self.lmpd("14", delay_after=self.medium_delay)
 
-    def enter_all(self, profile):
-        self.keylist = []
-        self.enter_missions(self.validate_waypoints(profile.msns_as_list))
-        sleep(1)
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
-        if self.method != "DCS-BIOS":
-            self.enter_keypress(self.keylist)
+    def build(self, profile):
+        self.phase(self.enter_missions, self.validate_waypoints(profile.msns_as_list))
+        self.delay(1)
+        self.phase(self.enter_waypoints, self.validate_waypoints(profile.waypoints_as_list))
@@ -0,0 +1,79 @@
+'''
+*
+* export.py: DCS Waypoint Editor - Profile Export Module                    *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import csv
+import json
+from src.geo import GeoPoint
+
+# The writers take any text stream (an open file, or io.StringIO for the
+# clipboard) and write it one waypoint at a time from the profile's rows.
+
+CSV_FIELDS = ("name", "wp_type", "number", "sequence", "station", "latitude", "longitude", "elevation")
+READABLE_POSITION = "d%°%m%'%S%\"%H"
+
+
+def waypoint_label(wp_type, number, sequence=0, station=0, name=None):
+    """Text a waypoint is listed by, e.g. "WP1 | SEQ1 | Name" or "MSN2 | STA8"."""
+    if wp_type == "MSN":
+        label = f"MSN{number} | STA{station}"
+    else:
+        label = f"{wp_type}{number}"
+        if wp_type == "WP" and sequence:
+            label += f" | SEQ{sequence}"
+    if name:
+        label += f" | {name}"
+    return label
+
+
+def readable_line(record):
+    latitude, longitude = GeoPoint(record["latitude"], record["longitude"]).to_string(READABLE_POSITION)
+    label = waypoint_label(record["wp_type"], record["number"], record["sequence"], record.get("station"),
+                           record["name"])
+    return f"{label}: {latitude} {longitude} | {record['elevation']}ft\n"
+
+
+def write_readable(profile, out):
+    """Writes the plain text listing, waypoints first and then missions by station."""
+    out.write("Waypoints:\n\n")
+    for record in profile.waypoints.records(~profile.msn_mask()):
+        out.write(readable_line(record))
+
+    out.write("\nPreplanned missions:\n\n")
+    # Stations are numbers, or strings such as "L1" which sort after them
+    for record in sorted(profile.waypoints.records(profile.msn_mask()),
+                         key=lambda record: (isinstance(record["station"], str), record["station"])):
+        out.write(readable_line(record))
+
+
+def write_csv(profile, out):
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    for record in profile.waypoints.records():
+        writer.writerow(record)
+
+
+def write_json(profile, out):
+    """Writes the same text as str(profile) without building it in memory first."""
+    out.write('{"waypoints": [')
+    for i, record in enumerate(profile.waypoints.records()):
+        if i:
+            out.write(", ")
+        out.write(json.dumps(record))
+    out.write(f'], "name": {json.dumps(profile.profilename)}, "aircraft": {json.dumps(profile.aircraft)}}}')
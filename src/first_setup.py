@@ -31,8 +31,8 @@ import zipfile
 
 DCS_BIOS_VERSION = '0.8.0'
 DCS_BIOS_URL = "https://github.com/DCS-Skunkworks/dcs-bios/releases/download/v{}/DCS-BIOS_{}.zip"
-aircraft = ["warthog", "apacheg", "apachep", "harrier", "hornet", "tomcat", "strikeeagle", "viper", "blackshark", "mirage"]
-aircraft_name = ["A-10C", "AH-64D CPG", "AH-64D Pilot", "AV-8B", "F/A-18C", "F-14A/B", "F-15E", "F-16C", "Ka-50", "M-2000C"]
+aircraft = ["warthog", "apache", "apacheg", "apachep", "harrier", "hornet", "tomcat", "strikeeagle", "viper", "blackshark", "mirage"]
+aircraft_name = ["A-10C", "AH-64D Both Seats", "AH-64D CPG", "AH-64D Pilot", "AV-8B", "F/A-18C", "F-14A/B", "F-15E", "F-16C", "Ka-50", "M-2000C"]
 
 logger = get_logger(__name__)
 
@@ -133,7 +133,7 @@ def first_time_setup_gui(settings):
             enable_events=True, key='gui_theme', size=(30, 1))],
 
         [sg.Text("Send To Aircraft Via:", (20,1), justification="right"),
-         sg.Combo(values=["DCS-BIOS", "TheWay.lua"], readonly=True, default_value=settings.get(section, 'enter_method'),
+         sg.Combo(values=["DCS-BIOS", "TheWay.lua", "Auto"], readonly=True, default_value=settings.get(section, 'enter_method'),
             enable_events=True, key='enter_method', size=(30, 1))],
 
         [sg.Text("DCS-BIOS:", (20,1), justification="right"), sg.Text(dcs_bios_detected, key="dcs_bios"),
@@ -157,6 +157,7 @@ def first_time_setup(settings):
         settings = ConfigParser()
         settings.add_section(section)
         settings.set(section, "grace_period", "5")
+        settings.set(section, "min_dwell", "0.5")
         settings.set(section, "button_release_short_delay", "0.2")
         settings.set(section, "button_release_medium_delay", "0.5")
         settings.set(section, "tesseract_path", default_tesseract_path)
@@ -170,6 +171,10 @@ def first_time_setup(settings):
         settings.set(section, "gui_theme", sg.theme())
         settings.set(section, "default_aircraft", "hornet")
         settings.set(section, "enter_method", "DCS-BIOS")
+        settings.set(section, "duplicate_distance", "30")
+        settings.set(section, "viper_stpt_entry", "step")
+        settings.set(section, "viper_stpt_start", "1")
+        settings.set(section, "warthog_scratchpad", "tracked")
 
     setup_logger = get_logger("setup")
     setup_logger.info("Running first time setup...")
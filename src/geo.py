@@ -0,0 +1,211 @@
+'''
+*
+* geo.py: DCS Waypoint Editor - Lightweight Coordinate Module               *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+from LatLon23 import LatLon, Latitude, Longitude
+
+
+def degree_parts(decimal_degree):
+    """(degree, minute, decimal_minute, second) the way LatLon23 breaks an angle down.
+
+    Degree, minute and second carry the sign of the angle, decimal_minute
+    does not.
+    """
+    sign = (decimal_degree > 0) - (decimal_degree < 0)
+    decimal_degree = abs(decimal_degree)
+    degree = decimal_degree // 1
+    decimal_minute = (decimal_degree - degree) * 60.
+    minute = decimal_minute // 1
+    second = (decimal_minute - minute) * 60.
+    return degree * sign, minute * sign, decimal_minute, second * sign
+
+
+class GeoAngle:
+    """Immutable latitude or longitude with the same attributes as a LatLon23 GeoCoord.
+
+    Only the decimal degrees are stored; the degree/minute/second breakdown
+    is computed the first time it is read and then kept.
+    """
+
+    __slots__ = ("decimal_degree", "_parts")
+
+    hemispheres = ("N", "S")
+
+    def __init__(self, degree=0, minute=0, second=0):
+        init_angle(self, float(degree) + float(minute) / 60. + float(second) / 3600.)
+
+    @classmethod
+    def from_decimal(cls, decimal_degree):
+        angle = new_object(cls)
+        init_angle(angle, decimal_degree)
+        return angle
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @property
+    def parts(self):
+        parts = self._parts
+        if parts is None:
+            parts = degree_parts(self.decimal_degree)
+            set_parts(self, parts)
+        return parts
+
+    @property
+    def degree(self):
+        return self.parts[0]
+
+    @property
+    def minute(self):
+        return self.parts[1]
+
+    @property
+    def decimal_minute(self):
+        return self.parts[2]
+
+    @property
+    def second(self):
+        return self.parts[3]
+
+    def get_hemisphere(self):
+        return self.hemispheres[1] if self.decimal_degree < 0 else self.hemispheres[0]
+
+    def to_string(self, format_str):
+        format2value = {'H': self.get_hemisphere(),
+                        'M': abs(self.decimal_minute),
+                        'm': int(abs(self.minute)),
+                        'd': int(self.degree),
+                        'D': self.decimal_degree,
+                        'S': abs(self.second)}
+        format_elements = format_str.split('%')
+        coord_str = ''.join(str(format2value.get(element, element)) for element in format_elements)
+        if 'H' in format_elements:
+            coord_str = coord_str.replace('-', '')
+        return coord_str
+
+    def __float__(self):
+        return self.decimal_degree
+
+    def __eq__(self, other):
+        if type(other) != type(self):
+            return NotImplemented
+        return self.decimal_degree == other.decimal_degree
+
+    def __hash__(self):
+        return hash((type(self), self.decimal_degree))
+
+    def __str__(self):
+        return str(self.decimal_degree)
+
+    def __repr__(self):
+        return f"{type(self).__name__} {self.decimal_degree}"
+
+    def __reduce__(self):
+        return type(self).from_decimal, (self.decimal_degree,)
+
+
+class GeoLatitude(GeoAngle):
+    __slots__ = ()
+
+
+class GeoLongitude(GeoAngle):
+    __slots__ = ()
+
+    hemispheres = ("E", "W")
+
+    def __init__(self, degree=0, minute=0, second=0):
+        # Wrapped to -180..180 and rebuilt from its parts, as LatLon23 does
+        decimal_degree = float(degree) + float(minute) / 60. + float(second) / 3600.
+        degree, minute, _, second = degree_parts(((decimal_degree + 180) % 360) - 180)
+        init_angle(self, degree + minute / 60. + second / 3600.)
+
+
+class GeoPoint:
+    """Immutable position used in place of a LatLon23 LatLon.
+
+    `lat` and `lon` are GeoLatitude/GeoLongitude, so code written against
+    LatLon (lat.degree, lon.decimal_minute, to_string, ...) works unchanged.
+    """
+
+    __slots__ = ("lat", "lon")
+
+    def __init__(self, lat, lon):
+        set_lat(self, lat if isinstance(lat, GeoLatitude) else GeoLatitude(lat))
+        set_lon(self, lon if isinstance(lon, GeoLongitude) else GeoLongitude(lon))
+
+    @classmethod
+    def from_decimal(cls, latitude, longitude):
+        point = new_object(cls)
+        latitude_angle, longitude_angle = new_object(GeoLatitude), new_object(GeoLongitude)
+        init_angle(latitude_angle, latitude)
+        init_angle(longitude_angle, longitude)
+        set_lat(point, latitude_angle)
+        set_lon(point, longitude_angle)
+        return point
+
+    @classmethod
+    def from_latlon(cls, latlon):
+        return cls.from_decimal(latlon.lat.decimal_degree, latlon.lon.decimal_degree)
+
+    def to_latlon(self):
+        return LatLon(Latitude(self.lat.decimal_degree), Longitude(self.lon.decimal_degree))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GeoPoint is immutable")
+
+    def to_string(self, formatter='D'):
+        return self.lat.to_string(formatter), self.lon.to_string(formatter)
+
+    def __eq__(self, other):
+        if type(other) != GeoPoint:
+            return NotImplemented
+        return self.lat == other.lat and self.lon == other.lon
+
+    def __hash__(self):
+        return hash((self.lat, self.lon))
+
+    def __str__(self):
+        return f"{self.lat}, {self.lon}"
+
+    def __repr__(self):
+        return f"{self.lat!r}, {self.lon!r}"
+
+    def __reduce__(self):
+        return GeoPoint.from_decimal, (self.lat.decimal_degree, self.lon.decimal_degree)
+
+
+# The classes refuse attribute assignment, so their slots are filled through
+# the slot descriptors, which is also the cheapest way to build them.
+new_object = object.__new__
+set_decimal_degree = GeoAngle.decimal_degree.__set__
+set_parts = GeoAngle._parts.__set__
+set_lat = GeoPoint.lat.__set__
+set_lon = GeoPoint.lon.__set__
+
+
+def init_angle(angle, decimal_degree):
+    set_decimal_degree(angle, decimal_degree)
+    set_parts(angle, None)
+
+
+def as_geopoint(position):
+    """Converts a LatLon23 LatLon at the edges; GeoPoints are returned as they are."""
+    if type(position) == GeoPoint:
+        return position
+    return GeoPoint.from_latlon(position)
@@ -0,0 +1,107 @@
+'''
+*
+* geometry.py: DCS Waypoint Editor - Route Geometry Module                  *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import numpy as np
+from pyproj import Geod
+
+GEOD = Geod(ellps="WGS84")
+METRES_PER_NM = 1852.
+
+
+class RouteLegs:
+    """Legs of one route through the points at `indices`, in route order.
+
+    Leg i runs from point indices[i] to point indices[i + 1]; its bearing is
+    the initial true bearing in degrees (0-360) and its distance is in metres.
+    """
+
+    def __init__(self, indices, bearings, distances):
+        self.indices = indices
+        self.bearings = bearings
+        self.distances = distances
+
+    def __len__(self):
+        return len(self.distances)
+
+    @property
+    def total(self):
+        return float(self.distances.sum())
+
+
+def route_legs(latitudes, longitudes, routes):
+    """Legs of several routes through the same points, solved with one Geod.inv call.
+
+    `routes` maps a key to the indices into latitudes/longitudes of the points
+    of a route, in order. Returns a dict with the RouteLegs of every key.
+    """
+    latitudes, longitudes = np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float)
+    routes = {key: np.asarray(indices, dtype=np.int64) for key, indices in routes.items()}
+    starts = np.concatenate([np.empty(0, dtype=np.int64)] + [indices[:-1] for indices in routes.values()])
+    ends = np.concatenate([np.empty(0, dtype=np.int64)] + [indices[1:] for indices in routes.values()])
+    bearings, _, distances = GEOD.inv(longitudes[starts], latitudes[starts], longitudes[ends], latitudes[ends])
+    bearings = np.mod(bearings, 360.)
+
+    legs, offset = dict(), 0
+    for key, indices in routes.items():
+        count = max(len(indices) - 1, 0)
+        legs[key] = RouteLegs(indices, bearings[offset:offset + count], distances[offset:offset + count])
+        offset += count
+    return legs
+
+
+class RouteGeometry:
+    """Legs of a profile: one route per waypoint type and one per sequence, MSNs excluded.
+
+    `types` maps a waypoint type and `sequences` a sequence identifier to its
+    RouteLegs, with indices that are rows of the profile's waypoint store.
+    """
+
+    def __init__(self, store):
+        wp_types, sequences = store.column("wp_type"), store.column("sequence")
+        waypoints = wp_types != store.msn_code
+        routes = dict()
+        for code in np.unique(wp_types[waypoints]).tolist():
+            routes["type", store.types[code]] = np.flatnonzero(wp_types == code)
+        for identifier in np.unique(sequences[waypoints & (sequences != 0)]).tolist():
+            routes["sequence", identifier] = np.flatnonzero(waypoints & (sequences == identifier))
+        legs = route_legs(store.column("latitude"), store.column("longitude"), routes)
+
+        self.types = {key: route for (kind, key), route in legs.items() if kind == "type"}
+        self.sequences = {key: route for (kind, key), route in legs.items() if kind == "sequence"}
+        self.uids = store.column("uid").copy()
+        self.inbound_bearings = np.full(store.count, np.nan)
+        self.inbound_distances = np.full(store.count, np.nan)
+        for route in self.types.values():
+            self.inbound_bearings[route.indices[1:]] = route.bearings
+            self.inbound_distances[route.indices[1:]] = route.distances
+
+    def inbound(self, uid):
+        """(bearing, distance) of the leg from the previous waypoint of the same type, or None."""
+        i = int(np.searchsorted(self.uids, uid))
+        if i >= len(self.uids) or self.uids[i] != uid or np.isnan(self.inbound_distances[i]):
+            return None
+        return float(self.inbound_bearings[i]), float(self.inbound_distances[i])
+
+    def totals(self):
+        """Total length in nautical miles of every route, keyed by type ("WP") or sequence ("SEQ1")."""
+        totals = {wp_type: route.total / METRES_PER_NM for wp_type, route in self.types.items()}
+        totals.update({f"SEQ{identifier}": route.total / METRES_PER_NM
+                       for identifier, route in self.sequences.items()})
+        return totals
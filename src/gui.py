@@ -22,13 +22,20 @@ from src.objects import Profile, Waypoint, MSN, load_base_file, generate_default
 from src.first_setup import first_time_setup, detect_the_way
 from src.capture import capture_map_coords, parse_map_coords_string
 from src.logger import get_logger
+from src.journal import SendJournal
+from src.mission import list_groups, inject_route
+from src.send_queue import SendJob
 from peewee import DoesNotExist
-from LatLon23 import LatLon, Longitude, Latitude
+from src.geo import GeoPoint, GeoLatitude, GeoLongitude
+from src.export import write_csv, write_json
+from src.geometry import METRES_PER_NM
+from src.simplify import plan_profile, apply_plan
 import src.pymgrs as mgrs
 import pytesseract
 import keyboard
 import os
 import subprocess
+from bisect import bisect_right
 import json
 import socket
 import urllib.request
@@ -40,6 +47,7 @@ from slpp import slpp as lua
 import FreeSimpleGUI as sg
 import winsound
 import zlib
+import zipfile
 
 UX_SND_ERROR = "data/ux_error.wav"
 UX_SND_SUCCESS = "data/ux_success.wav"
@@ -66,17 +74,13 @@ def strike(text):
     return result
 
 
-def unstrike(text):
-    return text.replace('\u0336', '')
-
-
 def exception_gui(exc_info):
     return sg.PopupOK("An exception occured and the program terminated execution:\n\n" + exc_info)
 
 
-def progress_gui(count, location):
+def progress_gui(count, location, label='Processing:'):
     progress_layout = [
-        [sg.Text('Processing:')],
+        [sg.Text(label)],
         [sg.ProgressBar(count, orientation='h', size=(20, 20), key='progress')],
         [sg.Cancel()]
     ]
@@ -124,8 +128,8 @@ class GUI:
         self.editor = editor
         self.captured_map_coords = None
         self.profile = Profile('')
-        self.aircraft = ["warthog", "apacheg", "apachep", "harrier", "hornet", "tomcat", "strikeeagle", "viper", "blackshark", "mirage"]
-        self.aircraft_name = ["A-10C", "AH-64D CPG", "AH-64D Pilot", "AV-8B", "F/A-18C", "F-14A/B", "F-15E", "F-16C", "Ka-50", "M-2000C"]
+        self.aircraft = ["warthog", "apache", "apacheg", "apachep", "harrier", "hornet", "tomcat", "strikeeagle", "viper", "blackshark", "mirage"]
+        self.aircraft_name = ["A-10C", "AH-64D Both Seats", "AH-64D CPG", "AH-64D Pilot", "AV-8B", "F/A-18C", "F-14A/B", "F-15E", "F-16C", "Ka-50", "M-2000C"]
         self.wp_types = ["WP", "MSN", "FP", "ST", "IP", "DP", "HA", "HB", "HZ", "CM", "TG"]
         self.stations = {
             "hornet": [8, 2, 7, 3],
@@ -134,6 +138,9 @@ class GUI:
         self.quick_capture = False
         self.values = None
         self.capturing = False
+        self.listed_waypoints = dict()
+        self.listed_keys = list()
+        self.listed_values = list()
         self.hotkey_ispressed = False
         self.enable_the_way = detect_the_way(self.editor.settings.get('PREFERENCES', 'dcs_path'))
         self.capture_key = try_get_setting(self.editor.settings, "capture_key", "ctrl+t")
@@ -144,10 +151,13 @@ class GUI:
         self.gui_theme = try_get_setting(self.editor.settings, "gui_theme", sg.theme())
         self.default_aircraft = try_get_setting(self.editor.settings, "default_aircraft", "hornet")
         self.enter_method = try_get_setting(self.editor.settings, "enter_method", "DCS-BIOS")
+        self.duplicate_distance = float(try_get_setting(self.editor.settings, "duplicate_distance", "30"))
+        self.send_journal = try_get_setting(self.editor.settings, "send_journal", "false")
         self.software_version = software_version
         self.is_focused = True
         self.scaled_dcs_gui = False
         self.selected_wp_type = "WP"
+        self.send_status = "Send queue: idle"
         self.profile.aircraft = self.default_aircraft
         self.editor.set_driver(self.default_aircraft)
 
@@ -181,7 +191,7 @@ class GUI:
 
     @staticmethod
     def get_profile_names():
-        return [profile.name for profile in Profile.list_all()]
+        return Profile.list_names()
 
     def calculate_popup_position(self, popup_window_size):
         main_x, main_y = self.window.CurrentLocation()
@@ -330,8 +340,9 @@ class GUI:
                          enable_events=True, key='profileSelector', size=(29),
                          auto_size_text=False),
              sg.Button(button_text="F", key="profileFilter")],
-            [sg.Listbox(values=list(), size=(33, 14),
+            [sg.Listbox(values=list(), size=(40, 14),
                            enable_events=True, key='activesList')],
+            [sg.Text("", key="route_totals", auto_size_text=False, size=(40, 2))],
             # [sg.Button("Move up", size=(12, 1)),
             # sg.Button("Move down", size=(12, 1))],
         ]
@@ -343,16 +354,20 @@ class GUI:
              sg.Button("Update", size=(8, 1)),
              sg.Button("Remove", size=(8, 1)),
              sg.Button("Send To Aircraft", size=(14, 1), key="Send")],
+            [sg.Text("Send queue: idle", key="send_status", auto_size_text=False, size=(38, 1)),
+             sg.Button("Cancel Send", size=(10, 1), key="cancel_send", disabled=True)],
         ]
 
         menudef = [['&File',
-                    ['&Settings', '---', '&Run Target Jar', '---', 'E&xit']],
+                    ['&Settings', '---', '&Run Target Jar', 'Replay Send &Journal...', '---', 'E&xit']],
+                   ['&Edit',
+                    ['&Undo', '&Redo']],
                    ['&Profile',
-                    ['&Save Profile', '&Delete Profile', 'Save Profile &As...', '---',
+                    ['&Save Profile', '&Delete Profile', 'Save Profile &As...', '---', 'Simplify &Route...', 'Remove D&uplicates...', '---',
                         "&Import", ["Paste as &String from clipboard", "Load from &Encoded file", "---",
                                     "Import NS430 from clipboard", "Import NS430 from file"],
                         "&Export", ["Copy as &String to clipboard", "Copy plain &Text to clipboard",
-                                    "Save as &Encoded file"]]],
+                                    "Save as &Encoded file", "Save as &CSV file", "---", "Inject route into &mission..."]]],
                    ['&?',
                     ['&About']]
                   ]
@@ -368,7 +383,10 @@ class GUI:
             [sg.Text(f"Version: {self.software_version}")]
         ]
 
-        return sg.Window('DCS Waypoint Editor', layout, finalize=True)
+        window = sg.Window('DCS Waypoint Editor', layout, finalize=True)
+        window.bind("<Control-z>", "Undo")
+        window.bind("<Control-y>", "Redo")
+        return window
 
     def set_sequence_station_selector(self, mode, station=None):
         if mode is None:
@@ -465,18 +483,41 @@ class GUI:
         if station is not None:
             self.set_sequence_station_selector('station', station=station)
 
+    @staticmethod
+    def list_key(wp):
+        return wp.wp_type if wp.wp_type != "MSN" else str(wp.station)
+
+    def list_label(self, wp):
+        namestr = str(wp)
+
+        if not self.editor.driver.validate_waypoint(wp):
+            namestr = strike(namestr)
+
+        leg = self.profile.inbound_leg(wp)
+        if leg is not None:
+            bearing, distance = leg
+            namestr += f"  {round(bearing) % 360:03d}° {distance / METRES_PER_NM:.1f}nm"
+        return namestr
+
+    def update_route_totals(self):
+        totals = self.profile.geometry.totals()
+        self.window.Element("route_totals").Update(
+            value="  ".join(f"{route} {length:.1f}nm" for route, length in totals.items()))
+
     def update_waypoints_list(self, set_to_first=False):
         values = list()
+        self.listed_waypoints = dict()
         self.profile.update_waypoint_numbers()
 
-        for wp in sorted(self.profile.waypoints,
-                         key=lambda waypoint: waypoint.wp_type if waypoint.wp_type != "MSN" else str(waypoint.station)):
-            namestr = str(wp)
-
-            if not self.editor.driver.validate_waypoint(wp):
-                namestr = strike(namestr)
-
+        waypoints = sorted(self.profile.waypoints, key=self.list_key)
+        for wp in waypoints:
+            namestr = self.list_label(wp)
             values.append(namestr)
+            self.listed_waypoints[namestr] = wp
+        self.listed_keys = [self.list_key(wp) for wp in waypoints]
+        self.listed_values = values
+
+        self.update_route_totals()
 
         if set_to_first:
             self.window.Element('activesList').Update(values=values, set_to_index=0)
@@ -484,6 +525,23 @@ class GUI:
             self.window.Element('activesList').Update(values=values)
         self.window.Element("aircraftSelector").Update(value=self.aircraft_name[self.aircraft.index(self.profile.aircraft)])
 
+    def list_waypoint(self, wp):
+        """Lists a waypoint just appended to the profile without relabelling the others.
+
+        An appended waypoint is the last of its type, so no other label or
+        inbound leg changes and it goes after the last listed row of its group.
+        """
+        i = bisect_right(self.listed_keys, self.list_key(wp))
+        namestr = self.list_label(wp)
+        self.listed_keys.insert(i, self.list_key(wp))
+        self.listed_values.insert(i, namestr)
+        self.listed_waypoints[namestr] = wp
+
+        listbox = self.window.Element('activesList')
+        listbox.Widget.insert(i, namestr)
+        listbox.Values = self.listed_values
+        self.update_route_totals()
+
     def disable_coords_input(self):
         for element_name in\
                 ("latDeg", "latMin", "latSec", "lonDeg", "lonMin", "lonSec", "mgrs", "elevFeet", "elevMeters", "Send"):
@@ -504,8 +562,8 @@ class GUI:
     def filter_profile_dropdown(self):
         text = self.values["profileSelector"]
         self.window.Element("profileSelector").\
-            Update(values=[""] + sorted([profile.name for profile in Profile.list_all() if
-                           text.lower() in profile.name.lower()]), set_to_index=0)
+            Update(values=[""] + [name for name in self.get_profile_names() if
+                                  text.lower() in name.lower()], set_to_index=0)
 
     def next_station(self, station):
         if self.stations.get(self.profile.aircraft):
@@ -516,7 +574,7 @@ class GUI:
         station_idx = station_list.index(station)
         self.set_sequence_station_selector('station', station_list[station_idx - 1])
 
-    def add_waypoint(self, position, elevation, name=None):
+    def add_waypoint(self, position, elevation, name=None, unique=False):
         if name is None:
             name = str()
 
@@ -545,8 +603,14 @@ class GUI:
                 if sequence not in self.profile.sequences:
                     self.profile.sequences.append(sequence)
 
-            self.profile.waypoints.append(wp)
-            self.update_waypoints_list()
+            if unique and self.duplicate_distance > 0:
+                duplicate = self.profile.append_unique(wp, self.duplicate_distance)
+                if duplicate is not None:
+                    self.window.Element('capture_status').Update(f"Status: Duplicate of {duplicate}")
+                    return True
+            else:
+                self.profile.waypoints.append(wp)
+            self.list_waypoint(wp)
         except ValueError:
             psize = (273, 101)
             pposition = self.calculate_popup_position(psize)
@@ -574,27 +638,114 @@ class GUI:
             self.editor.set_driver(self.profile.aircraft)
             self.update_waypoints_list(set_to_first=True)
             self.update_profiles_list(self.profile.profilename)
-            sg.Popup('Loaded waypoint data from encoded string successfully.', location=pposition)
+            sg.Popup('Loaded waypoint data from encoded string successfully.' + self.duplicates_text(),
+                     location=pposition)
         except Exception as e:
             self.logger.error(e, exc_info=True)
             sg.Popup('Failed to parse profile from string.', location=pposition)
 
+    def duplicates_text(self):
+        duplicates = self.profile.duplicates()
+        if not duplicates:
+            return ""
+        return "\nSame waypoints as saved profile: " + ", ".join(duplicates)
+
+    def inject_mission_route(self):
+        psize = (431, 133)
+        pposition = self.calculate_popup_position(psize)
+        filename = sg.PopupGetFile("Enter mission file name:", "Injecting route", location=pposition,
+                                   file_types=(("DCS Mission", "*.miz"),))
+        if not filename:
+            return
+
+        try:
+            groups = list_groups(filename)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            self.logger.error(f"Failed to read mission file: {e}")
+            sg.Popup("Failed to read mission file.", location=pposition)
+            return
+
+        if not groups:
+            sg.Popup("No flight groups found in mission.", location=pposition)
+            return
+
+        layout = [
+            [sg.Text("Flight group:")],
+            [sg.Combo(values=groups, default_value=groups[0], readonly=True, key="group", size=(30, 1))],
+            [sg.OK(), sg.Cancel()]
+        ]
+        window = sg.Window("Injecting route", layout, location=pposition, modal=True, finalize=True)
+        event, values = window.read()
+        window.close()
+        if event != "OK":
+            return
+
+        try:
+            waypoints, rejected = inject_route(filename, values["group"], self.profile, self.editor.driver)
+        except (OSError, KeyError, ValueError) as e:
+            self.logger.error(f"Failed to inject route: {e}", exc_info=True)
+            sg.Popup(f"Failed to inject route: {e}", location=pposition)
+            return
+
+        message = f"Injected {len(waypoints)} waypoints into {values['group']}."
+        if rejected:
+            message += f"\n{len(rejected)} waypoints exceed aircraft limits and were skipped."
+        sg.Popup(message, location=pposition)
+
+    def simplify_route(self):
+        psize = (313, 101)
+        pposition = self.calculate_popup_position(psize)
+        plan = plan_profile(self.profile, self.editor.driver.limits)
+        if not plan:
+            sg.Popup("The route already fits the aircraft limits.", location=pposition)
+            return
+
+        lines = list()
+        for wp_type, (indices, result) in plan.items():
+            if result.error == float("inf"):
+                error = "named waypoints dropped"
+            else:
+                error = f"max error {result.error / METRES_PER_NM:.2f}nm"
+            lines.append(f"{wp_type}: {len(indices)} -> {len(result)} waypoints, {error}")
+        confirm = sg.PopupOKCancel("Simplify route to the aircraft limits?\n\n" + "\n".join(lines),
+                                   location=pposition)
+        if confirm == "OK":
+            apply_plan(self.profile, plan)
+            self.update_waypoints_list()
+
+    def remove_duplicates(self):
+        psize = (313, 101)
+        pposition = self.calculate_popup_position(psize)
+        distance = sg.PopupGetText("Remove waypoints within this many meters of an earlier waypoint of the same type:",
+                                   "Removing duplicates", default_text=str(self.duplicate_distance or 30),
+                                   location=pposition)
+        if distance is None:
+            return
+        try:
+            removed = self.profile.remove_duplicates(float(distance))
+        except ValueError:
+            sg.Popup("Error: invalid distance.", location=pposition)
+            return
+        self.update_waypoints_list()
+        sg.Popup(f"Removed {removed} duplicate waypoints.", location=pposition)
+
     def import_NS430(self, text):
         # Load NS430 dat
         lines = list(text.split('\n'))
-        for i in range(len(lines)):
-            fields = list(lines[i].strip().split(";"))
-            if len(fields) == 4 and fields[0] == "FIX":
-                self.logger.info("NS430: " + lines[i])
-                try:
-                    position = LatLon(Latitude(degree=fields[2]),
-                                      Longitude(degree=fields[1]))
-                    self.add_waypoint(position, 0, fields[3])
-                except Exception as e:
-                    self.logger.error(e, exc_info=True)
-                    psize = (313, 101)
-                    pposition = self.calculate_popup_position(psize)
-                    sg.Popup('Data error importing NS430 fixes.', location=pposition)
+        with self.profile.edit():
+            for i in range(len(lines)):
+                fields = list(lines[i].strip().split(";"))
+                if len(fields) == 4 and fields[0] == "FIX":
+                    self.logger.info("NS430: " + lines[i])
+                    try:
+                        position = GeoPoint(GeoLatitude(degree=fields[2]),
+                                            GeoLongitude(degree=fields[1]))
+                        self.add_waypoint(position, 0, fields[3])
+                    except Exception as e:
+                        self.logger.error(e, exc_info=True)
+                        psize = (313, 101)
+                        pposition = self.calculate_popup_position(psize)
+                        sg.Popup('Data error importing NS430 fixes.', location=pposition)
 
     def load_new_profile(self):
         self.profile = Profile('')
@@ -618,7 +769,7 @@ class GUI:
                 self.update_altitude_elements("meters")
                 self.window.Element('capture_status').Update("Status: Captured")
                 if self.quick_capture:
-                    added = self.add_waypoint(position, elevation, name=name)
+                    added = self.add_waypoint(position, elevation, name=name, unique=True)
                     if not added:
                         self.stop_capture()
 
@@ -646,8 +797,8 @@ class GUI:
             if data:
                 wpdata = json.loads(data.decode('utf8'))
                 coords = wpdata.get('coords')
-                position = LatLon(Latitude(degree=coords.get('lat')),
-                                  Longitude(degree=coords.get('long')))
+                position = GeoPoint(GeoLatitude(degree=coords.get('lat')),
+                                    GeoLongitude(degree=coords.get('long')))
                 elevation = float(wpdata.get('elev')) * 3.281
 
                 if position is not None:
@@ -655,7 +806,7 @@ class GUI:
                     self.update_position(position, elevation, name=name, update_mgrs=True)
                     self.update_altitude_elements("meters")
                     self.window.Element('capture_status').Update("Status: Captured")
-                    added = self.add_waypoint(position, elevation, name=name)
+                    added = self.add_waypoint(position, elevation, name=name, unique=True)
                     if not added:
                         self.stop_capture()
 
@@ -758,8 +909,8 @@ class GUI:
         lon_sec = lon_dir + self.window.Element("lonSec").Get()
 
         try:
-            position = LatLon(Latitude(degree=lat_deg, minute=lat_min, second=lat_sec),
-                              Longitude(degree=lon_deg, minute=lon_min, second=lon_sec))
+            position = GeoPoint(GeoLatitude(degree=lat_deg, minute=lat_min, second=lat_sec),
+                                GeoLongitude(degree=lon_deg, minute=lon_min, second=lon_sec))
 
             try:
                 elevation = int(self.window.Element("elevFeet").Get())
@@ -802,22 +953,79 @@ class GUI:
         self.window.Element("wpType").Update(value=wp_type)
 
     def find_selected_waypoint(self):
-        valuestr = unstrike(self.values['activesList'][0])
-        for wp in self.profile.waypoints:
-            if str(wp) == valuestr:
-                return wp
+        return self.listed_waypoints.get(self.values['activesList'][0])
 
     def remove_selected_waypoint(self):
-        valuestr = unstrike(self.values['activesList'][0])
-        for wp in self.profile.waypoints:
-            if str(wp) == valuestr:
-                self.profile.waypoints.remove(wp)
+        waypoint = self.find_selected_waypoint()
+        if waypoint is not None:
+            self.profile.waypoints.remove(waypoint)
+
+    def enter_coords_to_aircraft(self, wait_ready=False):
+        self.editor.queue.submit(SendJob(self.profile, self.enter_method, wait_ready=wait_ready))
+        self.update_send_status()
+
+    def update_send_status(self):
+        status = list()
+        for endpoint, job, pending in self.editor.queue.status():
+            name = self.aircraft_name[self.aircraft.index(endpoint)] if endpoint in self.aircraft else endpoint
+            if job is None:
+                text = f"{name}: waiting"
+            elif endpoint in self.editor.routes and job.method == "Auto":
+                text = f"{name} via {self.editor.routes[endpoint][0]}: {job.progress_text}"
+            else:
+                text = f"{name}: {job.progress_text}"
+            if pending:
+                text += f" +{pending} queued"
+            status.append(text)
+
+        if status:
+            text = "Sending " + " | ".join(status)
+        elif self.enter_method == "Auto" and self.profile.aircraft in self.editor.routes:
+            method, reason = self.editor.routes[self.profile.aircraft]
+            text = f"Send queue: idle, last sent via {method} ({reason})"
+        else:
+            text = "Send queue: idle"
+        if text != self.send_status:
+            self.send_status = text
+            self.window.Element('send_status').Update(text)
+            self.window.Element('cancel_send').Update(disabled=not status)
+
+    def replay_journal(self):
+        psize = (431, 133)
+        pposition = self.calculate_popup_position(psize)
+        filename = sg.PopupGetFile("Enter journal file name:", "Replaying send journal", location=pposition,
+                                   file_types=(("JSON File", "*.json"),))
+        if not filename:
+            return
+
+        try:
+            journal = SendJournal.load(filename)
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.error(f"Failed to load send journal: {e}")
+            sg.Popup("Failed to load send journal.", location=pposition)
+            return
+
+        timing = sg.PopupGetText("Button release delays (short, medium):", "Replaying send journal",
+                                 default_text=f"{journal.timing.get('short')}, {journal.timing.get('medium')}",
+                                 location=pposition)
+        if timing is None:
+            return
+
+        try:
+            short, medium = (float(delay) for delay in timing.split(","))
+        except ValueError:
+            sg.Popup("Error: invalid delays.", location=pposition)
+            return
+
+        if self.editor.queue.busy:
+            sg.Popup("Wait for queued sends to finish.", location=pposition)
+            return
 
-    def enter_coords_to_aircraft(self):
         psize = (250, 194)
         self.editor.driver.pposition = self.calculate_popup_position(psize)
         self.window.Element('Send').Update(disabled=True)
-        self.editor.enter_all(self.profile, self.enter_method)
+        self.editor.replay_journal(journal, self.enter_method, dict(short=short, medium=medium))
+        self.editor.set_driver(self.profile.aircraft)
         self.window.Element('Send').Update(disabled=False)
 
     def set_enter_aircraft_flag(self):
@@ -827,11 +1035,12 @@ class GUI:
     def run(self):
         self.window.Element("aircraftSelector").Update(value=self.aircraft_name[self.aircraft.index(self.default_aircraft)])
         while True:
-            event, self.values = self.window.Read(timeout=750)
+            event, self.values = self.window.Read(timeout=250)
 
             if self.hotkey_ispressed:
                 self.hotkey_ispressed = False
-                self.enter_coords_to_aircraft()
+                self.enter_coords_to_aircraft(wait_ready=True)
+            self.update_send_status()
 
             if event != "__TIMEOUT__":
                 self.logger.debug(f"Event: {event}")
@@ -845,11 +1054,15 @@ class GUI:
                     first_time_setup(self.editor.settings)
                     self.default_aircraft = try_get_setting(self.editor.settings, "default_aircraft", "hornet")
                     self.enter_method = try_get_setting(self.editor.settings, "enter_method", "DCS-BIOS")
+                    self.duplicate_distance = float(try_get_setting(self.editor.settings, "duplicate_distance", "30"))
     
                 elif event == "Run Target Jar":
                     if os.path.exists('.\Target-jar-with-dependencies.jar'):
                         subprocess.Popen(['java', '-jar', '.\Target-jar-with-dependencies.jar'], shell=True)
     
+                elif event == "Replay Send Journal...":
+                    self.replay_journal()
+    
                 elif event == "Copy as String to clipboard":
                     self.export_to_string()
     
@@ -881,9 +1094,10 @@ class GUI:
                         waypoint = self.find_selected_waypoint()
                         position, elevation, name = self.validate_coords()
                         if position is not None:
-                            waypoint.position = position
-                            waypoint.elevation = elevation
-                            waypoint.name = name
+                            with self.profile.edit():
+                                waypoint.position = position
+                                waypoint.elevation = elevation
+                                waypoint.name = name
                             self.update_waypoints_list()
     
                 elif event == "Remove":
@@ -891,9 +1105,17 @@ class GUI:
                         self.remove_selected_waypoint()
                         self.update_waypoints_list()
     
+                elif event in ("Undo", "Redo"):
+                    changed = self.profile.undo() if event == "Undo" else self.profile.redo()
+                    if changed:
+                        self.update_waypoints_list()
+
                 elif event == "Send":
                     self.enter_coords_to_aircraft()
     
+                elif event == "cancel_send":
+                    self.editor.queue.cancel_all()
+    
                 elif event == "activesList":
                     if self.values['activesList']:
                         waypoint = self.find_selected_waypoint()
@@ -957,7 +1179,28 @@ class GUI:
                         continue
     
                     with open(filename, "w+") as f:
-                        f.write(str(self.profile))
+                        write_json(self.profile, f)
+
+                elif event == "Save as CSV file":
+                    psize = (431, 133)
+                    pposition = self.calculate_popup_position(psize)
+                    filename = sg.PopupGetFile("Enter file name:", "Exporting profile", default_extension=".csv",
+                                                save_as=True, location=pposition, file_types=(("CSV File", "*.csv"),))
+
+                    if filename is None:
+                        continue
+
+                    with open(filename, "w", newline="", encoding="utf-8") as f:
+                        write_csv(self.profile, f)
+    
+                elif event == "Inject route into mission...":
+                    self.inject_mission_route()
+
+                elif event == "Simplify Route...":
+                    self.simplify_route()
+
+                elif event == "Remove Duplicates...":
+                    self.remove_duplicates()
     
                 elif event == "Copy plain Text to clipboard":
                     profile_string = self.profile.to_readable_string()
@@ -981,6 +1224,8 @@ class GUI:
     
                     if self.profile.profilename:
                         self.update_profiles_list(self.profile.profilename)
+                    if self.duplicates_text():
+                        sg.Popup('Loaded profile.' + self.duplicates_text(), location=pposition)
     
                 elif event == "capture":
                     if not self.capturing:
@@ -1046,7 +1291,7 @@ class GUI:
                     if mgrs_string:
                         try:
                             decoded_mgrs = mgrs.UTMtoLL(mgrs.decode(mgrs_string.replace(" ", "")))
-                            position = LatLon(Latitude(degree=decoded_mgrs["lat"]), Longitude(
+                            position = GeoPoint(GeoLatitude(degree=decoded_mgrs["lat"]), GeoLongitude(
                                 degree=decoded_mgrs["lon"]))
                             self.update_position(position, elevation, 
                                                     name=self.window.Element("msnName").Get(), 
@@ -0,0 +1,109 @@
+'''
+*
+* journal.py: DCS Waypoint Editor - Send Journal Module                     *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import datetime
+import json
+import os
+
+JOURNAL_VERSION = 1
+JOURNAL_DIR = "journals"
+
+
+class SendJournal:
+    """Compact record of the key stream produced by a driver for one send.
+
+    Each entry is [key, raw, release, after]. Timings are kept as the name of
+    the timing table entry they came from ("short", "medium") so the journal
+    can be replayed with a different table; literal delays are kept as
+    numbers. Entries with a null key are plain pauses.
+    """
+
+    def __init__(self, aircraft, method, profile_hash="", timing=None, keys=None, created=None):
+        self.aircraft = aircraft
+        self.method = method
+        self.profile_hash = profile_hash
+        self.timing = dict(timing or dict())
+        self.keys = keys if keys is not None else list()
+        self.created = created or datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def record(self, key, raw, release, after):
+        self.keys.append([key, int(raw), release, after])
+
+    def pause(self, seconds):
+        self.keys.append([None, 0, None, seconds])
+
+    def resolve(self, value, timing=None):
+        if value is None:
+            return None
+        if type(value) == str:
+            return (timing or self.timing)[value]
+        return value
+
+    def retimed(self, timing):
+        return SendJournal(self.aircraft, self.method, self.profile_hash,
+                           timing=dict(self.timing, **timing), keys=self.keys, created=self.created)
+
+    @property
+    def presses(self):
+        return sum(1 for key, _, _, _ in self.keys if key is not None)
+
+    @property
+    def duration(self):
+        total = 0
+        for key, raw, release, after in self.keys:
+            total += self.resolve(after) or 0
+            if key is not None and not raw:
+                total += self.resolve(release) or 0
+        return total
+
+    def to_dict(self):
+        return dict(
+            version=JOURNAL_VERSION,
+            aircraft=self.aircraft,
+            method=self.method,
+            profile_hash=self.profile_hash,
+            created=self.created,
+            timing=self.timing,
+            keys=self.keys
+        )
+
+    @staticmethod
+    def from_dict(data):
+        if data.get("version") != JOURNAL_VERSION:
+            raise ValueError(f"Unsupported journal version: {data.get('version')}")
+        return SendJournal(data["aircraft"], data["method"], data.get("profile_hash", ""),
+                           timing=data.get("timing"), keys=data["keys"], created=data.get("created"))
+
+    def save(self, filename=None):
+        if filename is None:
+            os.makedirs(JOURNAL_DIR, exist_ok=True)
+            filename = os.path.join(JOURNAL_DIR, f"{self.aircraft}-{self.created}.json")
+
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        return filename
+
+    @staticmethod
+    def load(filename):
+        with open(filename, "r") as f:
+            return SendJournal.from_dict(json.load(f))
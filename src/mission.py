@@ -0,0 +1,257 @@
+'''
+*
+* mission.py: DCS Waypoint Editor - Mission File Route Injection Module     *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import os
+import shutil
+import tempfile
+import zipfile
+from pyproj import Transformer
+from slpp import slpp as lua
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+MISSION_ENTRY = "mission"
+GROUP_CATEGORIES = ("plane", "helicopter")
+COPY_CHUNK = 1 << 20
+
+# Transverse Mercator parameters of the DCS theatre coordinate systems
+# (central meridian, false easting, false northing). DCS x is northing, y is easting.
+THEATRES = {
+    "Caucasus": (33, -99516.9999999732, -4998114.999999984),
+    "PersianGulf": (57, 75755.99999999645, -2894933.0000000377),
+    "Nevada": (-117, -193996.80999964548, -4410028.063999966),
+    "Normandy": (-3, -195526.00000000204, -5484812.999999951),
+    "Syria": (39, 282801.00000003993, -3879865.9999999935),
+    "MarianaIslands": (147, 238417.99999989968, -1491840.000000048),
+    "TheChannel": (3, 99376.00000000288, -5636889.00000001),
+    "Falklands": (-57, 147639.99999997593, 5815417.000000032),
+}
+
+
+def theatre_transformer(theatre):
+    try:
+        central_meridian, false_easting, false_northing = THEATRES[theatre]
+    except KeyError:
+        raise ValueError(f"Unsupported theatre: {theatre}")
+    return Transformer.from_crs(
+        "EPSG:4326",
+        f"+proj=tmerc +lat_0=0 +lon_0={central_meridian} +k_0=0.9996 +x_0={false_easting} "
+        f"+y_0={false_northing} +ellps=WGS84 +units=m +no_defs",
+        always_xy=True)
+
+
+class LuaSpans:
+    """Minimal scanner for the Lua table in a mission entry.
+
+    It only records where each value starts and ends, so a single table can be
+    replaced in the original text while everything else is kept byte for byte.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def skip(self, i):
+        text = self.text
+        while i < len(text):
+            if text[i].isspace():
+                i += 1
+            elif text.startswith("--[[", i):
+                i = text.index("]]", i) + 2
+            elif text.startswith("--", i):
+                end = text.find("\n", i)
+                i = len(text) if end < 0 else end + 1
+            else:
+                break
+        return i
+
+    def string_end(self, i):
+        text = self.text
+        if text[i] == "[":
+            level = text.index("[", i + 1) - i - 1
+            return text.index("]" + "=" * level + "]", i) + level + 2
+        quote = text[i]
+        i += 1
+        while text[i] != quote:
+            i += 2 if text[i] == "\\" else 1
+        return i + 1
+
+    def value_end(self, i):
+        text = self.text
+        if text[i] == "{":
+            for _ in self.items(i):
+                pass
+            return self.end
+        if text[i] in "\"'" or text.startswith("[[", i) or text.startswith("[=", i):
+            return self.string_end(i)
+        while i < len(text) and text[i] not in ",;}]" and not text[i].isspace():
+            i += 1
+        return i
+
+    def items(self, i):
+        """Yields (key, value start, value end) for the table starting at i."""
+        text = self.text
+        i = self.skip(i + 1)
+        index = 1
+        while text[i] != "}":
+            if text[i] == "[" and text[i + 1] not in "[=":
+                key_start = self.skip(i + 1)
+                key_end = self.value_end(key_start)
+                key = lua.decode(text[key_start:key_end])
+                i = self.skip(text.index("=", key_end) + 1)
+            elif text[i].isalpha() or text[i] == "_":
+                equals = text.find("=", i)
+                candidate = text[i:equals].strip()
+                if equals > 0 and candidate.isidentifier() and text[equals + 1] != "=":
+                    key = candidate
+                    i = self.skip(equals + 1)
+                else:
+                    key, index = index, index + 1
+            else:
+                key, index = index, index + 1
+            value_end = self.value_end(i)
+            yield key, i, value_end
+            i = self.skip(value_end)
+            if text[i] in ",;":
+                i = self.skip(i + 1)
+        self.end = i + 1
+
+    def find(self, i, key):
+        for item_key, start, end in self.items(i):
+            if item_key == key:
+                return start, end
+        raise KeyError(key)
+
+
+def split_mission(text):
+    start = text.index("{", text.index(MISSION_ENTRY))
+    return LuaSpans(text), start
+
+
+def find_groups(text):
+    spans, root = split_mission(text)
+    groups = list()
+    coalitions, _ = spans.find(root, "coalition")
+    for _, side, _ in list(spans.items(coalitions)):
+        try:
+            countries, _ = spans.find(side, "country")
+        except KeyError:
+            continue
+        for _, country, _ in list(spans.items(countries)):
+            for category in GROUP_CATEGORIES:
+                try:
+                    category_table, _ = spans.find(country, category)
+                    group_list, _ = spans.find(category_table, "group")
+                except KeyError:
+                    continue
+                for _, group, group_end in list(spans.items(group_list)):
+                    name_start, name_end = spans.find(group, "name")
+                    groups.append((lua.decode(text[name_start:name_end]), category, group, group_end))
+    return spans, groups
+
+
+def list_groups(miz_path):
+    with zipfile.ZipFile(miz_path) as miz:
+        text = miz.read(MISSION_ENTRY).decode("utf-8")
+    return [name for name, _, _, _ in find_groups(text)[1]]
+
+
+def route_limits(waypoints, driver):
+    accepted, rejected = list(), list()
+    for wp in waypoints:
+        (accepted if driver.validate_waypoint(wp) else rejected).append(wp)
+    return accepted, rejected
+
+
+def build_route_points(waypoints, transformer, template):
+    points = {1: template[0]}
+    cruise = template[1] if len(template) > 1 else template[0]
+    for i, wp in enumerate(waypoints, 2):
+        y, x = transformer.transform(wp.longitude, wp.latitude)
+        points[i] = {
+            "alt": cruise.get("alt", 2000),
+            "alt_type": cruise.get("alt_type", "BARO"),
+            "action": "Turning Point",
+            "type": "Turning Point",
+            "x": round(x, 3),
+            "y": round(y, 3),
+            "speed": cruise.get("speed", 138.88888888889),
+            "speed_locked": True,
+            "ETA": 0,
+            "ETA_locked": False,
+            "formation_template": "",
+            "name": wp.name or "",
+            "task": {"id": "ComboTask", "params": {"tasks": {}}},
+        }
+    return points
+
+
+def inject_route_text(text, group_name, waypoints):
+    spans, groups = find_groups(text)
+    matches = [group for group in groups if group[0] == group_name]
+    if not matches:
+        raise ValueError(f"Flight group not found: {group_name}")
+    _, _, group, _ = matches[0]
+
+    theatre_start, theatre_end = spans.find(split_mission(text)[1], "theatre")
+    transformer = theatre_transformer(lua.decode(text[theatre_start:theatre_end]))
+
+    route, _ = spans.find(group, "route")
+    points_start, points_end = spans.find(route, "points")
+    existing = lua.decode(text[points_start:points_end]) or dict()
+    template = [point for _, point in sorted(existing.items())] if type(existing) == dict else list(existing)
+    if not template:
+        raise ValueError(f"Flight group {group_name} has no route start point")
+
+    points = build_route_points(waypoints, transformer, template)
+    return text[:points_start] + lua.encode(points) + text[points_end:]
+
+
+def inject_route(miz_path, group_name, profile, driver, out_path=None):
+    """Writes the profile's waypoints as the route of a flight group in a .miz file.
+
+    The group's first route point (its start position) is kept and the rest of
+    the route is replaced. Waypoints outside the driver's limits are not written
+    and are returned so the caller can report them.
+    """
+    waypoints, rejected = route_limits(profile.waypoints_as_list, driver)
+    if not waypoints:
+        raise ValueError("No waypoints within aircraft limits")
+
+    out_path = out_path or miz_path
+    fd, tmp_path = tempfile.mkstemp(suffix=".miz", dir=os.path.dirname(os.path.abspath(out_path)))
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(miz_path) as zin, zipfile.ZipFile(tmp_path, "w") as zout:
+            for info in zin.infolist():
+                if info.filename == MISSION_ENTRY:
+                    text = zin.read(info).decode("utf-8")
+                    zout.writestr(info, inject_route_text(text, group_name, waypoints).encode("utf-8"))
+                else:
+                    with zin.open(info) as src, zout.open(info, "w") as dst:
+                        shutil.copyfileobj(src, dst, COPY_CHUNK)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    logger.info(f"Injected {len(waypoints)} waypoints into group {group_name} of {out_path}, "
+                f"{len(rejected)} outside aircraft limits")
+    return waypoints, rejected
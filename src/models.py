@@ -1,10 +1,22 @@
 from peewee import Model, IntegerField, CharField, ForeignKeyField, FloatField, SqliteDatabase, IntegrityError
 
-db = SqliteDatabase(None, pragmas={'foreign_keys': 1})
+# Applied to every connection: a write-ahead log lets saves append instead of
+# rewriting pages, which is safe with NORMAL sync; 16 MB of page cache and
+# 64 MB of memory mapped reads keep large profiles off the disk on load
+PRAGMAS = {
+    'foreign_keys': 1,
+    'journal_mode': 'wal',
+    'synchronous': 1,
+    'cache_size': -16 * 1024,
+    'mmap_size': 64 * 1024 * 1024,
+}
+
+db = SqliteDatabase(None, pragmas=PRAGMAS)
 
 class ProfileModel(Model):
     name = CharField(unique=True)
     aircraft = CharField(unique=False)
+    fingerprint = CharField(null=True, index=True)
 
     class Meta:
         database = db
@@ -27,6 +39,9 @@ class WaypointModel(Model):
     sequence = ForeignKeyField(SequenceModel, backref='waypoints', null=True)
     wp_type = CharField()
     station = IntegerField(default=0)
+    # Row uid in the profile's waypoint store: the waypoint's identity between saves and its position on load
+    uid = IntegerField(default=0)
 
     class Meta:
         database = db
+        indexes = ((('profile', 'uid'), False),)
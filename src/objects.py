@@ -1,12 +1,21 @@
-from dataclasses import dataclass, asdict
-from typing import Any
-from LatLon23 import LatLon, Longitude, Latitude
+from LatLon23 import LatLon
+import numpy as np
+import io
 import json
+import struct
+from collections import deque
+from contextlib import contextmanager
+from hashlib import blake2b
 import urllib.request
 from os import walk, path
 from src.logger import get_logger
+from src.geo import GeoPoint, as_geopoint
+from src.export import waypoint_label, write_readable
+from src.geometry import RouteGeometry
+from src.spatial import SpatialHash, duplicate_indices
 
-from src.models import ProfileModel, WaypointModel, SequenceModel, IntegrityError, db
+from src.models import ProfileModel, WaypointModel, SequenceModel, db
+from peewee import JOIN, chunked, fn
 
 
 default_bases = dict()
@@ -60,7 +69,7 @@ def load_base_data(filename, basedata, basedict, filedict):
             elev = base.get("elevation")
             if elev is None:
                 elev = base.get('locationDetails').get('altitude')
-            position = LatLon(Latitude(degree=lat), Longitude(degree=lon))
+            position = GeoPoint(lat, lon)
             basedict[name] = Waypoint(position=position, name=name, elevation=elev)
 
 
@@ -90,56 +99,175 @@ def generate_default_bases():
                             f"Failed to build default base data from file: {filename}", exc_info=True)
 
 
-@dataclass
+WAYPOINT_FIELDS = ("number", "elevation", "name", "sequence", "wp_type", "latitude", "longitude", "station")
+
+# Fields that decide which groups (sequence, station, type) a waypoint is in
+GROUPING_FIELDS = ("wp_type", "sequence", "station")
+
+WAYPOINT_DTYPE = np.dtype([
+    ("uid", "i8"),
+    ("latitude", "f8"),
+    ("longitude", "f8"),
+    ("elevation", "f8"),
+    ("wp_type", "i2"),
+    ("sequence", "i4"),
+    ("station", "i4"),
+    ("number", "i4"),
+    ("name", "i4"),
+    ("digest", "u8"),
+])
+
+# Coordinates are fingerprinted at 1e-7 degrees (about a centimetre), elevations
+# at the whole feet the database stores, so a saved profile keeps its fingerprint
+COORDINATE_QUANTUM = 1e7
+FINGERPRINT_MASK = (1 << 64) - 1
+
+# Undo steps kept per profile
+UNDO_LIMIT = 100
+
+# Columns Profile.save compares and writes for every waypoint
+WAYPOINT_COLUMNS = [WaypointModel.name, WaypointModel.latitude, WaypointModel.longitude, WaypointModel.elevation,
+                    WaypointModel.wp_type, WaypointModel.sequence, WaypointModel.station]
+WAYPOINT_COLUMN_NAMES = [column.name for column in WAYPOINT_COLUMNS]
+SAVE_BATCH_SIZE = 100
+
+
+def digest64(data):
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "little")
+
+
+def pair_digest(previous, current):
+    return digest64(struct.pack("<QQ", previous, current))
+
+
+def waypoint_property(field):
+    def getter(self):
+        if self._store is None:
+            return self._fields[field]
+        return self._store.get(self._uid, field)
+
+    def setter(self, value):
+        if self._store is None:
+            self._fields[field] = value
+        else:
+            self._store.set(self._uid, field, value)
+    return property(getter, setter)
+
+
 class Waypoint:
-    position: Any
-    number: int = 0
-    elevation: int = 0
-    name: str = ""
-    sequence: int = 0
-    wp_type: str = "WP"
-    latitude: float = None
-    longitude: float = None
-
-    def __post_init__(self):
-        if type(self.position) == str:
-            base = default_bases.get(self.position)
+    """A waypoint, either standalone or a view of a row of a WaypointStore.
+
+    Standalone waypoints keep their fields in a dict. Once appended to a
+    profile they become views, so later changes go to the profile's columns.
+    `position` is only built as a GeoPoint when it is asked for.
+    """
+
+    __slots__ = ("_store", "_uid", "_fields", "_position")
+
+    default_type = "WP"
+
+    number = waypoint_property("number")
+    elevation = waypoint_property("elevation")
+    name = waypoint_property("name")
+    sequence = waypoint_property("sequence")
+    wp_type = waypoint_property("wp_type")
+    station = waypoint_property("station")
+
+    def __init__(self, position, number=0, elevation=0, name="", sequence=0, wp_type="WP", latitude=None,
+                 longitude=None, station=0):
+        if type(position) == str:
+            base = default_bases.get(position)
 
             if base is not None:
-                self.elevation = base.elev
-                self.name = self.position
-                self.position = base.position
+                elevation = base.elevation
+                name = position
+                position = base.position
             else:
                 raise ValueError("Base name not found in default bases list")
 
-        elif not type(self.position) == LatLon:
+        elif type(position) == LatLon:
+            position = as_geopoint(position)
+
+        elif not type(position) == GeoPoint:
             raise ValueError(
-                "Waypoint position must be a LatLon object or base name string")
+                "Waypoint position must be a GeoPoint or LatLon object or base name string")
+
+        self._store = None
+        self._uid = None
+        self._position = (position.lat.decimal_degree, position.lon.decimal_degree, position)
+        self._fields = dict(number=number, elevation=elevation, name=name, sequence=sequence, wp_type=wp_type,
+                            latitude=position.lat.decimal_degree, longitude=position.lon.decimal_degree,
+                            station=station)
+
+    @classmethod
+    def view(cls, store, uid):
+        wp = cls.__new__(cls)
+        wp._store = store
+        wp._uid = uid
+        wp._fields = None
+        wp._position = None
+        return wp
+
+    def detach(self):
+        self._fields = {field: getattr(self, field) for field in WAYPOINT_FIELDS}
+        self._store = None
+        self._uid = None
+
+    @property
+    def latitude(self):
+        return self._fields["latitude"] if self._store is None else self._store.get(self._uid, "latitude")
+
+    @property
+    def longitude(self):
+        return self._fields["longitude"] if self._store is None else self._store.get(self._uid, "longitude")
 
-        self.latitude = self.position.lat.decimal_degree
-        self.longitude = self.position.lon.decimal_degree
+    @property
+    def position(self):
+        latitude, longitude = self.latitude, self.longitude
+        cached = self._position
+        if cached is not None and cached[0] == latitude and cached[1] == longitude:
+            return cached[2]
+        position = GeoPoint(latitude, longitude)
+        self._position = (latitude, longitude, position)
+        return position
+
+    @position.setter
+    def position(self, position):
+        position = as_geopoint(position)
+        self._position = (position.lat.decimal_degree, position.lon.decimal_degree, position)
+        if self._store is None:
+            self._fields["latitude"] = position.lat.decimal_degree
+            self._fields["longitude"] = position.lon.decimal_degree
+        else:
+            with self._store.transaction():
+                self._store.set(self._uid, "latitude", position.lat.decimal_degree)
+                self._store.set(self._uid, "longitude", position.lon.decimal_degree)
 
     def __str__(self):
-        strrep = f"{self.wp_type}{self.number}"
-        if self.wp_type == "WP" and self.sequence:
-            strrep += f" | SEQ{self.sequence}"
-        if self.name:
-            strrep += f" | {self.name}"
-        return strrep
+        return waypoint_label(self.wp_type, self.number, self.sequence, self.station, self.name)
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={value!r}" for field, value in self.as_dict.items())
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        if type(other) != type(self):
+            return NotImplemented
+        return self.as_dict == other.as_dict
+
+    __hash__ = None
 
     @property
     def as_dict(self):
-        d = asdict(self)
-        del d["position"]
+        d = {field: getattr(self, field) for field in WAYPOINT_FIELDS[:-1]}
+        if isinstance(self, MSN):
+            d["station"] = self.station
         return d
 
     @staticmethod
     def to_object(waypoint):
         return Waypoint(
-            LatLon(
-                Latitude(waypoint.get('latitude')),
-                Longitude(waypoint.get('longitude'))
-            ),
+            GeoPoint(waypoint.get('latitude'), waypoint.get('longitude')),
             elevation=waypoint.get('elevation'),
             name=waypoint.get('name'),
             sequence=waypoint.get('sequence'),
@@ -147,29 +275,22 @@ class Waypoint:
         )
 
 
-@dataclass
 class MSN(Waypoint):
-    station: int = 0
+    __slots__ = ()
 
-    def __post_init__(self):
-        super().__post_init__()
-        self.wp_type = "MSN"
-        if not self.station:
-            raise ValueError("MSN station not defined")
+    default_type = "MSN"
 
-    def __str__(self):
-        strrep = f"MSN{self.number} | STA{self.station}"
-        if self.name:
-            strrep += f" | {self.name}"
-        return strrep
+    def __init__(self, position, number=0, elevation=0, name="", sequence=0, wp_type="MSN", latitude=None,
+                 longitude=None, station=0):
+        super().__init__(position, number=number, elevation=elevation, name=name, sequence=sequence,
+                         wp_type="MSN", station=station)
+        if not station:
+            raise ValueError("MSN station not defined")
 
     @staticmethod
     def to_object(waypoint):
         return MSN(
-            LatLon(
-                Latitude(waypoint.get('latitude')),
-                Longitude(waypoint.get('longitude'))
-            ),
+            GeoPoint(waypoint.get('latitude'), waypoint.get('longitude')),
             elevation=waypoint.get('elevation'),
             name=waypoint.get('name'),
             sequence=waypoint.get('sequence'),
@@ -178,32 +299,528 @@ class MSN(Waypoint):
         )
 
 
+class WaypointStore:
+    """Columnar storage for the waypoints of a profile.
+
+    Rows live in a structured NumPy array; names, waypoint types and
+    stations (numbers, or strings such as the F-15E's "L1") are interned
+    into tables and stored as indices, station 0 being index 0. Iterating
+    or indexing the store returns Waypoint/MSN views, which are created on
+    demand. Every row has a uid which only grows, so a view finds its row
+    with a binary search even after rows before it were removed. `version` changes whenever rows
+    are added or removed or a row changes type, sequence or station.
+
+    While `numbered` is set, every row's number is its position among the
+    rows of its group (MSNs per station, other waypoints per type), and it
+    is kept that way as rows come and go: an append takes the next number of
+    its group and a removal or regrouping only shifts the later rows of the
+    groups involved. Writing a number directly clears `numbered` until the
+    next `renumber`.
+
+    `content_hash` fingerprints the rows in order. Each row has a digest of
+    its contents (numbers excluded, as they follow from the order) and the
+    hash is the sum of a digest of every pair of neighbouring rows, so an
+    append, removal or edit only has to swap the pairs around one row.
+
+    Edits are recorded for undo as the change that reverts them rather than
+    as copies of the store: a removal keeps the removed row, an edit the old
+    value of the field and appends only their position, so a step costs
+    memory in proportion to the rows it touched. Undoing a step applies its
+    changes in reverse, and the changes that reapply them become the redo
+    step. Restored rows keep their uid, so views of them work again. Changes
+    made inside `transaction` form one step, any other change is a step of
+    its own.
+    """
+
+    def __init__(self, waypoints=()):
+        self.rows = np.zeros(16, dtype=WAYPOINT_DTYPE)
+        self.count = 0
+        self.next_uid = 0
+        self.version = 0
+        self.numbered = True
+        self.group_counts = dict()
+        self.content_hash = 0
+        self.names, self.name_index = list(), dict()
+        self.types, self.type_index = list(), dict()
+        self.stations, self.station_index = [0], {0: 0}
+        self.recording = False
+        self.step = None
+        self.undo_steps = deque(maxlen=UNDO_LIMIT)
+        self.redo_steps = deque(maxlen=UNDO_LIMIT)
+        self.extend(waypoints)
+        self.recording = True
+
+    @staticmethod
+    def intern(table, index, value):
+        try:
+            return index[value]
+        except KeyError:
+            index[value] = len(table)
+            table.append(value)
+            return index[value]
+
+    def type_code(self, wp_type):
+        return self.intern(self.types, self.type_index, wp_type)
+
+    def station_code(self, station):
+        return self.intern(self.stations, self.station_index, station or 0)
+
+    @property
+    def msn_code(self):
+        return self.type_index.get("MSN", -1)
+
+    def reserve(self, count):
+        if self.count + count > len(self.rows):
+            rows = np.zeros(max(2 * len(self.rows), self.count + count), dtype=WAYPOINT_DTYPE)
+            rows[:self.count] = self.rows[:self.count]
+            self.rows = rows
+
+    def column(self, field):
+        return self.rows[field][:self.count]
+
+    def group_key(self, wp_type, station):
+        # MSNs are numbered per station, other waypoints per type
+        return station if wp_type == self.msn_code else -1 - wp_type
+
+    def group_keys(self, start=0, stop=None):
+        rows = self.rows[start:self.count if stop is None else stop]
+        return np.where(rows["wp_type"] == self.msn_code, rows["station"], -1 - rows["wp_type"].astype(np.int64))
+
+    def append_values(self, latitude, longitude, elevation=0, wp_type="WP", sequence=0, station=0, number=0,
+                      name="", uid=None):
+        self.reserve(1)
+        # A given uid, as stored with a saved waypoint, must be above those of the rows before it
+        uid = self.next_uid if uid is None else max(uid, self.next_uid)
+        wp_type, station = self.type_code(wp_type), self.station_code(station)
+        if self.numbered:
+            key = self.group_key(wp_type, station)
+            number = self.group_counts[key] = self.group_counts.get(key, 0) + 1
+        self.rows[self.count] = (uid, latitude, longitude, elevation or 0, wp_type, sequence or 0,
+                                 station, number or 0, self.intern(self.names, self.name_index, name), 0)
+        self.rows["digest"][self.count] = self.row_digest(self.count)
+        self.count += 1
+        self.link(self.count - 1)
+        self.next_uid = uid + 1
+        self.version += 1
+        self.record(("delete", self.count - 1, 1))
+        return uid
+
+    def append(self, waypoint):
+        uid = self.append_values(waypoint.latitude, waypoint.longitude, waypoint.elevation, waypoint.wp_type,
+                                 waypoint.sequence, waypoint.station, waypoint.number, waypoint.name)
+        if waypoint._store is None:
+            waypoint._store, waypoint._uid, waypoint._fields = self, uid, None
+
+    def extend(self, waypoints):
+        waypoints = list(waypoints)
+        self.reserve(len(waypoints))
+        with self.transaction():
+            for waypoint in waypoints:
+                self.append(waypoint)
+
+    def extend_records(self, records):
+        """Appends rows from dicts with the Waypoint.as_dict keys, without creating waypoints."""
+        self.extend_values((float(record["latitude"]), float(record["longitude"]), record.get("elevation"),
+                            record.get("wp_type") or "WP", record.get("sequence"), record.get("station"),
+                            record.get("number"), record.get("name")) for record in records)
+
+    def extend_values(self, rows):
+        """Appends rows given as tuples of append_values arguments, without creating waypoints."""
+        rows = list(rows)
+        self.reserve(len(rows))
+        with self.transaction():
+            for row in rows:
+                if row[3] == "MSN" and not row[5]:
+                    raise ValueError("MSN station not defined")
+                self.append_values(*row)
+
+    def index(self, uid):
+        i = int(np.searchsorted(self.column("uid"), uid))
+        if i >= self.count or self.rows["uid"][i] != uid:
+            raise LookupError("Waypoint was removed from its profile")
+        return i
+
+    def get(self, uid, field):
+        value = self.rows[field][self.index(uid)].item()
+        if field == "name":
+            return self.names[value]
+        elif field == "wp_type":
+            return self.types[value]
+        elif field == "station":
+            return self.stations[value]
+        elif field == "elevation" and value.is_integer():
+            return int(value)
+        return value
+
+    def set(self, uid, field, value):
+        i = self.index(uid)
+        if field == "number":
+            self.numbered = False
+            self.rows[field][i] = value or 0
+            return
+
+        if field == "name":
+            value = self.intern(self.names, self.name_index, value)
+        elif field == "wp_type":
+            value = self.type_code(value)
+        elif field == "station":
+            value = self.station_code(value)
+        old_value = self.rows[field][i].item()
+        self.set_row(i, field, value)
+        self.record(("set", uid, field, old_value))
+
+    def set_row(self, i, field, value):
+        if field in GROUPING_FIELDS:
+            self.version += 1
+        old_key = self.row_group_key(i)
+        self.unlink(i)
+        self.rows[field][i] = value or 0
+        self.rows["digest"][i] = self.row_digest(i)
+        self.link(i)
+        if self.numbered:
+            self.regroup(i, old_key, self.row_group_key(i))
+
+    def row_group_key(self, i):
+        return self.group_key(int(self.rows["wp_type"][i]), int(self.rows["station"][i]))
+
+    def row_digest(self, i):
+        row = self.rows[i]
+        name = self.names[row["name"]]
+        return digest64(struct.pack("<qqqi", round(row["latitude"] * COORDINATE_QUANTUM),
+                                    round(row["longitude"] * COORDINATE_QUANTUM),
+                                    round(row["elevation"]), row["sequence"])
+                        + str(self.stations[row["station"]]).encode("utf-8") + b"\0"
+                        + self.types[row["wp_type"]].encode("utf-8") + b"\0"
+                        + (b"\xff" if name is None else str(name).encode("utf-8")))
+
+    def neighbour_pairs(self, i):
+        """Hash contribution of the pairs row i is in, minus the pair that replaces them without it."""
+        digests = self.rows["digest"]
+        previous = int(digests[i - 1]) if i else 0
+        current = int(digests[i])
+        total = pair_digest(previous, current)
+        if i + 1 < self.count:
+            following = int(digests[i + 1])
+            total += pair_digest(current, following) - pair_digest(previous, following)
+        return total
+
+    def link(self, i):
+        self.content_hash = (self.content_hash + self.neighbour_pairs(i)) & FINGERPRINT_MASK
+
+    def unlink(self, i):
+        self.content_hash = (self.content_hash - self.neighbour_pairs(i)) & FINGERPRINT_MASK
+
+    def rehash(self):
+        digests = self.column("digest").tolist()
+        self.content_hash = sum(map(pair_digest, [0] + digests, digests)) & FINGERPRINT_MASK
+
+    def shift_numbers(self, start, key, delta):
+        later = self.rows["number"][start:self.count]
+        later[self.group_keys(start) == key] += delta
+        self.group_counts[key] = self.group_counts.get(key, 0) + delta
+
+    def regroup(self, i, old_key, new_key):
+        if old_key == new_key:
+            return
+        self.shift_numbers(i + 1, old_key, -1)
+        self.rows["number"][i] = np.count_nonzero(self.group_keys(0, i) == new_key) + 1
+        self.shift_numbers(i + 1, new_key, 1)
+
+    def renumber(self):
+        keys = self.group_keys()
+        self.column("number")[:] = group_ranks(keys)
+        uniques, counts = np.unique(keys, return_counts=True)
+        self.group_counts = dict(zip(uniques.tolist(), counts.tolist()))
+        self.numbered = True
+
+    def make_view(self, i):
+        cls = MSN if self.rows["wp_type"][i] == self.msn_code else Waypoint
+        return cls.view(self, int(self.rows["uid"][i]))
+
+    def views(self, indices):
+        return [self.make_view(i) for i in indices]
+
+    def remove(self, waypoint):
+        if waypoint._store is self:
+            i = self.index(waypoint._uid)
+            waypoint.detach()
+        else:
+            for i in range(self.count):
+                if self.make_view(i) == waypoint:
+                    break
+            else:
+                raise ValueError("Waypoint not in profile")
+        self.record(("insert", i, self.rows[i:i + 1].copy()))
+        self.delete_rows(i, i + 1)
+
+    def clear(self):
+        if self.count:
+            self.record(("insert", 0, self.rows[:self.count].copy()))
+        self.count = 0
+        self.content_hash = 0
+        self.version += 1
+        self.numbered = True
+        self.group_counts = dict()
+
+    def remove_rows(self, indices):
+        """Removes the rows at the sorted indices at once."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices):
+            self.record(("insert_at", indices, self.delete_at(indices)))
+
+    def delete_at(self, indices):
+        rows = self.rows[:self.count]
+        removed = rows[indices]
+        kept = np.ones(self.count, dtype=bool)
+        kept[indices] = False
+        remaining = rows[kept]
+        self.count = len(remaining)
+        self.rows[:self.count] = remaining
+        self.rehash()
+        if self.numbered:
+            self.renumber()
+        self.version += 1
+        return removed
+
+    def insert_at(self, indices, rows):
+        """Puts back rows taken out by delete_at, at the indices they had."""
+        self.reserve(len(rows))
+        merged = np.empty(self.count + len(rows), dtype=WAYPOINT_DTYPE)
+        inserted = np.zeros(len(merged), dtype=bool)
+        inserted[indices] = True
+        merged[inserted] = rows
+        merged[~inserted] = self.rows[:self.count]
+        self.count = len(merged)
+        self.rows[:self.count] = merged
+        self.rehash()
+        if self.numbered:
+            self.renumber()
+        self.version += 1
+
+    def delete_rows(self, start, stop):
+        if stop - start == 1:
+            if self.numbered:
+                self.shift_numbers(stop, self.row_group_key(start), -1)
+            self.unlink(start)
+        self.rows[start:self.count - (stop - start)] = self.rows[stop:self.count]
+        self.count -= stop - start
+        if stop - start > 1:
+            self.rehash()
+            if self.numbered:
+                self.renumber()
+        self.version += 1
+
+    def insert_rows(self, start, rows):
+        """Puts back rows taken out by delete_rows, uids included."""
+        self.reserve(len(rows))
+        self.rows[start + len(rows):self.count + len(rows)] = self.rows[start:self.count]
+        self.rows[start:start + len(rows)] = rows
+        self.count += len(rows)
+        if len(rows) == 1:
+            self.link(start)
+            if self.numbered:
+                key = self.row_group_key(start)
+                self.rows["number"][start] = np.count_nonzero(self.group_keys(0, start) == key) + 1
+                self.shift_numbers(start + 1, key, 1)
+        else:
+            self.rehash()
+            if self.numbered:
+                self.renumber()
+        self.version += 1
+
+    def record(self, change):
+        if not self.recording:
+            return
+        if self.step is None:
+            self.undo_steps.append([change])
+            self.redo_steps.clear()
+            return
+        if change[0] == "delete" and self.step and self.step[-1][0] == "delete":
+            # Consecutive appends are reverted by one deletion
+            _, start, count = self.step[-1]
+            if start + count == change[1]:
+                self.step[-1] = ("delete", start, count + change[2])
+                return
+        self.step.append(change)
+
+    @contextmanager
+    def transaction(self):
+        """Records the changes made inside the block as one undo step."""
+        if self.step is not None:
+            yield
+            return
+        self.step = list()
+        try:
+            yield
+        finally:
+            step, self.step = self.step, None
+            if step:
+                self.undo_steps.append(step)
+                self.redo_steps.clear()
+
+    def apply(self, change):
+        """Applies a recorded change and returns the change that reverts it."""
+        if change[0] == "set":
+            _, uid, field, value = change
+            i = self.index(uid)
+            old_value = self.rows[field][i].item()
+            self.set_row(i, field, value)
+            return "set", uid, field, old_value
+        elif change[0] == "delete":
+            _, start, count = change
+            rows = self.rows[start:start + count].copy()
+            self.delete_rows(start, start + count)
+            return "insert", start, rows
+        elif change[0] == "delete_at":
+            _, indices = change
+            return "insert_at", indices, self.delete_at(indices)
+        elif change[0] == "insert_at":
+            _, indices, rows = change
+            self.insert_at(indices, rows)
+            return "delete_at", indices
+        _, start, rows = change
+        self.insert_rows(start, rows)
+        return "delete", start, len(rows)
+
+    def replay(self, step):
+        recording, self.recording = self.recording, False
+        try:
+            return [self.apply(change) for change in reversed(step)]
+        finally:
+            self.recording = recording
+
+    def undo(self):
+        if not self.undo_steps:
+            return False
+        self.redo_steps.append(self.replay(self.undo_steps.pop()))
+        return True
+
+    def redo(self):
+        if not self.redo_steps:
+            return False
+        self.undo_steps.append(self.replay(self.redo_steps.pop()))
+        return True
+
+    def forget(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.views(range(self.count)))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.views(range(*i.indices(self.count)))
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("waypoint index out of range")
+        return self.make_view(i)
+
+    def records(self, indices=None):
+        """Yields the as_dict form of rows straight from the columns."""
+        rows = self.rows[:self.count] if indices is None else self.rows[:self.count][indices]
+        names, types, stations, msn_code = self.names, self.types, self.stations, self.msn_code
+        for uid, latitude, longitude, elevation, wp_type, sequence, station, number, name, _ in rows.tolist():
+            record = dict(number=number, elevation=int(elevation) if elevation.is_integer() else elevation,
+                          name=names[name], sequence=sequence, wp_type=types[wp_type], latitude=latitude,
+                          longitude=longitude)
+            if wp_type == msn_code:
+                record["station"] = stations[station]
+            yield record
+
+
+def group_ranks(keys):
+    """1-based position of every element among the elements with the same key, in order."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    positions = np.arange(len(keys))
+    group_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = positions - group_start + 1
+    return ranks
+
+
+def first_seen(values):
+    """Unique values in order of first appearance."""
+    uniques, first = np.unique(values, return_index=True)
+    return uniques[np.argsort(first)].tolist()
+
+
 class Profile:
     def __init__(self, profilename, waypoints=None, aircraft="hornet"):
         self.profilename = profilename
         self.aircraft = aircraft
-
-        if waypoints is None:
-            self.waypoints = list()
-        else:
-            self.waypoints = waypoints
+        self.derived = dict()
+        self.derived_version = None
+        self.route_geometry = None
+        self.geometry_version = None
+        self.spatial_index = None
+        self.spatial_version = None
+        self.waypoints = waypoints
+
+        if waypoints is not None:
             self.update_waypoint_numbers()
 
     def __str__(self):
         return json.dumps(self.to_dict())
 
+    @property
+    def waypoints(self):
+        return self.store
+
+    @waypoints.setter
+    def waypoints(self, waypoints):
+        if isinstance(waypoints, WaypointStore):
+            self.store = waypoints
+        else:
+            self.store = WaypointStore(waypoints or ())
+        self.store.forget()
+        self.derived_version = None
+
+    def edit(self):
+        """Context manager that makes the edits inside it a single undo step."""
+        return self.store.transaction()
+
+    def undo(self):
+        return self.store.undo()
+
+    def redo(self):
+        return self.store.redo()
+
+    def cached(self, name, build):
+        """Derived view memoized until the store's version changes.
+
+        Views are shared between calls, so callers get a shallow copy.
+        """
+        if self.derived_version != (id(self.store), self.store.version):
+            self.derived.clear()
+            self.derived_version = (id(self.store), self.store.version)
+        try:
+            view = self.derived[name]
+        except KeyError:
+            view = self.derived[name] = build()
+        if type(view) == dict:
+            return {key: list(value) for key, value in view.items()}
+        return list(view)
+
+    def msn_mask(self):
+        return self.store.column("wp_type") == self.store.msn_code
+
     def update_sequences(self):
-        sequences = set()
-        for waypoint in self.waypoints:
-            if type(waypoint) == Waypoint and waypoint.sequence:
-                sequences.add(waypoint.sequence)
-        sequences = list(sequences)
-        sequences.sort()
-        return sequences
+        def build():
+            sequences = self.store.column("sequence")[~self.msn_mask()]
+            return np.unique(sequences[sequences != 0]).tolist()
+        return self.cached("sequences", build)
 
     @property
     def has_waypoints(self):
-        return len(self.waypoints) > 0
+        return len(self.store) > 0
 
     @property
     def sequences(self):
@@ -211,84 +828,132 @@ class Profile:
 
     @property
     def waypoints_as_list(self):
-        return [wp for wp in self.waypoints if type(wp) == Waypoint]
+        return self.cached("waypoints", lambda: self.store.views(np.flatnonzero(~self.msn_mask())))
 
     @property
     def all_waypoints_as_list(self):
-        return [wp for wp in self.waypoints if not isinstance(wp, MSN)]
+        return self.waypoints_as_list
 
     @property
     def msns_as_list(self):
-        return [wp for wp in self.waypoints if isinstance(wp, MSN)]
+        return self.cached("msns", lambda: self.store.views(np.flatnonzero(self.msn_mask())))
+
+    def grouped(self, indices, keys):
+        groups = dict()
+        for key in first_seen(keys):
+            groups[key] = self.store.views(indices[keys == key])
+        return groups
 
     @property
     def stations_dict(self):
-        stations = dict()
-        for mission in self.msns_as_list:
-            station_msn_list = stations.get(mission.station, list())
-            station_msn_list.append(mission)
-            stations[mission.station] = station_msn_list
-        return stations
+        def build():
+            indices = np.flatnonzero(self.msn_mask())
+            groups = self.grouped(indices, self.store.column("station")[indices])
+            return {self.store.stations[code]: msns for code, msns in groups.items()}
+        return self.cached("stations", build)
 
     @property
     def waypoints_dict(self):
-        wps_dict = dict()
-        for wp in self.waypoints_as_list:
-            wps_list = wps_dict.get(wp.wp_type, list())
-            wps_list.append(wp)
-            wps_dict[wp.wp_type] = wps_list
-        return wps_dict
+        def build():
+            indices = np.flatnonzero(~self.msn_mask())
+            groups = self.grouped(indices, self.store.column("wp_type")[indices])
+            return {self.store.types[code]: wps for code, wps in groups.items()}
+        return self.cached("types", build)
 
     @property
     def sequences_dict(self):
-        d = dict()
-        for sequence_identifier in self.sequences:
-            for i, wp in enumerate(self.waypoints_as_list):
-                if wp.sequence == sequence_identifier:
-                    wp_list = d.get(sequence_identifier, list())
-                    wp_list.append(i+1)
-                    d[sequence_identifier] = wp_list
-
-        return d
+        def build():
+            sequences = self.store.column("sequence")[~self.msn_mask()]
+            return {identifier: (np.flatnonzero(sequences == identifier) + 1).tolist()
+                    for identifier in self.sequences}
+        return self.cached("sequence_numbers", build)
 
     def waypoints_of_type(self, wp_type):
-        return [wp for wp in self.waypoints if wp.wp_type == wp_type]
+        def build():
+            code = self.store.type_index.get(wp_type)
+            if code is None:
+                return list()
+            return self.store.views(np.flatnonzero(self.store.column("wp_type") == code))
+        return self.cached(("type", wp_type), build)
 
     def get_sequence(self, identifier):
         return self.sequences_dict.get(identifier, list())
 
+    @property
+    def geometry(self):
+        """RouteGeometry of the waypoints, kept until they are added, removed, moved or regrouped."""
+        version = (id(self.store), self.store.version, self.store.content_hash)
+        if self.geometry_version != version:
+            self.route_geometry = RouteGeometry(self.store)
+            self.geometry_version = version
+        return self.route_geometry
+
+    def duplicate_index(self, distance):
+        """SpatialHash of the waypoints by uid and group, kept until they change."""
+        version = (id(self.store), self.store.version, self.store.content_hash, distance)
+        if self.spatial_version != version:
+            self.spatial_index = SpatialHash(distance)
+            for uid, latitude, longitude, group in zip(self.store.column("uid").tolist(),
+                                                       self.store.column("latitude").tolist(),
+                                                       self.store.column("longitude").tolist(),
+                                                       self.store.group_keys().tolist()):
+                self.spatial_index.add(uid, latitude, longitude, group)
+            self.spatial_version = version
+        return self.spatial_index
+
+    def append_unique(self, waypoint, distance):
+        """Appends the waypoint unless one of its group lies within distance metres, which is returned instead.
+
+        The index is updated with the new waypoint rather than rebuilt, so a
+        capture session checks every capture in constant time.
+        """
+        index = self.duplicate_index(distance)
+        group = self.store.group_key(self.store.type_code(waypoint.wp_type), self.store.station_code(waypoint.station))
+        uid = index.nearest(waypoint.latitude, waypoint.longitude, group)
+        if uid is not None:
+            return self.store.make_view(self.store.index(uid))
+        self.store.append(waypoint)
+        index.add(int(self.store.rows["uid"][self.store.count - 1]), waypoint.latitude, waypoint.longitude, group)
+        self.spatial_version = (id(self.store), self.store.version, self.store.content_hash, distance)
+
+    def remove_duplicates(self, distance):
+        """Removes waypoints within distance metres of an earlier one of their group, as one undo step."""
+        duplicates = duplicate_indices(self.store.column("latitude").tolist(), self.store.column("longitude").tolist(),
+                                       distance, self.store.group_keys().tolist())
+        self.store.remove_rows(duplicates)
+        return len(duplicates)
+
+    def inbound_leg(self, waypoint):
+        """(bearing, distance in metres) from the previous waypoint of the same type, or None."""
+        if waypoint._store is not self.store:
+            return None
+        return self.geometry.inbound(waypoint._uid)
+
+    @property
+    def fingerprint(self):
+        """Content fingerprint of the aircraft and the waypoints in order, as 16 hex digits."""
+        return blake2b(f"{self.aircraft}\0{self.store.content_hash:016x}".encode("utf-8"), digest_size=8).hexdigest()
+
+    def duplicates(self):
+        """Names of other saved profiles with the same contents."""
+        return [profile.name for profile in ProfileModel.select(ProfileModel.name).where(
+            (ProfileModel.fingerprint == self.fingerprint) & (ProfileModel.name != self.profilename))]
+
     def to_dict(self):
         return dict(
-            waypoints=[waypoint.as_dict for waypoint in self.waypoints],
+            waypoints=list(self.store.records()),
             name=self.profilename,
             aircraft=self.aircraft
         )
 
     def update_waypoint_numbers(self):
-        for _, station_msn_list in self.stations_dict.items():
-            for i, mission in enumerate(station_msn_list, 1):
-                mission.number = i
-
-        for _, waypoint_list in self.waypoints_dict.items():
-            for i, waypoint in enumerate(waypoint_list, 1):
-                waypoint.number = i
+        if not self.store.numbered:
+            self.store.renumber()
 
     def to_readable_string(self):
-        readable_string = "Waypoints:\n\n"
-        for wp in self.waypoints:
-            if wp.wp_type != "MSN":
-                position = LatLon(Latitude(wp.latitude), Longitude(wp.longitude)).to_string("d%°%m%'%S%\"%H")
-                readable_string += str(wp)
-                readable_string += f": {position[0]} {position[1]} | {wp.elevation}ft\n"
-
-        readable_string += "\nPreplanned missions:\n\n"
-
-        for wp in sorted(self.waypoints_of_type("MSN"), key=lambda waypoint: waypoint.station):
-            if wp.wp_type == "MSN":
-                position = LatLon(Latitude(wp.latitude), Longitude(wp.longitude)).to_string("d%°%m%'%S%\"%H")
-                readable_string += str(wp)
-                readable_string += f": {position[0]} {position[1]} | {wp.elevation}ft\n"
-        return readable_string
+        readable = io.StringIO()
+        write_readable(self, readable)
+        return readable.getvalue()
 
     @staticmethod
     def from_string(profile_string):
@@ -296,10 +961,11 @@ class Profile:
         try:
             profile_name = profile_data["name"]
             waypoints = profile_data["waypoints"]
-            wps = [Waypoint.to_object(w) for w in waypoints if w['wp_type'] != 'MSN']
-            msns = [MSN.to_object(w) for w in waypoints if w['wp_type'] == 'MSN']
+            store = WaypointStore()
+            store.extend_records(w for w in waypoints if w['wp_type'] != 'MSN')
+            store.extend_records(w for w in waypoints if w['wp_type'] == 'MSN')
             aircraft = profile_data["aircraft"]
-            profile = Profile(profile_name, waypoints=wps+msns, aircraft=aircraft)
+            profile = Profile(profile_name, waypoints=store, aircraft=aircraft)
             if profile.profilename:
                 profile.save()
             return profile
@@ -309,97 +975,118 @@ class Profile:
             raise ValueError("Failed to load profile from data")
 
     def save(self, profilename=None):
-        delete_list = list()
+        """Writes the profile in one transaction, touching only the rows that differ from the stored ones.
+
+        Every waypoint is stored with its uid in the waypoint store, which
+        loads back with it and orders the waypoints on load. Stored waypoints
+        are matched to the profile's by uid: changed rows are updated, new
+        waypoints inserted and removed ones deleted, so removing or editing a
+        waypoint anywhere in the route touches only that row. An unchanged
+        profile is recognised by its fingerprint and costs a single query.
+        """
         if profilename is not None:
             self.profilename = profilename
 
-        try:
-            with db.atomic():
-                profile = ProfileModel.create(
-                    name=self.profilename, aircraft=self.aircraft)
-        except IntegrityError:
-            profile = ProfileModel.get(
-                ProfileModel.name == self.profilename)
-        profile.aircraft = self.aircraft
-
-        for waypoint in profile.waypoints:
-            delete_list.append(waypoint)
-
-        for sequence in profile.sequences:
-            delete_list.append(sequence)
-
-        sequences_db_instances = dict()
-        for sequencenumber in self.sequences:
-            sequence_db_instance = SequenceModel.create(
-                identifier=sequencenumber,
-                profile=profile
-            )
-            sequences_db_instances[sequencenumber] = sequence_db_instance
-
-        for waypoint in self.waypoints:
-            if not isinstance(waypoint, MSN):
-                sequence = sequences_db_instances.get(waypoint.sequence)
-                WaypointModel.create(
-                    name=waypoint.name,
-                    latitude=waypoint.position.lat.decimal_degree,
-                    longitude=waypoint.position.lon.decimal_degree,
-                    elevation=waypoint.elevation,
-                    profile=profile,
-                    sequence=sequence,
-                    wp_type=waypoint.wp_type
-                )
+        fingerprint = self.fingerprint
+        with db.atomic():
+            profile = ProfileModel.get_or_none(ProfileModel.name == self.profilename)
+            if profile is None:
+                profile = ProfileModel.create(name=self.profilename, aircraft=self.aircraft)
+            elif profile.fingerprint == fingerprint:
+                logger.debug(f"Profile {self.profilename} unchanged, not saved")
+                return
+
+            sequence_ids = self.save_sequences(profile)
+            self.save_waypoints(profile, sequence_ids)
+            sequences = set(self.sequences)
+            unused = [row_id for identifier, row_id in sequence_ids.items() if identifier not in sequences]
+            if unused:
+                SequenceModel.delete().where(SequenceModel.id.in_(unused)).execute()
+
+            if (profile.aircraft, profile.fingerprint) != (self.aircraft, fingerprint):
+                profile.aircraft = self.aircraft
+                profile.fingerprint = fingerprint
+                profile.save()
+
+    def save_sequences(self, profile):
+        """Creates the missing sequence rows; returns the row id of every sequence identifier."""
+        def stored():
+            return dict(SequenceModel.select(SequenceModel.identifier, SequenceModel.id)
+                        .where(SequenceModel.profile == profile).tuples())
+
+        sequence_ids = stored()
+        missing = [identifier for identifier in self.sequences if identifier not in sequence_ids]
+        if missing:
+            SequenceModel.insert_many([(identifier, profile.id) for identifier in missing],
+                                      fields=[SequenceModel.identifier, SequenceModel.profile]).execute()
+            sequence_ids = stored()
+        return sequence_ids
+
+    def waypoint_rows(self, sequence_ids):
+        """Stored form of the waypoints, in the order of WAYPOINT_COLUMNS."""
+        store = self.store
+        names, types, stations = store.names, store.types, store.stations
+        for name, latitude, longitude, elevation, wp_type, sequence, station, msn in zip(
+                *(store.column(field).tolist() for field in ("name", "latitude", "longitude", "elevation",
+                                                             "wp_type", "sequence", "station")),
+                self.msn_mask().tolist()):
+            # MSNs are stored without a sequence, other waypoints without a station
+            yield (names[name], latitude, longitude, round(elevation), types[wp_type],
+                   None if msn else sequence_ids.get(sequence), stations[station] if msn else 0)
+
+    def save_waypoints(self, profile, sequence_ids):
+        stored, removed = dict(), list()
+        for row_id, uid, *row in (WaypointModel.select(WaypointModel.id, WaypointModel.uid, *WAYPOINT_COLUMNS)
+                                  .where(WaypointModel.profile == profile).tuples()):
+            if uid in stored:
+                removed.append(row_id)
             else:
-                WaypointModel.create(
-                    name=waypoint.name,
-                    latitude=waypoint.position.lat.decimal_degree,
-                    longitude=waypoint.position.lon.decimal_degree,
-                    elevation=waypoint.elevation,
-                    profile=profile,
-                    wp_type=waypoint.wp_type,
-                    station=waypoint.station
-                )
-
-        for instance in delete_list:
-            instance.delete_instance()
-        profile.save()
+                stored[uid] = (row_id, tuple(row))
+        rows = dict(zip(self.store.column("uid").tolist(), self.waypoint_rows(sequence_ids)))
+
+        removed += [row_id for uid, (row_id, _) in stored.items() if uid not in rows]
+        for batch in chunked(removed, SAVE_BATCH_SIZE):
+            WaypointModel.delete().where(WaypointModel.id.in_(batch)).execute()
+        changed = [WaypointModel(id=stored[uid][0], **dict(zip(WAYPOINT_COLUMN_NAMES, row)))
+                   for uid, row in rows.items() if uid in stored and stored[uid][1] != row]
+        if changed:
+            WaypointModel.bulk_update(changed, fields=WAYPOINT_COLUMNS, batch_size=SAVE_BATCH_SIZE)
+        added = [row + (uid, profile.id) for uid, row in rows.items() if uid not in stored]
+        for batch in chunked(added, SAVE_BATCH_SIZE):
+            WaypointModel.insert_many(batch, fields=WAYPOINT_COLUMNS + [WaypointModel.uid,
+                                                                        WaypointModel.profile]).execute()
 
     @staticmethod
     def load(profile_name):
-        profile = ProfileModel.get(ProfileModel.name == profile_name)
-        aircraft = profile.aircraft
-
-        wps = list()
-        for waypoint in profile.waypoints:
-            try:
-                sequence = waypoint.sequence.identifier
-            except AttributeError:
-                sequence = 0
-
-            if waypoint.wp_type != "MSN":
-                wp = Waypoint(LatLon(Latitude(waypoint.latitude), Longitude(waypoint.longitude)),
-                              elevation=waypoint.elevation, name=waypoint.name, sequence=sequence,
-                              wp_type=waypoint.wp_type)
-            else:
-                wp = MSN(LatLon(Latitude(waypoint.latitude), Longitude(waypoint.longitude)),
-                         elevation=waypoint.elevation, name=waypoint.name, sequence=sequence,
-                         wp_type=waypoint.wp_type, station=waypoint.station)
-            wps.append(wp)
-
-        profile = Profile(profile_name, waypoints=wps, aircraft=aircraft)
-        profile.update_waypoint_numbers()
+        profile = ProfileModel.select(ProfileModel.id, ProfileModel.aircraft).where(
+            ProfileModel.name == profile_name).get()
+
+        # One query for all waypoints, with their sequence identifiers joined in
+        rows = (WaypointModel
+                .select(WaypointModel.latitude, WaypointModel.longitude, WaypointModel.elevation,
+                        WaypointModel.wp_type, fn.COALESCE(SequenceModel.identifier, 0), WaypointModel.station,
+                        WaypointModel.name, WaypointModel.uid)
+                .join(SequenceModel, JOIN.LEFT_OUTER)
+                .where(WaypointModel.profile == profile.id)
+                .order_by(WaypointModel.uid, WaypointModel.id)
+                .tuples())
+        wps = WaypointStore()
+        wps.extend_values((latitude, longitude, elevation, wp_type, sequence, station, 0, name, uid)
+                          for latitude, longitude, elevation, wp_type, sequence, station, name, uid in rows)
+
+        loaded = Profile(profile_name, waypoints=wps, aircraft=profile.aircraft)
         logger.debug(
             f"Fetched {profile_name} from DB, with {len(wps)} waypoints")
-        return profile
+        return loaded
 
     @staticmethod
     def delete(profile_name):
-        profile = ProfileModel.get(name=profile_name)
-
-        for waypoint in profile.waypoints:
-            waypoint.delete_instance()
-
-        profile.delete_instance(recursive=True)
+        with db.atomic():
+            profile = ProfileModel.get(name=profile_name)
+            WaypointModel.delete().where(WaypointModel.profile == profile).execute()
+            SequenceModel.delete().where(SequenceModel.profile == profile).execute()
+            profile.delete_instance()
 
     @staticmethod
-    def list_all():
-        return list(ProfileModel.select())
+    def list_names():
+        return [name for name, in ProfileModel.select(ProfileModel.name).order_by(ProfileModel.name).tuples()]
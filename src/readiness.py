@@ -0,0 +1,80 @@
+'''
+*
+* readiness.py: DCS Waypoint Editor - DCS Readiness Detection Module        *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import socket
+import struct
+from src.clock import SystemClock
+
+DCS_BIOS_EXPORT_GROUP = "239.255.50.10"
+DCS_BIOS_EXPORT_PORT = 5010
+DCS_BIOS_FRAME_SYNC = b"\x55\x55\x55\x55"
+THE_WAY_HOST = "127.0.0.1"
+THE_WAY_PORT = 42070
+
+
+def wait_for_dcs_bios(timeout, group=DCS_BIOS_EXPORT_GROUP, port=DCS_BIOS_EXPORT_PORT, cancelled=None,
+                      interval=0.25, clock=None):
+    # DCS-BIOS only streams export frames while a mission is running, so the
+    # first frame received after joining the group means the sim is ready.
+    # The socket is polled between clock sleeps, so time only passes on the clock.
+    clock = clock or SystemClock()
+    deadline = clock.now() + timeout
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(("", port))
+        mreq = struct.pack("=4sl", socket.inet_aton(group), socket.INADDR_ANY)
+        s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        s.setblocking(False)
+
+        while True:
+            try:
+                while True:
+                    if DCS_BIOS_FRAME_SYNC in s.recv(2048):
+                        return True
+            except BlockingIOError:
+                pass
+            remaining = deadline - clock.now()
+            if remaining <= 0 or (cancelled is not None and cancelled()):
+                return False
+            clock.sleep(min(remaining, interval))
+    except OSError:
+        return False
+    finally:
+        s.close()
+
+
+def wait_for_the_way(timeout, host=THE_WAY_HOST, port=THE_WAY_PORT, cancelled=None, interval=0.25, clock=None):
+    # TheWay only listens while its export script is running in a mission.
+    # The probe connects without sending anything and resets the connection
+    # instead of closing it, so TheWay's read of a newline-terminated payload
+    # fails rather than returning an empty one.
+    clock = clock or SystemClock()
+    deadline = clock.now() + timeout
+    while True:
+        remaining = deadline - clock.now()
+        if remaining <= 0 or (cancelled is not None and cancelled()):
+            return False
+        try:
+            with socket.create_connection((host, port), timeout=min(remaining, interval)) as s:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                return True
+        except OSError:
+            clock.sleep(min(interval, max(0, deadline - clock.now())))
@@ -0,0 +1,185 @@
+'''
+*
+* send_queue.py: DCS Waypoint Editor - Background Send Queue Module         *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import threading
+from collections import deque
+from src.logger import get_logger
+from src.objects import Profile, WaypointStore
+
+
+class SendJobPart:
+    """Progress of one labelled stream of a job, e.g. one seat of a crew send."""
+
+    def __init__(self, job, count):
+        self.job = job
+        self.done = 0
+        self.total = count
+
+    def cancelled(self):
+        return self.job.cancel_requested
+
+    def update(self, i):
+        self.done = i
+
+    def close(self):
+        pass
+
+
+class SendJob:
+    """A snapshot of a profile waiting to be entered into one aircraft.
+
+    The job doubles as the progress reporter handed to the driver, so the
+    GUI can poll it from its own thread.
+    """
+
+    def __init__(self, profile, method, wait_ready=False):
+        # Only the rows are copied: the undo history and cached views stay behind
+        store = WaypointStore()
+        store.extend_records(profile.waypoints.records())
+        self.profile = Profile(profile.profilename, waypoints=store, aircraft=profile.aircraft)
+        self.aircraft = profile.aircraft
+        self.key = (profile.profilename, profile.aircraft)
+        self.method = method
+        self.wait_ready = wait_ready
+        self.state = "pending"
+        self.done = 0
+        self.total = 0
+        self.cancel_requested = False
+        self.parts = dict()
+
+    def __call__(self, count, label=None):
+        if label is not None:
+            part = self.parts[label] = SendJobPart(self, count)
+            return part
+        self.done, self.total = 0, count
+        return self
+
+    @property
+    def progress_text(self):
+        if self.parts:
+            return " ".join(f"{label} {part.done}/{part.total}" for label, part in self.parts.items())
+        return f"{self.done}/{self.total}"
+
+    def cancelled(self):
+        return self.cancel_requested
+
+    def update(self, i):
+        self.done = i
+
+    def close(self):
+        pass
+
+
+class SendQueue:
+    """Per-endpoint send queues, each drained by its own worker thread.
+
+    A new job for the same profile and aircraft as a job that is still
+    pending replaces it in place, so repeated sends never stack up. If that
+    job is already running it is cancelled instead, which the driver honours
+    at its next cancellation check by skipping to the end of the current
+    phase, and the new job is sent from its own snapshot right after it.
+    """
+
+    def __init__(self, editor):
+        self.logger = get_logger("queue")
+        self.editor = editor
+        self.cond = threading.Condition()
+        self.pending = dict()
+        self.running = dict()
+        self.workers = dict()
+        self.stopping = False
+
+    def submit(self, job):
+        with self.cond:
+            queue = self.pending.setdefault(job.aircraft, deque())
+            for i, pending in enumerate(queue):
+                if pending.key == job.key:
+                    pending.state = "superseded"
+                    queue[i] = job
+                    self.logger.info(f"Superseded pending send of {job.key[0] or 'unsaved profile'} "
+                                     f"to {job.aircraft}")
+                    break
+            else:
+                running = self.running.get(job.aircraft)
+                if running is not None and running.key == job.key and running.state == "running":
+                    running.state = "superseded"
+                    running.cancel_requested = True
+                    queue.appendleft(job)
+                    self.logger.info(f"Cancelled running send of {job.key[0] or 'unsaved profile'} "
+                                     f"to {job.aircraft} for a newer one")
+                else:
+                    queue.append(job)
+
+            worker = self.workers.get(job.aircraft)
+            if worker is None or not worker.is_alive():
+                worker = threading.Thread(target=self.work, args=(job.aircraft,), daemon=True)
+                self.workers[job.aircraft] = worker
+                worker.start()
+            self.cond.notify_all()
+        return job
+
+    def work(self, endpoint):
+        while True:
+            with self.cond:
+                while not self.pending[endpoint] and not self.stopping:
+                    self.cond.wait()
+                if self.stopping:
+                    return
+                job = self.pending[endpoint].popleft()
+                job.state = "running"
+                self.running[endpoint] = job
+
+            try:
+                self.editor.enter_all(job.profile, job.method, wait_ready=job.wait_ready, progress=job)
+                if job.state == "running":
+                    job.state = "cancelled" if job.cancel_requested else "done"
+            except Exception:
+                self.logger.error(f"Send to {endpoint} failed", exc_info=True)
+                job.state = "failed"
+            finally:
+                with self.cond:
+                    del self.running[endpoint]
+                    self.cond.notify_all()
+
+    @property
+    def busy(self):
+        with self.cond:
+            return bool(self.running) or any(self.pending.values())
+
+    def status(self):
+        with self.cond:
+            endpoints = sorted(set(self.running) | {k for k, v in self.pending.items() if v})
+            return [(endpoint, self.running.get(endpoint), len(self.pending.get(endpoint, ())))
+                    for endpoint in endpoints]
+
+    def cancel_all(self):
+        with self.cond:
+            for queue in self.pending.values():
+                for job in queue:
+                    job.state = "cancelled"
+                queue.clear()
+            for job in self.running.values():
+                job.cancel_requested = True
+
+    def stop(self):
+        self.cancel_all()
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
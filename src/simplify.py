@@ -0,0 +1,172 @@
+'''
+*
+* simplify.py: DCS Waypoint Editor - Route Simplification Module            *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import numpy as np
+
+EARTH_RADIUS = 6371008.8
+
+
+def local_xy(latitudes, longitudes):
+    """Equirectangular projection in metres around the middle of the points."""
+    latitudes, longitudes = np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float)
+    if not len(latitudes):
+        return latitudes, longitudes
+    longitudes = (longitudes - longitudes[0] + 180.) % 360. - 180.
+    scale = np.cos(np.radians((latitudes.min() + latitudes.max()) / 2.))
+    return np.radians(longitudes) * scale * EARTH_RADIUS, np.radians(latitudes) * EARTH_RADIUS
+
+
+def segment_distances(x, y, points, starts, ends):
+    """Distance from every point to the segment between its start and end point."""
+    dx, dy = x[ends] - x[starts], y[ends] - y[starts]
+    px, py = x[points] - x[starts], y[points] - y[starts]
+    length = dx * dx + dy * dy
+    t = np.clip(np.divide(px * dx + py * dy, length, out=np.zeros_like(length), where=length > 0), 0., 1.)
+    return np.hypot(px - t * dx, py - t * dy)
+
+
+def significance(x, y, keep=None):
+    """Douglas-Peucker significance of every point, in the units of x and y.
+
+    The route is split at its kept points (the end points and `keep`), then
+    every segment is split at the point furthest from it, all segments of a
+    level at once. A point's significance is its distance from the segment it
+    split, capped by the significance of the point that made that segment,
+    so Douglas-Peucker with tolerance t keeps exactly the points whose
+    significance is above t. Kept points are infinitely significant.
+
+    Returns (significance, deviation, parent, level): deviation is the
+    uncapped distance, parent the point whose split made the segment (-1 for
+    the segments between kept points) and level the round of splits.
+    """
+    count = len(x)
+    score = np.zeros(count)
+    deviation = np.zeros(count)
+    parent = np.full(count, -1, dtype=np.int64)
+    level = np.zeros(count, dtype=np.int64)
+    anchors = np.zeros(count, dtype=bool)
+    anchors[[0, -1] if count else []] = True
+    if keep is not None:
+        anchors[keep] = True
+    score[anchors] = np.inf
+
+    anchors = np.flatnonzero(anchors)
+    starts, ends = anchors[:-1], anchors[1:]
+    parents = np.full(len(starts), -1, dtype=np.int64)
+    rounds = 0
+    while len(starts):
+        rounds += 1
+        inner = ends - starts - 1
+        starts, ends, parents, inner = starts[inner > 0], ends[inner > 0], parents[inner > 0], inner[inner > 0]
+        if not len(starts):
+            break
+        # Every interior point of every segment, grouped by segment
+        segment = np.repeat(np.arange(len(starts)), inner)
+        offsets = np.concatenate(([0], np.cumsum(inner)[:-1]))
+        points = np.arange(len(segment)) - offsets[segment] + starts[segment] + 1
+        distances = segment_distances(x, y, points, starts[segment], ends[segment])
+
+        furthest = np.maximum.reduceat(distances, offsets)
+        first = np.flatnonzero(distances == furthest[segment])
+        _, unique = np.unique(segment[first], return_index=True)
+        splits = points[first[unique]]
+
+        deviation[splits] = furthest
+        parent[splits] = parents
+        level[splits] = rounds
+        score[splits] = np.minimum(furthest, np.where(parents >= 0, score[np.maximum(parents, 0)], np.inf))
+        starts, ends = np.concatenate((starts, splits)), np.concatenate((splits, ends))
+        parents = np.concatenate((splits, splits))
+    return score, deviation, parent, level
+
+
+class Simplification:
+    """Points kept by a simplification and the largest distance of a dropped point from the result."""
+
+    def __init__(self, kept, error):
+        self.kept = kept
+        self.error = error
+
+    @property
+    def dropped(self):
+        return np.flatnonzero(~self.kept)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.kept))
+
+
+def simplify(latitudes, longitudes, max_points=None, tolerance=None, keep=None):
+    """Douglas-Peucker simplification to at most max_points and/or within tolerance metres.
+
+    Points in `keep` and the end points are never dropped; if they alone
+    exceed max_points, the first max_points of them are kept.
+    """
+    x, y = local_xy(latitudes, longitudes)
+    score, deviation, parent, level = significance(x, y, keep)
+    # Ties go to the earlier split, so a point is never kept without its parent
+    order = np.lexsort((np.arange(len(score)), level, -score))
+    kept = np.zeros(len(score), dtype=bool)
+    if tolerance is not None:
+        kept[score > tolerance] = True
+        kept[np.isinf(score)] = True
+    else:
+        kept[:] = True
+    if max_points is not None and np.count_nonzero(kept) > max_points:
+        chosen = order[kept[order]][:max_points]
+        kept[:] = False
+        kept[chosen] = True
+
+    # A dropped point whose parent is kept split a segment of the result
+    dropped = ~kept
+    frontier = dropped & ((parent < 0) | kept[np.maximum(parent, 0)])
+    error = float(deviation[frontier].max()) if np.any(frontier) else 0.
+    if np.any(dropped & np.isinf(score)):
+        error = float(np.inf)
+    return Simplification(kept, error)
+
+
+def plan_profile(profile, limits, tolerance=None):
+    """Simplification of every waypoint type route longer than its limit.
+
+    Named waypoints are kept; MSNs are never part of a route. Returns a dict
+    of waypoint type to (row indices of the route, Simplification).
+    """
+    store = profile.waypoints
+    plan = dict()
+    for wp_type, route in profile.geometry.types.items():
+        if wp_type not in limits:
+            continue
+        limit = limits[wp_type]
+        if tolerance is None and (limit is None or len(route.indices) <= limit):
+            continue
+        named = store.column("name")[route.indices]
+        keep = np.flatnonzero([bool(store.names[name]) for name in named.tolist()])
+        result = simplify(store.column("latitude")[route.indices], store.column("longitude")[route.indices],
+                          max_points=limit, tolerance=tolerance, keep=keep)
+        if len(result) < len(route.indices):
+            plan[wp_type] = (route.indices, result)
+    return plan
+
+
+def apply_plan(profile, plan):
+    """Removes the dropped points of a plan as one undo step."""
+    dropped = [indices[result.dropped] for indices, result in plan.values()]
+    if dropped:
+        profile.waypoints.remove_rows(np.sort(np.concatenate(dropped)))
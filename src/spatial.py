@@ -0,0 +1,87 @@
+'''
+*
+* spatial.py: DCS Waypoint Editor - Spatial Hash Module                     *
+*                                                                           *
+* Copyright (C) 2024 Atcz                                                   *
+*                                                                           *
+* This program is free software: you can redistribute it and/or modify it   *
+* under the terms of the GNU General Public License as published by the     *
+* Free Software Foundation, either version 3 of the License, or (at your    *
+* option) any later version.                                                *
+*                                                                           *
+* This program is distributed in the hope that it will be useful, but       *
+* WITHOUT ANY WARRANTY; without even the implied warranty of                *
+* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General  *
+* Public License for more details.                                          *
+*                                                                           *
+* You should have received a copy of the GNU General Public License along   *
+* with this program. If not, see <https://www.gnu.org/licenses/>.           *
+'''
+
+import math
+
+EARTH_RADIUS = 6371008.8
+
+# Cells one step away in each direction, the cell itself included
+NEIGHBOURS = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)]
+
+
+def to_xyz(latitude, longitude):
+    """Point on a sphere of the earth's radius, in metres.
+
+    Chord lengths between points match the distance along the ground to well
+    under a metre at the distances duplicates are searched for, anywhere on
+    the globe, which a latitude/longitude grid does not do near the poles or
+    across the antimeridian.
+    """
+    latitude, longitude = math.radians(latitude), math.radians(longitude)
+    radius = math.cos(latitude) * EARTH_RADIUS
+    return radius * math.cos(longitude), radius * math.sin(longitude), math.sin(latitude) * EARTH_RADIUS
+
+
+class SpatialHash:
+    """Grid of `distance` sized cells holding keys of points, to find points within `distance` of another.
+
+    A point within `distance` is at most one cell away, so a lookup only
+    checks the 27 cells around a point and takes constant time however many
+    points there are. `group` keeps points apart that must not match, such as
+    waypoints of different types.
+    """
+
+    def __init__(self, distance):
+        if distance <= 0:
+            raise ValueError("Duplicate distance must be positive")
+        self.distance = float(distance)
+        self.cells = dict()
+
+    def cell(self, xyz):
+        return tuple(math.floor(c / self.distance) for c in xyz)
+
+    def add(self, key, latitude, longitude, group=None):
+        xyz = to_xyz(latitude, longitude)
+        self.cells.setdefault((group,) + self.cell(xyz), list()).append((key, xyz))
+
+    def nearest(self, latitude, longitude, group=None):
+        """Key of the nearest point within the distance, or None."""
+        xyz = to_xyz(latitude, longitude)
+        x, y, z = self.cell(xyz)
+        best, best_distance = None, self.distance
+        for dx, dy, dz in NEIGHBOURS:
+            for key, other in self.cells.get((group, x + dx, y + dy, z + dz), ()):
+                distance = math.dist(other, xyz)
+                if distance <= best_distance:
+                    best, best_distance = key, distance
+        return best
+
+
+def duplicate_indices(latitudes, longitudes, distance, groups=None):
+    """Indices of the points within `distance` metres of an earlier point of the same group."""
+    grid = SpatialHash(distance)
+    duplicates = list()
+    groups = [None] * len(latitudes) if groups is None else groups
+    for i, (latitude, longitude, group) in enumerate(zip(latitudes, longitudes, groups)):
+        if grid.nearest(latitude, longitude, group) is None:
+            grid.add(i, latitude, longitude, group)
+        else:
+            duplicates.append(i)
+    return duplicates
@@ -1,56 +1,228 @@
-from time import sleep
 from src.objects import base_files, default_bases
 from src.db import DatabaseInterface
 from src.logger import get_logger
+from src.journal import SendJournal
+from src.readiness import wait_for_dcs_bios, wait_for_the_way, DCS_BIOS_EXPORT_GROUP, DCS_BIOS_EXPORT_PORT, \
+                          THE_WAY_HOST, THE_WAY_PORT
+from src.send_queue import SendQueue
+from src.clock import SystemClock
+import threading
+from configparser import NoSectionError, NoOptionError
 from src.drivers import HornetDriver, HarrierDriver, MirageDriver, TomcatDriver, DriverException,\
-                        WarthogDriver, ViperDriver, ApachePilotDriver, ApacheGunnerDriver, BlackSharkDriver,\
-                        StrikeEagleDriver
-import json
+                        WarthogDriver, ViperDriver, ApacheDriver, ApacheCrewDriver, BlackSharkDriver,\
+                        StrikeEagleDriver, CommandTable
+
+THROUGHPUT_SECTION = "THROUGHPUT"
+THROUGHPUT_WEIGHT = 0.3
+METHOD_KEYS = {"DCS-BIOS": "dcs_bios", "TheWay.lua": "the_way"}
 
 
 class WaypointEditor:
+    dcs_bios_export = (DCS_BIOS_EXPORT_GROUP, DCS_BIOS_EXPORT_PORT)
+    the_way_address = (THE_WAY_HOST, THE_WAY_PORT)
 
-    def __init__(self, settings):
+    def __init__(self, settings, clock=None):
         self.logger = get_logger("driver")
         self.settings = settings
+        self.clock = clock or SystemClock()
         self.db = DatabaseInterface(settings['PREFERENCES'].get("DB_Name", "profiles.db"))
         self.default_bases = default_bases
         self.base_files = base_files
-        self.drivers = dict(hornet=HornetDriver(self.logger, settings),
-                            harrier=HarrierDriver(self.logger, settings),
-                            mirage=MirageDriver(self.logger, settings),
-                            tomcat=TomcatDriver(self.logger, settings),
-                            warthog=WarthogDriver(self.logger, settings),
-                            viper=ViperDriver(self.logger, settings),
-                            apachep=ApachePilotDriver(self.logger, settings),
-                            apacheg=ApacheGunnerDriver(self.logger, settings),
-                            blackshark=BlackSharkDriver(self.logger, settings),
-                            strikeeagle=StrikeEagleDriver(self.logger, settings))
+        self.drivers = dict(hornet=HornetDriver(self.logger, settings, clock=self.clock),
+                            harrier=HarrierDriver(self.logger, settings, clock=self.clock),
+                            mirage=MirageDriver(self.logger, settings, clock=self.clock),
+                            tomcat=TomcatDriver(self.logger, settings, clock=self.clock),
+                            warthog=WarthogDriver(self.logger, settings, clock=self.clock),
+                            viper=ViperDriver(self.logger, settings, clock=self.clock),
+                            apachep=ApacheDriver(self.logger, settings, seat="PLT", clock=self.clock),
+                            apacheg=ApacheDriver(self.logger, settings, seat="CPG", clock=self.clock),
+                            apache=ApacheCrewDriver(self.logger, settings, clock=self.clock),
+                            blackshark=BlackSharkDriver(self.logger, settings, clock=self.clock),
+                            strikeeagle=StrikeEagleDriver(self.logger, settings, clock=self.clock))
         self.driver = self.drivers["hornet"]
-        self.driverCmd = dict()
+        self.driverCmd = CommandTable()
+        self.command_tables = dict()
+        self.queue = SendQueue(self)
+        self.routes = dict()
+        self.probes = dict()
+        self.throughput_changed = False
+        # Throughput is recorded from the send queue's worker threads
+        self.settings_lock = threading.RLock()
+
+    def load_commands(self, driver_name):
+        commands = self.command_tables.get(driver_name)
+        if commands is None:
+            driver = self.drivers.get(driver_name)
+            sources = driver.command_sources if driver is not None else None
+            if sources:
+                merged = dict()
+                for source in sources:
+                    merged.update(self.load_commands(source).commands)
+                commands = self.command_tables[driver_name] = CommandTable(merged)
+                return commands
+            try:
+                commands = CommandTable.load(".\\cmd\\" + driver_name + ".json")
+                self.logger.info(f"Commands loaded for {driver_name}: {driver_name}.json")
+            except FileNotFoundError:
+                self.logger.warning(f"No command file found for {driver_name} - use DCS-BIOS")
+                commands = CommandTable()
+            except (AttributeError, ValueError):
+                self.logger.warning(f"Failed to read aircraft cmd: {driver_name}", exc_info=True)
+                commands = CommandTable()
+            self.command_tables[driver_name] = commands
+        return commands
 
     def set_driver(self, driver_name):
         try:
             self.driver = self.drivers[driver_name]
-            with open(".\\cmd\\" + driver_name + ".json", "r") as f:
-                try:
-                    self.driverCmd = json.load(f)
-                    self.logger.info(f"Commands loaded for {driver_name}: {driver_name}.json")
-                except AttributeError:
-                    self.logger.warning(f"Failed to read aircraft cmd: {driver_name}", exc_info=True)
         except KeyError:
             raise DriverException(f"Undefined driver: {driver_name}")
-        except FileNotFoundError:
-            self.logger.warning(f"No command file found for {driver_name} - use DCS-BIOS")
+        self.driverCmd = self.load_commands(driver_name)
 
-    def enter_all(self, profile, method):
-        self.driver.method = method
-        self.driver.cmdlist = self.driverCmd
+    def wait_until_ready(self, method, cancelled=None):
+        grace_period = float(self.settings['PREFERENCES'].get('Grace_Period', 5))
+        min_dwell = float(self.settings['PREFERENCES'].get('min_dwell', 0.5))
+        start = self.clock.now()
+
+        if method == "TheWay.lua":
+            ready = wait_for_the_way(grace_period, *self.the_way_address, cancelled=cancelled, clock=self.clock)
+        else:
+            ready = wait_for_dcs_bios(grace_period, *self.dcs_bios_export, cancelled=cancelled, clock=self.clock)
+
+        elapsed = self.clock.now() - start
+        if ready:
+            self.probes["TheWay.lua" if method == "TheWay.lua" else "DCS-BIOS"] = (self.clock.now(), True)
+            self.logger.info(f"{method} ready after {elapsed:.2f}s")
+        else:
+            self.logger.warning(f"No readiness signal from {method} after {elapsed:.2f}s, sending anyway")
+        self.clock.sleep(max(0, min_dwell - elapsed))
+
+    def throughput(self, aircraft, method, default):
+        with self.settings_lock:
+            try:
+                return self.settings.getfloat(THROUGHPUT_SECTION, f"{aircraft}_{METHOD_KEYS[method]}")
+            except (NoSectionError, NoOptionError, ValueError):
+                return default
+
+    def record_throughput(self, aircraft, method, presses, elapsed):
+        if not presses:
+            return
+        measured = elapsed / presses
+        with self.settings_lock:
+            previous = self.throughput(aircraft, method, None)
+            if previous is not None:
+                measured = previous + THROUGHPUT_WEIGHT * (measured - previous)
+            if not self.settings.has_section(THROUGHPUT_SECTION):
+                self.settings.add_section(THROUGHPUT_SECTION)
+            self.settings.set(THROUGHPUT_SECTION, f"{aircraft}_{METHOD_KEYS[method]}", f"{measured:.4f}")
+            self.throughput_changed = True
+
+    def probe(self, method):
+        """Whether the method's endpoint is reachable, remembered for method_probe_ttl seconds."""
+        ttl = float(self.settings['PREFERENCES'].get('method_probe_ttl', 10))
+        probed = self.probes.get(method)
+        if probed is not None and self.clock.now() - probed[0] < ttl:
+            return probed[1]
+
+        timeout = float(self.settings['PREFERENCES'].get('method_probe_timeout', 1))
+        if method == "TheWay.lua":
+            ready = wait_for_the_way(timeout, *self.the_way_address, clock=self.clock)
+        else:
+            ready = wait_for_dcs_bios(timeout, *self.dcs_bios_export, clock=self.clock)
+        self.probes[method] = (self.clock.now(), ready)
+        return ready
+
+    def choose_method(self, profile, driver, ops):
+        """Returns the fastest reachable entry method for the compiled profile and why it was chosen."""
+        keys = driver.keys(ops)
+        presses, seconds = driver.estimate(ops)
+        per_press = seconds / presses if presses else 0
+
+        estimates = dict()
+        reasons = list()
+        if self.probe("DCS-BIOS"):
+            estimates["DCS-BIOS"] = self.throughput(profile.aircraft, "DCS-BIOS", per_press) * presses
+        else:
+            reasons.append("DCS-BIOS not exporting")
+
+        commands = self.load_commands(profile.aircraft)
+        missing = commands.missing(keys)
+        if not len(commands):
+            reasons.append("no TheWay command table")
+        elif missing:
+            reasons.append(f"TheWay table lacks {len(missing)} commands")
+        elif not self.probe("TheWay.lua"):
+            reasons.append("TheWay not listening")
+        else:
+            the_way_per_press = commands.duration(keys) / presses if presses else 0
+            estimates["TheWay.lua"] = self.throughput(profile.aircraft, "TheWay.lua", the_way_per_press) * presses
+
+        if not estimates:
+            return "DCS-BIOS", ", ".join(reasons) + ", falling back to DCS-BIOS"
+        method = min(estimates, key=estimates.get)
+        if len(estimates) > 1:
+            return method, "fastest, est. " + ", ".join(f"{m} {t:.0f}s" for m, t in sorted(estimates.items()))
+        return method, f"est. {estimates[method]:.0f}s, " + ", ".join(reasons)
+
+    def enter_all(self, profile, method, wait_ready=False, progress=None):
+        try:
+            driver = self.drivers[profile.aircraft]
+        except KeyError:
+            raise DriverException(f"Undefined driver: {profile.aircraft}")
+        driver.cmdlist = self.load_commands(profile.aircraft)
+        driver.reporter = progress or driver.progress_window
         self.logger.info(f"Entering waypoints for aircraft: {profile.aircraft}")
-        sleep(int(self.settings['PREFERENCES'].get('Grace_Period', 5)))
-        self.driver.enter_all(profile)
+        if wait_ready:
+            self.wait_until_ready(method, cancelled=progress.cancelled if progress is not None else None)
+        else:
+            self.clock.sleep(int(self.settings['PREFERENCES'].get('Grace_Period', 5)))
+
+        ops = driver.compile(profile)
+        reason = "set in preferences"
+        if method == "Auto":
+            method, reason = self.choose_method(profile, driver, ops)
+        driver.method = method
+        self.routes[profile.aircraft] = (method, reason)
+        self.logger.info(f"Sending via {method}: {reason}")
+
+        if self.settings['PREFERENCES'].get('send_journal', 'false') == 'true':
+            driver.journal = SendJournal(profile.aircraft, method, profile.fingerprint,
+                                         timing=driver.timing)
+        start = self.clock.now()
+        try:
+            ops = driver.enter_all(profile, ops)
+        finally:
+            journal, driver.journal = driver.journal, None
+
+        # TheWay runs the commands inside DCS after the payload is sent, so only
+        # DCS-BIOS sends can be timed here.
+        if method == "DCS-BIOS" and not (progress is not None and progress.cancelled()):
+            self.record_throughput(profile.aircraft, method, driver.estimate(ops)[0], self.clock.now() - start)
+
+        if journal is not None:
+            filename = journal.save()
+            self.logger.info(f"Send journal written to {filename}: {journal.presses} presses, "
+                             f"{journal.duration:.1f}s of intended delays")
+
+    def replay_journal(self, journal, method=None, timing=None):
+        self.set_driver(journal.aircraft)
+        self.driver.method = method if method and method != "Auto" else journal.method
+        self.driver.cmdlist = self.driverCmd
+        self.logger.info(f"Replaying journal {journal.created} for aircraft {journal.aircraft} "
+                         f"via {self.driver.method}: {journal.presses} presses")
+        self.clock.sleep(int(self.settings['PREFERENCES'].get('Grace_Period', 5)))
+        self.driver.replay(journal, timing)
+
+    def save_throughput(self):
+        with self.settings_lock:
+            if self.throughput_changed:
+                with open("settings.ini", "w") as configfile:
+                    self.settings.write(configfile)
+                self.throughput_changed = False
 
     def stop(self):
+        self.queue.stop()
+        self.save_throughput()
         self.db.close()
         if self.driver is not None:
             self.driver.stop()
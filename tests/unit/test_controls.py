@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+import unittest
+from src.controls import ControlTable, CONTROL_DOC_DIR
+
+REFERENCE = {
+    "Up Front Controls": {
+        "ICP_DATA_UP_DN_SW": {
+            "identifier": "ICP_DATA_UP_DN_SW",
+            "inputs": [
+                {"interface": "fixed_step", "description": "switch to previous or next state"},
+                {"interface": "set_state", "max_value": 2, "description": "set position"},
+            ],
+        },
+        "ICP_BTN_1": {
+            "identifier": "ICP_BTN_1",
+            "inputs": [{"interface": "action", "argument": "TOGGLE"}],
+        },
+    }
+}
+
+
+class TestControlTable(unittest.TestCase):
+    def test_from_reference(self):
+        table = ControlTable(ControlTable.from_reference(REFERENCE))
+        self.assertTrue(table.can_set("ICP_DATA_UP_DN_SW", 2))
+        self.assertFalse(table.can_set("ICP_DATA_UP_DN_SW", 3))
+        self.assertFalse(table.can_set("ICP_BTN_1", 1))
+
+    def test_load_reference_or_builtin(self):
+        with tempfile.TemporaryDirectory() as dcs_path:
+            os.makedirs(os.path.join(dcs_path, CONTROL_DOC_DIR))
+            with open(os.path.join(dcs_path, CONTROL_DOC_DIR, "F-16C_50.json"), "w") as f:
+                json.dump(REFERENCE, f)
+
+            loaded = ControlTable.load(dcs_path, "F-16C_50")
+            builtin = ControlTable.load(dcs_path, "A-10C")
+
+        self.assertEqual(loaded.states, dict(ICP_DATA_UP_DN_SW=2))
+        self.assertEqual(builtin.source, "built-in")
+        self.assertTrue(builtin.can_set("AAP_PAGE", 0))
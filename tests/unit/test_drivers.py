@@ -1,7 +1,13 @@
 import unittest
 import logging
 import configparser
+import json
+import socket
+import threading
+from types import SimpleNamespace
+from src.geo import GeoPoint
 import src.drivers as drivers
+from src.clock import SimulatedClock
 
 logger = logging.getLogger()
 config = configparser.ConfigParser()
@@ -17,3 +23,186 @@ class TestBaseDriver(unittest.TestCase):
 
     def test_send_raw(self):
         self.assertTrue(self.driver.press_with_delay("RIO_CAP_CATRGORY 3"))
+
+    def test_enter_all_has_nothing_to_enter(self):
+        self.assertEqual(self.driver.enter_all(profile([])), [])
+
+
+def waypoint(lat, lon, number=1, wp_type="WP", elevation=0, name="", sequence=0, station=None):
+    return SimpleNamespace(position=GeoPoint(lat, lon), wp_type=wp_type, number=number,
+                           elevation=elevation, name=name, sequence=sequence, station=station)
+
+
+def profile(waypoints, msns=()):
+    return SimpleNamespace(waypoints_as_list=list(waypoints), all_waypoints_as_list=list(waypoints),
+                           msns_as_list=list(msns), sequences_dict=dict())
+
+
+class TestDriverTiming(unittest.TestCase):
+    def make(self, driver_class):
+        clock = SimulatedClock()
+        driver = driver_class(logger, config, clock=clock)
+        driver.reporter = drivers.NullProgress
+        return driver, clock
+
+    def test_schedule(self):
+        driver, clock = self.make(drivers.HarrierDriver)
+        driver.enter_all(profile([waypoint(41.5, 41.7)]))
+
+        self.assertEqual(clock.schedule()[:6], [
+            (0.0, "MPCD_L_2 1"), (0.2, "MPCD_L_2 0"),
+            (0.4, "UFC_B7 1"), (0.6, "UFC_B7 0"),
+            (0.8, "UFC_B7 1"), (1.0, "UFC_B7 0"),
+        ])
+        self.assertEqual(clock.messages[-1], "MPCD_L_2 0")
+
+    @staticmethod
+    def expected_schedule(steps, short=0.2, medium=0.5):
+        """Schedule of hand-written steps: (control, release) presses and (message, None) selector sets."""
+        schedule, t = list(), 0
+        for control, release in steps:
+            if release is None:
+                schedule.append((round(t, 6), control))
+            else:
+                schedule.append((round(t, 6), f"{control} 1"))
+                t += dict(short=short, medium=medium)[release]
+                schedule.append((round(t, 6), f"{control} 0"))
+            t += short
+        return schedule, round(t, 6)
+
+    def test_harrier_waypoint_schedule(self):
+        driver, clock = self.make(drivers.HarrierDriver)
+        driver.enter_all(profile([waypoint(41.5, 41.75, elevation=10)]))
+
+        digits = lambda number: [(f"UFC_B{digit}", "short") for digit in number]
+        schedule, end = self.expected_schedule(
+            [("MPCD_L_2", "short"), ("UFC_B7", "short"), ("UFC_B7", "short"), ("UFC_ENTER", "short"),
+             ("ODU_OPT2", "short"), ("UFC_B2", "medium")] + digits("413000") + [("UFC_ENTER", "medium"),
+             ("UFC_B6", "medium")] + digits("0414500") + [("UFC_ENTER", "medium"),
+             ("ODU_OPT3", "short")] + digits("10") + [("UFC_ENTER", "medium"),
+             ("ODU_OPT1", "short"), ("MPCD_L_2", "short")])
+        self.assertEqual(clock.schedule(), schedule)
+        self.assertEqual(schedule[10:14], [(2.0, "UFC_B2 1"), (2.5, "UFC_B2 0"), (2.7, "UFC_B4 1"), (2.9, "UFC_B4 0")])
+        self.assertEqual((len(clock.packets), end), (56, 12.7))
+        self.assertAlmostEqual(clock.now(), 12.7)
+
+    def test_mirage_waypoint_schedule(self):
+        driver, clock = self.make(drivers.MirageDriver)
+        driver.enter_all(profile([waypoint(41.5, 41.75, elevation=10)]))
+
+        digits = lambda number: [(f"INS_BTN_{digit}", "short") for digit in number]
+        schedule, end = self.expected_schedule(
+            [("INS_PARAM_SEL 4", None), ("INS_PREP_SW", "short")] + digits("01") + digits("1") +
+            [("INS_BTN_2", "medium")] + digits("41300") + [("INS_ENTER_BTN", "short")] + digits("3") +
+            [("INS_BTN_6", "medium")] + digits("041450") + [("INS_ENTER_BTN", "short"),
+             ("INS_PARAM_SEL 3", None)] + digits("1110") + [("INS_ENTER_BTN", "short"),
+             ("INS_PARAM_SEL 4", None)])
+        self.assertEqual(clock.schedule(), schedule)
+        self.assertEqual(schedule[:4], [(0.0, "INS_PARAM_SEL 4"), (0.2, "INS_PREP_SW 1"), (0.4, "INS_PREP_SW 0"),
+                                        (0.6, "INS_BTN_0 1")])
+        self.assertEqual((len(clock.packets), end), (53, 11.2))
+        self.assertAlmostEqual(clock.now(), 11.2)
+
+    def test_cancel_skips_rest_of_phase(self):
+        driver, clock = self.make(drivers.HarrierDriver)
+        driver.reporter = lambda count: SimpleNamespace(cancelled=lambda: True, update=lambda i: None,
+                                                        close=lambda: None)
+        driver.enter_all(profile([waypoint(41.5, 41.7), waypoint(42.5, 42.7, number=2)]))
+
+        self.assertEqual(clock.messages, ["MPCD_L_2 1", "MPCD_L_2 0"])
+
+    def test_viper_direct_stpt_entry(self):
+        route = profile([waypoint(41.5 + i / 10, 41.7, elevation=100) for i in range(25)])
+        durations = dict()
+        for mode in ("step", "direct"):
+            driver, clock = self.make(drivers.ViperDriver)
+            driver.stpt_entry = mode
+            driver.enter_all(route)
+            durations[mode] = clock.now()
+        self.assertLess(durations["direct"], durations["step"])
+
+        driver, clock = self.make(drivers.ViperDriver)
+        driver.stpt_entry = "direct"
+        driver.stpt_start = 12
+        driver.enter_all(profile([waypoint(41.5, 41.7), waypoint(41.6, 41.8)]))
+        pressed = [message[:-2] for message in clock.messages if "BTN" in message and message.endswith(" 1")]
+        self.assertEqual(pressed[:4], ["ICP_BTN_4", "ICP_BTN_1", "ICP_BTN_2", "ICP_ENTR_BTN"])
+        self.assertIn(["ICP_BTN_4", "ICP_BTN_1", "ICP_BTN_3", "ICP_ENTR_BTN"],
+                      [pressed[i:i + 4] for i in range(4, len(pressed))])
+
+    def test_warthog_scratchpad_tracking(self):
+        route = profile([waypoint(41.5 + i / 10, 41.7, number=i + 1, elevation=100, name=f"Alpha {i}")
+                         for i in range(3)])
+        messages = dict()
+        for tracking in (False, True):
+            driver, clock = self.make(drivers.WarthogDriver)
+            driver.scratchpad_tracking = tracking
+            driver.enter_all(route)
+            messages[tracking] = clock.messages
+
+        self.assertEqual(messages[True].count("CDU_CLR 1"), 2 * 3)
+        self.assertEqual(messages[False].count("CDU_CLR 1"), 13 * 3)
+        self.assertEqual([m for m in messages[True] if m != "CDU_CLR 1" and m != "CDU_CLR 0"],
+                         [m for m in messages[False] if m != "CDU_CLR 1" and m != "CDU_CLR 0"])
+
+    def test_apache_crew_interleaves_seats(self):
+        route = profile([waypoint(41.5 + i / 10, 41.7, number=i + 1, elevation=100, name=f"P{i}") for i in range(5)])
+        single, single_clock = self.make(lambda logger, config, clock: drivers.ApacheDriver(logger, config,
+                                                                                            seat="CPG", clock=clock))
+        single.enter_all(route)
+
+        crew, clock = self.make(drivers.ApacheCrewDriver)
+        crew.enter_all(route)
+
+        self.assertAlmostEqual(clock.now(), single_clock.now())
+        self.assertEqual([m for m in clock.messages if m.startswith("CPG_")], single_clock.messages)
+        self.assertEqual(len([m for m in clock.messages if m.startswith("PLT_")]), len(single_clock.messages))
+
+    def test_viper_rockers_use_set_state(self):
+        driver, clock = self.make(drivers.ViperDriver)
+        driver.icp_data("DN")
+        driver.icp_data("RTN")
+        driver.run(driver.ops)
+
+        self.assertEqual(clock.messages, ["ICP_DATA_UP_DN_SW 0", "ICP_DATA_UP_DN_SW 1",
+                                          "ICP_DATA_RTN_SEQ_SW 0", "ICP_DATA_RTN_SEQ_SW 1"])
+
+    def test_the_way_payload_matches_single_dump(self):
+        commands = {f"UFC_{i}": {"device": "25", "code": str(3000 + i), "delay": "100", "activate": "1",
+                                 "addDepress": "true", "note": "\u00b0 \"quoted\""} for i in range(10)}
+        # Far more than one send chunk, with keys the table lacks
+        keys = [f"UFC_{i % 12}" for i in range(3000)]
+        expected = json.dumps({"payload": [commands.get(key) for key in keys], "type": "waypoints"}) + "\n"
+
+        received = bytearray()
+
+        def receive(server):
+            connection, _ = server.accept()
+            with connection:
+                while data := connection.recv(65536):
+                    received.extend(data)
+
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen(1)
+            receiver = threading.Thread(target=receive, args=(server,))
+            receiver.start()
+            driver = drivers.Driver(logger, config)
+            driver.the_way_address = server.getsockname()
+            driver.cmdlist = drivers.CommandTable(commands)
+            driver.enter_keypress(keys)
+            driver.stop()
+            receiver.join(5)
+
+        self.assertGreater(len(received), drivers.THE_WAY_SEND_CHUNK)
+        self.assertEqual(bytes(received), expected.encode("utf-8"))
+        self.assertIn(b", null, ", received)
+
+    def test_the_way_duration_estimate(self):
+        commands = drivers.CommandTable({
+            "UFC_1": {"device": "25", "code": "3019", "delay": "100", "activate": "1", "addDepress": "true"},
+            "UFC_ENTER": {"device": "25", "code": "3029", "delay": "250", "activate": "1", "addDepress": "false"},
+        })
+
+        self.assertAlmostEqual(commands.duration(["UFC_1", "UFC_1", "UFC_ENTER", "UFC_CLR"]), 0.65)
+        self.assertEqual(commands.missing(["UFC_1", "UFC_CLR"]), {"UFC_CLR"})
@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+import unittest
+from src.export import write_csv, write_json, write_readable
+from src.geo import GeoPoint
+from src.objects import Profile, Waypoint, MSN
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self) -> None:
+        self.profile = Profile("Route", aircraft="viper", waypoints=[
+            MSN(GeoPoint(40.5, 41.25), elevation=5, name="M1", station=8),
+            Waypoint(GeoPoint(41.5, 41.75), elevation=100.5, name="A \"quoted\", comma", sequence=1),
+            Waypoint(GeoPoint(-42.5, -41.75), wp_type="TG"),
+            MSN(GeoPoint(40.25, 41.25), name="M2", station=2),
+        ])
+
+    def test_json_matches_profile_string(self):
+        out = io.StringIO()
+        write_json(self.profile, out)
+        self.assertEqual(out.getvalue(), str(self.profile))
+        self.assertEqual(json.loads(out.getvalue()), self.profile.to_dict())
+
+    def test_readable(self):
+        out = io.StringIO()
+        write_readable(self.profile, out)
+        self.assertEqual(out.getvalue().splitlines(), [
+            "Waypoints:",
+            "",
+            "WP1 | SEQ1 | A \"quoted\", comma: 41°30'0.0\"N 41°45'0.0\"E | 100.5ft",
+            "TG1: 42°30'0.0\"S 41°45'0.0\"W | 0ft",
+            "",
+            "Preplanned missions:",
+            "",
+            "MSN1 | STA2 | M2: 40°15'0.0\"N 41°15'0.0\"E | 0ft",
+            "MSN1 | STA8 | M1: 40°30'0.0\"N 41°15'0.0\"E | 5ft",
+        ])
+        self.assertEqual(self.profile.to_readable_string(), out.getvalue())
+
+    def test_csv(self):
+        out = io.StringIO()
+        write_csv(self.profile, out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([row["name"] for row in rows], ["M1", "A \"quoted\", comma", "", "M2"])
+        self.assertEqual((rows[1]["latitude"], rows[1]["elevation"], rows[1]["station"]), ("41.5", "100.5", ""))
+        self.assertEqual(rows[3]["station"], "2")
@@ -0,0 +1,30 @@
+import copy
+import unittest
+from LatLon23 import LatLon, Latitude, Longitude
+from src.geo import GeoPoint, GeoLatitude, GeoLongitude
+
+DMS = "d%°%m%'%S%\"%H"
+
+
+class TestGeoPoint(unittest.TestCase):
+    def test_matches_latlon23(self):
+        for args in ((41.7,), (-41.7,), (0.5,), (-0.25,), (190.5,), (-200.25,), (45, 30, 15.5), ("43.25",)):
+            for theirs, ours in ((Latitude(*args), GeoLatitude(*args)), (Longitude(*args), GeoLongitude(*args))):
+                with self.subTest(angle=type(ours).__name__, args=args):
+                    self.assertEqual((ours.decimal_degree, ours.degree, ours.minute, ours.decimal_minute,
+                                      ours.second, ours.get_hemisphere(), ours.to_string(DMS)),
+                                     (theirs.decimal_degree, theirs.degree, theirs.minute, theirs.decimal_minute,
+                                      theirs.second, theirs.get_hemisphere(), theirs.to_string(DMS)))
+
+    def test_latlon_conversion(self):
+        latlon = LatLon(Latitude(-33.9), Longitude(151.2))
+        point = GeoPoint.from_latlon(latlon)
+
+        self.assertEqual(point.to_string(DMS), latlon.to_string(DMS))
+        self.assertEqual(point.to_latlon().to_string(DMS), latlon.to_string(DMS))
+
+    def test_immutable(self):
+        point = GeoPoint(41.5, 41.7)
+        with self.assertRaises(AttributeError):
+            point.lat = GeoLatitude(40)
+        self.assertEqual(copy.deepcopy(point), point)
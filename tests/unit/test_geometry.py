@@ -0,0 +1,46 @@
+import unittest
+from pyproj import Geod
+from src.geo import GeoPoint
+from src.geometry import METRES_PER_NM, route_legs
+from src.objects import Profile, Waypoint, MSN
+
+
+class TestGeometry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.profile = Profile("", waypoints=[
+            Waypoint(GeoPoint(41.0, 41.0), sequence=1),
+            MSN(GeoPoint(40.0, 40.0), station=8),
+            Waypoint(GeoPoint(42.0, 41.0), wp_type="TG"),
+            Waypoint(GeoPoint(41.0, 42.0)),
+            Waypoint(GeoPoint(42.0, 42.0), sequence=1),
+        ])
+
+    def test_route_legs_match_geod(self):
+        legs = route_legs([0.0, 0.0, 1.0], [0.0, 1.0, 1.0], {"a": [0, 1, 2], "b": [2], "c": [2, 0]})
+        self.assertEqual([len(legs[key]) for key in "abc"], [2, 0, 1])
+        self.assertAlmostEqual(legs["a"].distances[0], 111319.49, places=1)
+        self.assertAlmostEqual(legs["a"].bearings[1], 0.0)
+        bearing, _, distance = Geod(ellps="WGS84").inv(1.0, 1.0, 0.0, 0.0)
+        self.assertAlmostEqual(legs["c"].bearings[0], bearing % 360)
+        self.assertAlmostEqual(legs["c"].total, distance)
+
+    def test_profile_routes(self):
+        geometry = self.profile.geometry
+        self.assertEqual(list(geometry.types["WP"].indices), [0, 3, 4])
+        self.assertEqual(list(geometry.sequences[1].indices), [0, 4])
+        self.assertEqual(len(geometry.types["TG"]), 0)
+        self.assertEqual(set(geometry.totals()), {"WP", "TG", "SEQ1"})
+
+        self.assertIsNone(self.profile.inbound_leg(self.profile.waypoints[0]))
+        self.assertIsNone(self.profile.inbound_leg(self.profile.waypoints[1]))
+        bearing, distance = self.profile.inbound_leg(self.profile.waypoints[4])
+        self.assertAlmostEqual(bearing, 0.0)
+        self.assertAlmostEqual(distance / METRES_PER_NM, 60.0, delta=0.2)
+
+    def test_geometry_follows_edits(self):
+        total = self.profile.geometry.totals()["WP"]
+        self.assertIs(self.profile.geometry, self.profile.geometry)
+        self.profile.waypoints[4].position = GeoPoint(43.0, 42.0)
+        self.assertGreater(self.profile.geometry.totals()["WP"], total)
+        self.profile.waypoints[4].wp_type = "TG"
+        self.assertEqual(list(self.profile.geometry.types["TG"].indices), [2, 4])
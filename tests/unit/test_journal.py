@@ -0,0 +1,85 @@
+import configparser
+import logging
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from src.clock import SimulatedClock
+from src.drivers import HornetDriver, NullProgress, ViperDriver
+from src.geo import GeoPoint
+from src.journal import SendJournal
+
+config = configparser.ConfigParser()
+config.read("../fixtures/settings.ini")
+
+
+class TestSendJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.journal = SendJournal("hornet", "DCS-BIOS", "abc", timing=dict(short=0.2, medium=0.5))
+        self.journal.record("UFC_1", False, "short", "short")
+        self.journal.record("UFC_ENT", False, "medium", "short")
+        self.journal.pause(1)
+        self.journal.record("AAP_PAGE 0", True, None, 0.3)
+
+    def test_duration(self):
+        self.assertAlmostEqual(self.journal.duration, 0.4 + 0.7 + 1 + 0.3)
+        self.assertEqual(self.journal.presses, 3)
+
+    def test_retimed(self):
+        retimed = self.journal.retimed(dict(short=0.1))
+        self.assertAlmostEqual(retimed.duration, 0.2 + 0.6 + 1 + 0.3)
+        self.assertEqual(self.journal.timing["short"], 0.2)
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = self.journal.save(os.path.join(tmp_dir, "journal.json"))
+            loaded = SendJournal.load(filename)
+        self.assertEqual(loaded.keys, self.journal.keys)
+        self.assertEqual(loaded.timing, self.journal.timing)
+        self.assertEqual(loaded.profile_hash, "abc")
+
+
+
+class TestJournalReplay(unittest.TestCase):
+    def make(self, driver_class):
+        clock = SimulatedClock()
+        driver = driver_class(logging.getLogger(), config, clock=clock)
+        driver.reporter = NullProgress
+        self.addCleanup(driver.stop)
+        return driver, clock
+
+    def test_replay_matches_recorded_send(self):
+        waypoints = [SimpleNamespace(position=GeoPoint(41.5 + i / 10, 41.7), wp_type="WP", number=i + 1,
+                                     elevation=100 * i, name=f"WP{i + 1}", sequence=0, station=None)
+                     for i in range(3)]
+        profile = SimpleNamespace(waypoints_as_list=waypoints, all_waypoints_as_list=waypoints, msns_as_list=[],
+                                  sequences_dict=dict())
+
+        for driver_class in (HornetDriver, ViperDriver):
+            with self.subTest(driver_class.__name__):
+                driver, clock = self.make(driver_class)
+                driver.journal = SendJournal("test", "DCS-BIOS", timing=driver.timing)
+                ops = driver.enter_all(profile)
+                journal, driver.journal = driver.journal, None
+
+                replayer, replay_clock = self.make(driver_class)
+                replayer.replay(SendJournal.load(journal.save(os.path.join(self.tmp(), "journal.json"))))
+                self.assertEqual(replay_clock.packets, clock.packets)
+                self.assertAlmostEqual(replay_clock.now(), journal.duration)
+
+                # Retimed replays follow the new table exactly as a send with it would
+                timing = dict(short=0.05, medium=0.3)
+                expected, expected_clock = self.make(driver_class)
+                expected.run(ops, dict(driver.timing, **timing))
+                replayer, replay_clock = self.make(driver_class)
+                replayer.replay(journal, timing)
+                self.assertEqual(replay_clock.schedule(), expected_clock.schedule())
+                self.assertEqual([data for _, data, _ in replay_clock.packets],
+                                 [data for _, data, _ in clock.packets])
+                self.assertAlmostEqual(replay_clock.now(), journal.retimed(timing).duration)
+                self.assertLess(replay_clock.now(), clock.now())
+
+    def tmp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        return tmp_dir.name
@@ -0,0 +1,104 @@
+import configparser
+import logging
+import os
+import tempfile
+import unittest
+import zipfile
+from src.drivers import HornetDriver
+from src.geo import GeoPoint
+from src.mission import list_groups, inject_route
+from src.objects import Profile, Waypoint, MSN
+
+MISSION = '''mission = 
+{
+    ["coalition"] = 
+    {
+        ["blue"] = 
+        {
+            ["country"] = 
+            {
+                [1] = 
+                {
+                    ["plane"] = 
+                    {
+                        ["group"] = 
+                        {
+                            [1] = 
+                            {
+                                ["name"] = "Enfield 1",
+                                ["route"] = 
+                                {
+                                    ["points"] = 
+                                    {
+                                        [1] = 
+                                        {
+                                            ["alt"] = 500,
+                                            ["type"] = "TakeOffParking",
+                                            ["x"] = -284860,
+                                            ["y"] = 683839,
+                                        }, -- end of [1]
+                                        [2] = 
+                                        {
+                                            ["alt"] = 7620,
+                                            ["speed"] = 220.5,
+                                            ["x"] = -1,
+                                            ["y"] = 1,
+                                        }, -- end of [2]
+                                    }, -- end of ["points"]
+                                }, -- end of ["route"]
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    },
+    ["descriptionText"] = "Line \\"one\\"",
+    ["theatre"] = "Caucasus",
+} -- end of mission
+'''
+
+
+class TestMissionRoute(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.miz = os.path.join(self.tmp_dir.name, "test.miz")
+        with zipfile.ZipFile(self.miz, "w", zipfile.ZIP_DEFLATED) as miz:
+            miz.writestr("mission", MISSION)
+            miz.writestr("options", "options = {}")
+        # The Hornet takes any number of WPs but no target points; MSNs are never part of a route
+        self.profile = Profile("Route", aircraft="hornet", waypoints=[
+            Waypoint(GeoPoint(42.27, 42.48), name="WP1"),
+            MSN(GeoPoint(42.3, 42.5), name="MSN1", station=8),
+            Waypoint(GeoPoint(42.37, 42.48), name="WP2"),
+            Waypoint(GeoPoint(42.47, 42.48), name="WP3", wp_type="TG"),
+        ])
+        config = configparser.ConfigParser()
+        config.read("../fixtures/settings.ini")
+        self.driver = HornetDriver(logging.getLogger(), config)
+
+    def tearDown(self) -> None:
+        self.driver.stop()
+        self.tmp_dir.cleanup()
+
+    def test_list_groups(self):
+        self.assertEqual(list_groups(self.miz), ["Enfield 1"])
+
+    def test_inject_route(self):
+        waypoints, rejected = inject_route(self.miz, "Enfield 1", self.profile, self.driver)
+        self.assertEqual([str(wp) for wp in waypoints], ["WP1 | WP1", "WP2 | WP2"])
+        self.assertEqual([str(wp) for wp in rejected], ["TG1 | WP3"])
+        self.assertEqual(waypoints, self.driver.validate_waypoints(self.profile.waypoints_as_list))
+
+        with zipfile.ZipFile(self.miz) as miz:
+            self.assertEqual(miz.read("options"), b"options = {}")
+            text = miz.read("mission").decode("utf-8")
+        self.assertIn('"TakeOffParking"', text)
+        self.assertIn('["name"] = "WP2"', text)
+        self.assertNotIn('"WP3"', text)
+        self.assertNotIn('"MSN1"', text)
+        self.assertIn('["descriptionText"] = "Line \\"one\\""', text)
+
+    def test_unknown_group(self):
+        with self.assertRaises(ValueError):
+            inject_route(self.miz, "Colt 1", self.profile, self.driver)
@@ -0,0 +1,256 @@
+import copy
+import os
+import sqlite3
+import tempfile
+import unittest
+from LatLon23 import LatLon, Latitude, Longitude
+from src.db import DatabaseInterface, SCHEMA_VERSION
+from src.models import ProfileModel, db
+from src.objects import Profile, Waypoint, MSN, WaypointStore
+
+
+def position(lat, lon):
+    return LatLon(Latitude(lat), Longitude(lon))
+
+
+class TestProfileStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.profile = Profile("", waypoints=[
+            Waypoint(position(41.5, 41.7), elevation=100, name="A", sequence=1),
+            MSN(position(40.5, 41.2), elevation=5, name="M1", station=8),
+            Waypoint(position(42.5, 41.7), elevation=200, name="B", wp_type="TG"),
+            Waypoint(position(43.5, 40.7), name="C", sequence=1),
+            MSN(position(40.2, 41.2), elevation=5, name="M2", station=8),
+        ])
+
+    def test_derived_views(self):
+        self.assertEqual([str(wp) for wp in self.profile.waypoints_as_list],
+                         ["WP1 | SEQ1 | A", "TG1 | B", "WP2 | SEQ1 | C"])
+        self.assertEqual(self.profile.sequences_dict, {1: [1, 3]})
+        self.assertEqual(list(self.profile.stations_dict), [8])
+        self.assertEqual([wp.number for wp in self.profile.msns_as_list], [1, 2])
+        self.assertIsInstance(self.profile.waypoints[1], MSN)
+
+    def test_views_write_through(self):
+        wp = self.profile.waypoints_of_type("TG")[0]
+        wp.elevation = 250
+        wp.position = position(42.0, 41.0)
+
+        stored = self.profile.waypoints[2]
+        self.assertEqual((stored.elevation, stored.latitude, stored.longitude), (250, 42.0, 41.0))
+        self.assertEqual(stored.position.lat.decimal_degree, 42.0)
+
+    def test_remove_detaches_waypoint(self):
+        wp = self.profile.waypoints[0]
+        self.profile.waypoints.remove(wp)
+        self.profile.update_waypoint_numbers()
+
+        self.assertEqual(len(self.profile.waypoints), 4)
+        self.assertEqual(wp.name, "A")
+        self.assertEqual(str(self.profile.waypoints[2]), "WP1 | SEQ1 | C")
+
+    def test_round_trip(self):
+        loaded = Profile.from_string(str(self.profile))
+        self.assertEqual(loaded.waypoints_as_list, self.profile.waypoints_as_list)
+        self.assertEqual(loaded.msns_as_list, self.profile.msns_as_list)
+        self.assertEqual(str(copy.deepcopy(self.profile)), str(self.profile))
+
+
+    def test_cached_views_follow_mutations(self):
+        self.assertEqual(self.profile.sequences, [1])
+        wps = self.profile.waypoints_as_list
+        wps.clear()
+        self.assertEqual(len(self.profile.waypoints_as_list), 3)
+
+        self.profile.waypoints_as_list[1].sequence = 2
+        self.assertEqual(self.profile.sequences, [1, 2])
+        self.profile.waypoints.append(Waypoint(position(44.0, 41.0), wp_type="TG"))
+        self.assertEqual(len(self.profile.waypoints_of_type("TG")), 2)
+
+    def test_numbers_follow_inserts_and_removals(self):
+        self.profile.waypoints.append(Waypoint(position(44.0, 41.0), wp_type="TG"))
+        self.profile.waypoints.remove(self.profile.waypoints[0])
+        self.profile.waypoints[0].station = 2
+        self.profile.waypoints_of_type("TG")[0].wp_type = "WP"
+
+        self.assertTrue(self.profile.waypoints.numbered)
+        self.assertEqual([str(wp) for wp in self.profile.waypoints],
+                         ["MSN1 | STA2 | M1", "WP1 | B", "WP2 | SEQ1 | C", "MSN1 | STA8 | M2", "TG1"])
+
+    def test_fingerprint_follows_contents(self):
+        fingerprint = self.profile.fingerprint
+        wp = self.profile.waypoints[2]
+        wp.name = "Renamed"
+        self.assertNotEqual(self.profile.fingerprint, fingerprint)
+        wp.name = "B"
+        self.assertEqual(self.profile.fingerprint, fingerprint)
+
+        self.profile.waypoints.remove(self.profile.waypoints[0])
+        rebuilt = WaypointStore()
+        rebuilt.extend_records(self.profile.waypoints.records())
+        self.assertEqual(self.profile.fingerprint, Profile("", waypoints=rebuilt).fingerprint)
+        self.profile.aircraft = "viper"
+        self.assertNotEqual(self.profile.fingerprint, Profile("", waypoints=rebuilt).fingerprint)
+
+    def test_undo_and_redo(self):
+        original, fingerprint = str(self.profile), self.profile.fingerprint
+        self.assertFalse(self.profile.undo())
+
+        removed = self.profile.waypoints[0]
+        self.profile.waypoints.remove(removed)
+        with self.profile.edit():
+            self.profile.waypoints.extend([Waypoint(position(44.0, 41.0), name="D"),
+                                           Waypoint(position(44.5, 41.0), name="E")])
+            self.profile.waypoints_of_type("TG")[0].wp_type = "WP"
+        self.profile.waypoints[0].position = position(40.0, 40.0)
+        edited = str(self.profile)
+
+        self.assertTrue(self.profile.undo())
+        self.assertEqual(self.profile.waypoints[0].latitude, 40.5)
+        self.assertTrue(self.profile.undo())
+        self.assertEqual(len(self.profile.waypoints), 4)
+        self.assertTrue(self.profile.undo())
+        self.assertEqual((str(self.profile), self.profile.fingerprint), (original, fingerprint))
+        self.assertEqual(str(removed), "WP1 | SEQ1 | A")
+
+        while self.profile.redo():
+            pass
+        self.assertEqual(str(self.profile), edited)
+        self.profile.waypoints[0].name = "Changed"
+        self.assertFalse(self.profile.redo())
+
+
+class TestProfileDatabase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmp.name, "profiles.db")
+
+    def tearDown(self) -> None:
+        db.close()
+        self.tmp.cleanup()
+
+    def test_adds_fingerprint_column_and_skips_unchanged_saves(self):
+        with sqlite3.connect(self.db_name) as connection:
+            connection.execute("CREATE TABLE profilemodel (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+                               "aircraft VARCHAR(255) NOT NULL)")
+        connection.close()
+        DatabaseInterface(self.db_name)
+
+        profile = Profile("Saved", waypoints=[Waypoint(position(41.5, 41.7), name="A")])
+        profile.save()
+        self.assertEqual(ProfileModel.get(ProfileModel.name == "Saved").fingerprint, profile.fingerprint)
+        self.assertEqual(Profile.load("Saved").fingerprint, profile.fingerprint)
+
+        profile.save("Copy")
+        self.assertEqual(Profile.load("Saved").duplicates(), ["Copy"])
+
+    def test_upgrades_schema_in_place(self):
+        with sqlite3.connect(self.db_name) as connection:
+            connection.execute("CREATE TABLE profilemodel (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+                               "aircraft VARCHAR(255) NOT NULL)")
+            connection.execute("INSERT INTO profilemodel (name, aircraft) VALUES ('Old', 'hornet')")
+            connection.execute("CREATE TABLE waypointmodel (id INTEGER PRIMARY KEY, name VARCHAR(255), "
+                               "latitude REAL NOT NULL, longitude REAL NOT NULL, elevation INTEGER NOT NULL, "
+                               "profile_id INTEGER NOT NULL, sequence_id INTEGER, wp_type VARCHAR(255) NOT NULL, "
+                               "station INTEGER NOT NULL)")
+            connection.executemany("INSERT INTO waypointmodel (name, latitude, longitude, elevation, profile_id, "
+                                   "wp_type, station) VALUES (?, ?, 41.7, 0, 1, 'WP', 0)",
+                                   [("A", 41.5), ("B", 42.5)])
+        connection.close()
+
+        DatabaseInterface(self.db_name)
+        self.assertEqual(db.pragma("user_version"), SCHEMA_VERSION)
+        self.assertEqual(db.pragma("journal_mode"), "wal")
+        indexes = {index.name for table in db.get_tables() for index in db.get_indexes(table)}
+        self.assertLessEqual({"profilemodel_fingerprint", "waypointmodel_profile_id", "waypointmodel_sequence_id",
+                              "sequencemodel_profile_id", "waypointmodel_profile_id_uid"}, indexes)
+        old = Profile.load("Old")
+        self.assertEqual((old.aircraft, [wp.name for wp in old.waypoints]), ("hornet", ["A", "B"]))
+
+        db.close()
+        with self.assertLogs("peewee", level="DEBUG") as log:
+            DatabaseInterface(self.db_name)
+        self.assertEqual([record.msg[0] for record in log.records], ["PRAGMA user_version"])
+
+    def test_saves_only_changed_rows(self):
+        DatabaseInterface(self.db_name)
+        profile = Profile("Big", waypoints=[Waypoint(position(41 + i / 1000, 41.7), sequence=i % 3)
+                                            for i in range(500)])
+        profile.save()
+
+        with self.assertLogs("peewee", level="DEBUG") as log:
+            profile.save()
+        self.assertEqual(len(log.records), 1)
+
+        profile.waypoints[10].name = "Edited"
+        profile.waypoints.append(Waypoint(position(42.0, 42.0)))
+        with self.assertLogs("peewee", level="DEBUG") as log:
+            profile.save()
+        statements = [record.msg[0].split(" ")[0] for record in log.records if "waypointmodel" in record.msg[0]]
+        self.assertEqual(statements, ["SELECT", "UPDATE", "INSERT"])
+        self.assertEqual(list(Profile.load("Big").waypoints.records()), list(profile.waypoints.records()))
+
+    def test_removing_a_waypoint_deletes_only_its_row(self):
+        DatabaseInterface(self.db_name)
+        Profile("Big", waypoints=[Waypoint(position(41 + i / 1000, 41.7), name=f"{i}") for i in range(200)]).save()
+        profile = Profile.load("Big")
+
+        profile.waypoints.remove(profile.waypoints[0])
+        with self.assertLogs("peewee", level="DEBUG") as log:
+            profile.save()
+        statements = [record.msg[0].split(" ")[0] for record in log.records if "waypointmodel" in record.msg[0]]
+        self.assertEqual(statements, ["SELECT", "DELETE"])
+
+        profile.undo()
+        profile.save()
+        loaded = Profile.load("Big")
+        self.assertEqual(list(loaded.waypoints.records()), list(profile.waypoints.records()))
+        self.assertEqual(loaded.waypoints[0].name, "0")
+
+    def test_load_uses_one_waypoint_query(self):
+        DatabaseInterface(self.db_name)
+        profile = Profile("Sequenced", waypoints=[Waypoint(position(41 + i / 100, 41.7), sequence=i % 3)
+                                                  for i in range(100)] + [MSN(position(40.5, 41.2), station=8)])
+        profile.save()
+        Profile("Another").save()
+
+        with self.assertLogs("peewee", level="DEBUG") as log:
+            loaded = Profile.load("Sequenced")
+        self.assertEqual(len(log.records), 2)
+        self.assertEqual(list(loaded.waypoints.records()), list(profile.waypoints.records()))
+        self.assertEqual(Profile.list_names(), ["Another", "Sequenced"])
+
+        Profile.delete("Sequenced")
+        self.assertEqual(Profile.list_names(), ["Another"])
+
+    def test_string_stations_round_trip(self):
+        DatabaseInterface(self.db_name)
+        profile = Profile("Strike Eagle", aircraft="strikeeagle", waypoints=[
+            MSN(position(40.5, 41.2), name="M1", station="L1"),
+            MSN(position(40.6, 41.2), name="M2", station=8),
+            MSN(position(40.7, 41.2), name="M3", station="L1"),
+        ])
+        self.assertEqual([(msn.station, msn.number) for msn in profile.waypoints], [("L1", 1), (8, 1), ("L1", 2)])
+        self.assertEqual(sorted(profile.stations_dict, key=str), [8, "L1"])
+        profile.save()
+
+        loaded = Profile.load("Strike Eagle")
+        self.assertEqual([(msn.station, msn.number) for msn in loaded.waypoints], [("L1", 1), (8, 1), ("L1", 2)])
+        self.assertEqual(loaded.fingerprint, profile.fingerprint)
+
+        loaded.waypoints[1].station = "R2"
+        self.assertNotEqual(loaded.fingerprint, profile.fingerprint)
+        loaded.undo()
+        self.assertEqual(loaded.waypoints[1].station, 8)
+
+    def test_fractional_elevation_keeps_fingerprint_across_save(self):
+        DatabaseInterface(self.db_name)
+        profile = Profile("Fractional", waypoints=[Waypoint(position(41.5, 41.7), elevation=100.7, name="A")])
+        profile.save()
+
+        loaded = Profile.load("Fractional")
+        self.assertEqual(loaded.waypoints[0].elevation, 101)
+        self.assertEqual(loaded.fingerprint, profile.fingerprint)
+        with self.assertLogs("peewee", level="DEBUG") as log:
+            loaded.save()
+        self.assertEqual(len(log.records), 1)
@@ -0,0 +1,92 @@
+import socket
+import struct
+import threading
+import unittest
+from time import monotonic
+from src.clock import SimulatedClock
+from src.readiness import DCS_BIOS_EXPORT_GROUP, DCS_BIOS_FRAME_SYNC, wait_for_dcs_bios, wait_for_the_way
+
+
+def free_port(kind):
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestDcsBiosReadiness(unittest.TestCase):
+    def setUp(self) -> None:
+        self.port = free_port(socket.SOCK_DGRAM)
+        self.stop = threading.Event()
+
+    def tearDown(self) -> None:
+        self.stop.set()
+
+    def export(self, data):
+        # Stands in for DCS-BIOS, sending to the export group until stopped
+        def send():
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) as s:
+                s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 0)
+                s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+                while not self.stop.wait(0.02):
+                    s.sendto(data, (DCS_BIOS_EXPORT_GROUP, self.port))
+        threading.Thread(target=send, daemon=True).start()
+
+    def test_ready_on_export_frame(self):
+        self.export(b"\x00\x00" + DCS_BIOS_FRAME_SYNC + b"\x00\x04\x02\x00")
+        self.assertTrue(wait_for_dcs_bios(2, port=self.port))
+
+    def test_times_out_without_frames(self):
+        self.export(b"not a frame")
+        start = monotonic()
+        self.assertFalse(wait_for_dcs_bios(0.3, port=self.port, interval=0.05))
+        self.assertGreaterEqual(monotonic() - start, 0.3)
+
+    def test_times_out_on_the_given_clock(self):
+        clock = SimulatedClock()
+        self.assertFalse(wait_for_dcs_bios(5, port=self.port, interval=0.5, clock=clock))
+        self.assertEqual(clock.now(), 5)
+
+    def test_cancel(self):
+        start = monotonic()
+        self.assertFalse(wait_for_dcs_bios(5, port=self.port, cancelled=lambda: monotonic() - start > 0.1,
+                                           interval=0.05))
+        self.assertLess(monotonic() - start, 1)
+
+
+class TestTheWayReadiness(unittest.TestCase):
+    def test_ready_when_listening_and_sends_nothing(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen(1)
+            self.assertTrue(wait_for_the_way(2, port=server.getsockname()[1]))
+
+            connection, _ = server.accept()
+            with connection:
+                connection.settimeout(2)
+                try:
+                    data = connection.recv(1024)
+                except ConnectionResetError:
+                    data = None
+            # Reset rather than closed, so no empty payload is ever read
+            self.assertIsNone(data)
+
+    def test_times_out_when_not_listening(self):
+        start = monotonic()
+        self.assertFalse(wait_for_the_way(0.3, port=free_port(socket.SOCK_STREAM), interval=0.05))
+        self.assertGreaterEqual(monotonic() - start, 0.3)
+
+    def test_times_out_on_the_given_clock(self):
+        clock = SimulatedClock()
+        self.assertFalse(wait_for_the_way(5, port=free_port(socket.SOCK_STREAM), interval=0.5, clock=clock))
+        self.assertEqual(clock.now(), 5)
+
+        clock = SimulatedClock()
+        self.assertFalse(wait_for_the_way(5, port=free_port(socket.SOCK_STREAM), cancelled=lambda: clock.now() >= 3,
+                                          interval=0.5, clock=clock))
+        self.assertEqual(clock.now(), 3)
+
+    def test_cancel(self):
+        start = monotonic()
+        self.assertFalse(wait_for_the_way(5, port=free_port(socket.SOCK_STREAM),
+                                          cancelled=lambda: monotonic() - start > 0.1, interval=0.05))
+        self.assertLess(monotonic() - start, 1)
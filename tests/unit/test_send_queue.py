@@ -0,0 +1,127 @@
+import threading
+import unittest
+from src.clock import SimulatedClock
+from src.geo import GeoPoint
+from src.objects import Profile, Waypoint
+from src.send_queue import SendJob, SendQueue
+
+
+class FakeEditor:
+    """Enters a profile one waypoint at a time on a simulated clock, once released."""
+
+    def __init__(self):
+        self.clock = SimulatedClock()
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+        self.sent = list()
+
+    def enter_all(self, profile, method, wait_ready=False, progress=None):
+        progress(len(profile.waypoints))
+        self.started.release()
+        self.release.wait(5)
+        for i, wp in enumerate(profile.waypoints):
+            if progress.cancelled():
+                return
+            self.clock.sleep(0.5)
+            progress.update(i + 1)
+        self.sent.append((profile.aircraft, profile.profilename, [wp.name for wp in profile.waypoints]))
+
+
+def make_profile(name, aircraft="hornet", *waypoints):
+    return Profile(name, aircraft=aircraft,
+                   waypoints=[Waypoint(GeoPoint(41.5 + i / 10, 41.7), name=wp) for i, wp in enumerate(waypoints)])
+
+
+class TestSendQueue(unittest.TestCase):
+    def setUp(self) -> None:
+        self.editor = FakeEditor()
+        self.queue = SendQueue(self.editor)
+
+    def tearDown(self) -> None:
+        self.editor.release.set()
+        self.queue.stop()
+
+    def submit(self, profile, method="DCS-BIOS"):
+        return self.queue.submit(SendJob(profile, method))
+
+    def wait_started(self, count=1):
+        for _ in range(count):
+            self.assertTrue(self.editor.started.acquire(timeout=5))
+
+    def wait_idle(self):
+        with self.queue.cond:
+            self.assertTrue(self.queue.cond.wait_for(lambda: not self.queue.busy, timeout=5))
+
+    def test_pending_send_is_replaced_by_a_newer_one(self):
+        first = self.submit(make_profile("CAP", "hornet", "A"))
+        self.wait_started()
+
+        profile = make_profile("Strike", "hornet", "A", "B")
+        superseded = self.submit(profile)
+        with profile.edit():
+            profile.waypoints[1].name = "C"
+        latest = self.submit(profile)
+        profile.waypoints[0].name = "Changed after submit"
+        self.assertEqual(len(latest.profile.waypoints.undo_steps), 0)
+
+        self.editor.release.set()
+        self.wait_idle()
+        self.assertEqual((first.state, superseded.state, latest.state), ("done", "superseded", "done"))
+        self.assertEqual(self.editor.sent, [("hornet", "CAP", ["A"]), ("hornet", "Strike", ["A", "C"])])
+        self.assertEqual(latest.progress_text, "2/2")
+
+    def test_running_send_is_cancelled_by_a_newer_one(self):
+        running = self.submit(make_profile("Strike", "hornet", "A", "B"))
+        queued = self.submit(make_profile("CAP", "hornet", "C"))
+        self.wait_started()
+
+        latest = self.submit(make_profile("Strike", "hornet", "A", "D"))
+        self.assertTrue(running.cancelled())
+        self.assertEqual(self.queue.status(), [("hornet", running, 2)])
+
+        self.editor.release.set()
+        self.wait_idle()
+        self.assertEqual((running.state, queued.state, latest.state), ("superseded", "done", "done"))
+        self.assertEqual(self.editor.sent, [("hornet", "Strike", ["A", "D"]), ("hornet", "CAP", ["C"])])
+        self.assertEqual(self.editor.clock.now(), 1.5)
+
+    def test_status(self):
+        running = self.submit(make_profile("Strike", "hornet", "A"))
+        other = self.submit(make_profile("CAP", "viper", "B"))
+        self.wait_started(2)
+        self.submit(make_profile("Strike 2", "hornet", "C"))
+        self.submit(make_profile("Strike 3", "hornet", "D"))
+
+        self.assertEqual(self.queue.status(), [("hornet", running, 2), ("viper", other, 0)])
+        self.assertEqual(running.state, "running")
+
+        self.editor.release.set()
+        self.wait_idle()
+        self.assertEqual(self.queue.status(), [])
+        self.assertEqual(len(self.editor.sent), 4)
+        self.assertEqual(self.editor.clock.now(), 2.0)
+
+    def test_cancel_all(self):
+        running = self.submit(make_profile("Strike", "hornet", "A", "B"))
+        self.wait_started()
+        pending = self.submit(make_profile("Strike 2", "hornet", "C"))
+
+        self.queue.cancel_all()
+        self.editor.release.set()
+        self.wait_idle()
+        self.assertEqual((running.state, pending.state), ("cancelled", "cancelled"))
+        self.assertEqual(self.editor.sent, [])
+        self.assertEqual(self.editor.clock.now(), 0)
+
+    def test_stop(self):
+        running = self.submit(make_profile("Strike", "hornet", "A"))
+        self.wait_started()
+        pending = self.submit(make_profile("Strike 2", "hornet", "B"))
+        worker = self.queue.workers["hornet"]
+
+        self.queue.stop()
+        self.editor.release.set()
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual((running.state, pending.state), ("cancelled", "cancelled"))
+        self.assertEqual(self.editor.sent, [])
@@ -0,0 +1,33 @@
+import unittest
+import numpy as np
+from src.geo import GeoPoint
+from src.objects import Profile, Waypoint, MSN
+from src.simplify import simplify, plan_profile, apply_plan
+
+
+class TestSimplify(unittest.TestCase):
+    def test_keeps_corners_and_reports_error(self):
+        latitudes = [40.0, 40.0, 40.0, 40.5, 41.0, 41.0]
+        longitudes = [41.0, 41.5, 42.0, 42.0, 42.0, 42.01]
+        result = simplify(latitudes, longitudes, max_points=3)
+        self.assertEqual(list(np.flatnonzero(result.kept)), [0, 2, 5])
+        self.assertLess(result.error, 1000)
+
+        result = simplify(latitudes, longitudes, tolerance=500)
+        self.assertEqual(list(np.flatnonzero(result.kept)), [0, 2, 4, 5])
+        self.assertEqual(list(np.flatnonzero(simplify(latitudes, longitudes, max_points=2, keep=[1]).kept)), [0, 1])
+
+    def test_profile_plan_keeps_named_and_mission_points(self):
+        waypoints = [Waypoint(GeoPoint(40.0 + i / 100, 41.0 + (i % 2) / 1000), name="Named" if i == 7 else "")
+                     for i in range(20)]
+        profile = Profile("", waypoints=waypoints + [MSN(GeoPoint(40.0, 41.0), station=8)])
+        plan = plan_profile(profile, dict(WP=4, MSN=1))
+        self.assertEqual(list(plan), ["WP"])
+        apply_plan(profile, plan)
+
+        self.assertEqual(len(profile.waypoints_as_list), 4)
+        self.assertEqual(len(profile.msns_as_list), 1)
+        self.assertIn("Named", [wp.name for wp in profile.waypoints_as_list])
+        self.assertEqual([wp.number for wp in profile.waypoints_as_list], [1, 2, 3, 4])
+        self.assertTrue(profile.undo())
+        self.assertEqual(len(profile.waypoints), 21)
@@ -0,0 +1,41 @@
+import unittest
+from src.geo import GeoPoint
+from src.objects import Profile, Waypoint, MSN
+from src.spatial import SpatialHash, duplicate_indices
+
+
+class TestSpatial(unittest.TestCase):
+    def test_nearest_within_distance(self):
+        grid = SpatialHash(30)
+        grid.add("a", 41.0, 41.0)
+        grid.add("b", 41.0002, 41.0)
+        grid.add("pole", 89.99999, 0.0)
+        grid.add("west", 0.0, -179.99999)
+        grid.add("tg", 41.0, 41.0, group="TG")
+
+        self.assertEqual(grid.nearest(41.00015, 41.0), "b")
+        self.assertIsNone(grid.nearest(41.0, 41.0005))
+        self.assertEqual(grid.nearest(89.99999, 90.0), "pole")
+        self.assertEqual(grid.nearest(0.0, 179.99999), "west")
+        self.assertEqual(grid.nearest(41.0, 41.0, group="TG"), "tg")
+
+    def test_duplicate_indices(self):
+        latitudes = [41.0, 41.0001, 41.0002, 41.0003, 41.0]
+        self.assertEqual(duplicate_indices(latitudes, [41.0] * 5, 15), [1, 3, 4])
+        self.assertEqual(duplicate_indices(latitudes, [41.0] * 5, 15, groups=[1, 1, 1, 1, 2]), [1, 3])
+        self.assertEqual(duplicate_indices(latitudes, [41.0] * 5, 100), [1, 2, 3, 4])
+
+    def test_profile_append_unique_and_remove_duplicates(self):
+        profile = Profile("", waypoints=[Waypoint(GeoPoint(41.0, 41.0), name="A"),
+                                         MSN(GeoPoint(41.0, 41.0), station=8)])
+        self.assertEqual(str(profile.append_unique(Waypoint(GeoPoint(41.0001, 41.0)), 30)), "WP1 | A")
+        self.assertIsNone(profile.append_unique(Waypoint(GeoPoint(41.0001, 41.0), wp_type="TG"), 30))
+        self.assertIsNone(profile.append_unique(MSN(GeoPoint(41.0, 41.0), station=2), 30))
+        self.assertEqual(str(profile.append_unique(Waypoint(GeoPoint(41.0, 41.0001), wp_type="TG"), 30)), "TG1")
+        self.assertEqual(len(profile.waypoints), 4)
+
+        profile.waypoints.extend([Waypoint(GeoPoint(41.00005, 41.0)), Waypoint(GeoPoint(42.0, 41.0))])
+        self.assertEqual(profile.remove_duplicates(30), 1)
+        self.assertEqual([str(wp) for wp in profile.waypoints_as_list], ["WP1 | A", "TG1", "WP2"])
+        self.assertTrue(profile.undo())
+        self.assertEqual(len(profile.waypoints), 6)
@@ -0,0 +1,125 @@
+import configparser
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+from src.clock import SimulatedClock
+from src.drivers import CommandTable
+from src.geo import GeoPoint
+from src.models import db
+from src.objects import Profile, Waypoint
+from src.readiness import DCS_BIOS_EXPORT_GROUP, DCS_BIOS_FRAME_SYNC, wait_for_dcs_bios, wait_for_the_way
+from src.send_queue import SendJob
+from src.wp_editor import WaypointEditor
+
+
+def free_port(kind):
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ExportingClock(SimulatedClock):
+    """Simulated clock that stands in for DCS-BIOS, exporting a frame each time it sleeps."""
+
+    def __init__(self, port):
+        super().__init__()
+        self.port = port
+        self.exporting = True
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 0)
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+    def sleep(self, seconds):
+        if self.exporting:
+            self.socket.sendto(b"\x00\x00" + DCS_BIOS_FRAME_SYNC, (DCS_BIOS_EXPORT_GROUP, self.port))
+        super().sleep(seconds)
+
+
+class TestMethodChoice(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        settings = configparser.ConfigParser()
+        settings.read("../fixtures/settings.ini")
+        settings.set("PREFERENCES", "db_name", os.path.join(self.tmp.name, "profiles.db"))
+        settings.set("PREFERENCES", "grace_period", "0")
+        port = free_port(socket.SOCK_DGRAM)
+        self.clock = ExportingClock(port)
+        self.editor = WaypointEditor(settings, clock=self.clock)
+        self.editor.dcs_bios_export = (DCS_BIOS_EXPORT_GROUP, port)
+        self.the_way = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.the_way.bind(("127.0.0.1", 0))
+        self.the_way.listen(8)
+        self.editor.the_way_address = self.the_way.getsockname()
+        self.profile = Profile("Strike", aircraft="hornet", waypoints=[
+            Waypoint(GeoPoint(41.5, 41.7), elevation=100, name="A"),
+            Waypoint(GeoPoint(42.5, 41.2), elevation=200, name="B"),
+        ])
+        self.driver = self.editor.drivers["hornet"]
+        self.ops = self.driver.compile(self.profile)
+        # 10 ms per command, far quicker than the DCS-BIOS delays
+        self.editor.command_tables["hornet"] = CommandTable(
+            {key: {"device": "25", "code": "3000", "delay": "10", "activate": "1", "addDepress": "false"}
+             for key in self.driver.keys(self.ops)})
+
+    def tearDown(self) -> None:
+        self.the_way.close()
+        self.clock.socket.close()
+        self.editor.queue.stop()
+        db.close()
+        self.tmp.cleanup()
+
+    def choose(self):
+        return self.editor.choose_method(self.profile, self.driver, self.ops)
+
+    def test_picks_the_fastest_reachable_method(self):
+        method, reason = self.choose()
+        self.assertEqual(method, "TheWay.lua")
+        self.assertTrue(reason.startswith("fastest, est. DCS-BIOS"))
+
+        self.editor.probes.clear()
+        self.the_way.close()
+        self.assertEqual(self.choose(), ("DCS-BIOS", f"est. {self.driver.estimate(self.ops)[1]:.0f}s, "
+                                                     "TheWay not listening"))
+
+        self.editor.probes.clear()
+        self.clock.exporting = False
+        start = self.clock.now()
+        self.assertEqual(self.choose(), ("DCS-BIOS", "DCS-BIOS not exporting, TheWay not listening, "
+                                                     "falling back to DCS-BIOS"))
+        # Both probes waited out method_probe_timeout on the simulated clock
+        self.assertEqual(self.clock.now() - start, 2)
+
+    def test_incomplete_command_table_skips_the_way_probe(self):
+        commands = dict(self.editor.command_tables["hornet"].commands)
+        del commands[self.driver.keys(self.ops)[0]]
+        self.editor.command_tables["hornet"] = CommandTable(commands)
+
+        with mock.patch("src.wp_editor.wait_for_the_way") as the_way:
+            method, reason = self.choose()
+        self.assertEqual(method, "DCS-BIOS")
+        self.assertTrue(reason.endswith("TheWay table lacks 1 commands"))
+        the_way.assert_not_called()
+
+    def test_probes_are_cached(self):
+        with mock.patch("src.wp_editor.wait_for_dcs_bios", wraps=wait_for_dcs_bios) as dcs_bios, \
+                mock.patch("src.wp_editor.wait_for_the_way", wraps=wait_for_the_way) as the_way:
+            self.choose()
+            self.clock.sleep(9)
+            self.choose()
+            self.assertEqual((dcs_bios.call_count, the_way.call_count), (1, 1))
+
+            self.clock.sleep(1)
+            self.choose()
+            self.assertEqual((dcs_bios.call_count, the_way.call_count), (2, 2))
+
+    def test_auto_send_compiles_once(self):
+        self.the_way.close()
+        self.clock.exporting = False
+        with mock.patch.object(self.driver, "compile", wraps=self.driver.compile) as compile:
+            self.editor.enter_all(self.profile, "Auto", progress=SendJob(self.profile, "Auto"))
+
+        self.assertEqual(compile.call_count, 1)
+        self.assertEqual(self.editor.routes["hornet"][0], "DCS-BIOS")
+        self.assertEqual(len(self.clock.messages), 2 * self.driver.estimate(self.ops)[0])